@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Bootstrap par course, seedé et parallélisable, pour les diagnostics
+(diagnostic_derive_cote).
+
+Les partants d'une même course ne sont pas indépendants (un seul
+gagnant) : on tire les courses entières avec remise, pas les lignes.
+Chaque lot de tirages est une matrice d'indices NumPy [taille, nb
+courses] convertie en poids de fréquence par course ; la statistique
+reçoit ces poids [taille, nb courses] et rend [taille, k] (un lot
+d'ajustements vectorisés, cf. logreg.fit_logistique_lot).
+
+Reproductibilité : le lot i utilise le i-ème enfant de
+SeedSequence(seed). Le résultat ne dépend donc que de (seed, n_boot,
+lot), pas du nombre de workers (ProcessPoolExecutor si workers > 1).
+
+Intervalles rendus par coefficient :
+    percentile   quantiles α/2, 1 − α/2 des tirages
+    bca          percentile corrigé du biais (z0) et de l'asymétrie
+                 (accélération par jackknife, une course retirée à la fois ;
+                 par groupes de courses au-delà de JACKKNIFE_MAX courses)
+
+Usage:
+    from bootstrap import bootstrap_courses, statistique_logit
+    stat = statistique_logit(Xs, y, course)     # course : indice 0..m-1 par ligne
+    res = bootstrap_courses(stat, nb_courses, n_boot=2000, seed=42, workers=4)
+    res.estimation, res.percentile[1], res.bca[1], res.se
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from statistics import NormalDist
+
+import numpy as np
+
+from logreg import fit_logistique, fit_logistique_lot
+
+Bootstrap = namedtuple("Bootstrap", "estimation tirages percentile bca se")
+
+N_BOOT = 2000
+LOT = 250
+JACKKNIFE_MAX = 1000   # au-delà : jackknife par groupes de courses contiguës
+NIVEAU = 0.95
+
+_NORMALE = NormalDist()
+
+
+def poids_tirage(rng, nb_courses, taille):
+    """Poids [taille, nb_courses] : nombre de fois que chaque course est
+    tirée dans chacun des `taille` rééchantillons (matrice d'indices)."""
+    idx = rng.integers(0, nb_courses, size=(taille, nb_courses))
+    idx += np.arange(taille)[:, None] * nb_courses
+    return np.bincount(idx.ravel(), minlength=taille * nb_courses).reshape(taille, nb_courses)
+
+
+def _lot(statistique, nb_courses, graine, taille):
+    poids = poids_tirage(np.random.default_rng(graine), nb_courses, taille)
+    return np.asarray(statistique(poids), dtype=np.float64)
+
+
+def jackknife(statistique, nb_courses, lot=LOT, groupes=JACKKNIFE_MAX):
+    """Statistique [g, k] sans chacun des g groupes de courses contiguës :
+    une course par groupe (leave-one-out) si nb_courses <= groupes.
+    Les lignes de poids sont construites lot par lot ([lot, nb_courses]),
+    jamais la matrice complète [g, nb_courses]."""
+    g = min(groupes, nb_courses)
+    groupe = np.arange(nb_courses) * g // nb_courses
+    return np.concatenate([
+        np.asarray(statistique((groupe != np.arange(i, min(i + lot, g))[:, None]).astype(np.float64)),
+                   dtype=np.float64)
+        for i in range(0, g, lot)])
+
+
+def percentile(tirages, niveau=NIVEAU):
+    """Intervalles [k, 2] par quantiles des tirages [B, k] (NaN ignorés)."""
+    alpha = (1 - niveau) / 2
+    return np.nanquantile(tirages, [alpha, 1 - alpha], axis=0).T
+
+
+def bca(tirages, estimation, valeurs_jk, niveau=NIVEAU):
+    """Intervalles BCa [k, 2] (Efron) : tirages [B, k], estimation [k],
+    valeurs_jk [g, k] (statistique sans chacun des g groupes). Les
+    ajustements NaN (non identifiés) sont écartés."""
+    alpha = (1 - niveau) / 2
+    out = np.full((tirages.shape[1], 2), np.nan)
+    for j in range(tirages.shape[1]):
+        t = tirages[:, j][np.isfinite(tirages[:, j])]
+        jk = valeurs_jk[:, j][np.isfinite(valeurs_jk[:, j])]
+        if not len(t) or not len(jk) or not np.isfinite(estimation[j]):
+            continue
+        part = (np.sum(t < estimation[j]) + 0.5 * np.sum(t == estimation[j])) / len(t)
+        part = min(max(part, 1 / len(t)), 1 - 1 / len(t))
+        z0 = _NORMALE.inv_cdf(part)
+        d = jk.mean() - jk
+        denominateur = 6 * np.sum(d ** 2) ** 1.5
+        a = np.sum(d ** 3) / denominateur if denominateur > 0 else 0.0
+        for b, q in enumerate((alpha, 1 - alpha)):
+            z = z0 + _NORMALE.inv_cdf(q)
+            out[j, b] = np.quantile(t, _NORMALE.cdf(z0 + z / (1 - a * z)))
+    return out
+
+
+def bootstrap_courses(statistique, nb_courses, n_boot=N_BOOT, seed=42, lot=LOT,
+                      workers=1, niveau=NIVEAU, groupes=JACKKNIFE_MAX):
+    """Bootstrap de `statistique` (poids [b, nb_courses] → [b, k]) en
+    rééchantillonnant les courses. Retourne Bootstrap(estimation [k],
+    tirages [n_boot, k], percentile [k, 2], bca [k, 2], se [k]) ; un
+    tirage non identifié (NaN) reste dans `tirages` mais est écarté des
+    intervalles. groupes : nombre max de fits du jackknife de la BCa."""
+    estimation = np.asarray(statistique(np.ones((1, nb_courses))), dtype=np.float64)[0]
+    graines = np.random.SeedSequence(seed).spawn(-(-n_boot // lot))
+    tailles = [min(lot, n_boot - i * lot) for i in range(len(graines))]
+    calcul = partial(_lot, statistique, nb_courses)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            lots = list(pool.map(calcul, graines, tailles))
+    else:
+        lots = [calcul(g, t) for g, t in zip(graines, tailles)]
+    tirages = np.concatenate(lots)
+    jk = jackknife(statistique, nb_courses, lot, groupes)
+    return Bootstrap(estimation, tirages, percentile(tirages, niveau),
+                     bca(tirages, estimation, jk, niveau),
+                     np.nanstd(tirages, axis=0, ddof=1))
+
+
+def _coef_logit(poids, X, y, course, depart):
+    return fit_logistique_lot(X, y, np.asarray(poids)[:, course], depart=depart)
+
+
+def statistique_logit(X, y, course):
+    """Statistique "coefficients de la régression logistique" pour
+    bootstrap_courses : course [n] = indice de course (0..m-1) de chaque
+    ligne ; départ de Newton commun = ajustement complet."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    depart = fit_logistique(X, y).coef
+    return partial(_coef_logit, X=X, y=y, course=np.asarray(course), depart=depart)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Requêtes indexées sur le catalogue SQLite (courses_catalog.py).
+
+Remplace les parcours complets de data/courses/*.json pour les questions
+du type « toutes les courses du cheval X » ou « Chantilly terrain souple ».
+
+Usage:
+    from catalog_query import courses_cheval, courses_hippodrome
+    for run in courses_cheval("ARCHIVIST"):
+        print(run["date"], run["hippodrome"], run["arrivee"])
+
+    python3 catalog_query.py cheval ARCHIVIST
+    python3 catalog_query.py jockey "C. SOUMILLON"
+    python3 catalog_query.py entraineur "A. FABRE"
+    python3 catalog_query.py hippodrome CHANTILLY --terrain souple --type Plat
+    python3 catalog_query.py cotes 2026-04-12 R1 C3
+"""
+
+import argparse
+import sys
+import time
+
+from courses_catalog import connect, nom_cheval
+
+_RUN_COLUMNS = (
+    "c.date, c.hippodrome, c.reunion, c.numero, c.nom AS course, c.type, c.distance, "
+    "c.terrain, c.arrivee_definitive, p.num, p.cheval, p.jockey, p.entraineur, "
+    "p.cote, p.cote_reference, p.arrivee, p.musique"
+)
+
+
+def _rows(conn, sql, params):
+    own = conn is None
+    conn = conn or connect()
+    try:
+        return [dict(r) for r in conn.execute(sql, params)]
+    finally:
+        if own:
+            conn.close()
+
+
+def _periode(date_from, date_to):
+    clauses, params = [], []
+    if date_from:
+        clauses.append("c.date >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("c.date <= ?")
+        params.append(date_to)
+    return clauses, params
+
+
+def _runs_par(colonne, valeur, date_from=None, date_to=None, conn=None):
+    clauses, params = _periode(date_from, date_to)
+    where = " AND ".join([f"p.{colonne} = ?"] + clauses)
+    sql = (f"SELECT {_RUN_COLUMNS} FROM participants p JOIN courses c ON c.id = p.course_id "
+           f"WHERE {where} ORDER BY c.date, c.reunion, c.numero")
+    return _rows(conn, sql, [valeur] + params)
+
+
+def courses_cheval(nom, date_from=None, date_to=None, conn=None):
+    """Toutes les courses d'un cheval (nom nu ou libellé "NOM H.PU. 4 a.")."""
+    return _runs_par("cheval", nom_cheval(nom.upper()), date_from, date_to, conn)
+
+
+def courses_jockey(nom, date_from=None, date_to=None, conn=None):
+    return _runs_par("jockey", nom.upper(), date_from, date_to, conn)
+
+
+def courses_entraineur(nom, date_from=None, date_to=None, conn=None):
+    return _runs_par("entraineur", nom.upper(), date_from, date_to, conn)
+
+
+def courses_hippodrome(hippodrome, terrain=None, type_course=None, distance_min=None,
+                       distance_max=None, date_from=None, date_to=None, conn=None):
+    """Courses d'un hippodrome, filtrables par terrain (sous-chaîne, insensible
+    à la casse), discipline et distance."""
+    clauses, params = _periode(date_from, date_to)
+    clauses.insert(0, "c.hippodrome = ?")
+    params.insert(0, hippodrome.upper())
+    if terrain:
+        clauses.append("c.terrain LIKE ?")
+        params.append(f"%{terrain}%")
+    if type_course:
+        clauses.append("c.type = ?")
+        params.append(type_course)
+    if distance_min is not None:
+        clauses.append("c.distance >= ?")
+        params.append(distance_min)
+    if distance_max is not None:
+        clauses.append("c.distance <= ?")
+        params.append(distance_max)
+    sql = ("SELECT c.*, (SELECT COUNT(*) FROM participants p WHERE p.course_id = c.id) AS nb_partants "
+           f"FROM courses c WHERE {' AND '.join(clauses)} ORDER BY c.date, c.reunion, c.numero")
+    return _rows(conn, sql, params)
+
+
+def partants(date_iso, reunion, numero, conn=None):
+    """Partants d'une course (date, R, C)."""
+    sql = (f"SELECT {_RUN_COLUMNS} FROM participants p JOIN courses c ON c.id = p.course_id "
+           "WHERE c.date = ? AND c.reunion = ? AND c.numero = ? ORDER BY p.num")
+    return _rows(conn, sql, (date_iso, reunion, numero))
+
+
+def cotes_course(date_iso, reunion, course, conn=None):
+    """Captures de cotes live d'une course, triées par numPmu puis temps."""
+    sql = ("SELECT num, t, cote, ref, tendance FROM cotes_live "
+           "WHERE date = ? AND reunion = ? AND course = ? ORDER BY num, t")
+    return _rows(conn, sql, (date_iso, reunion, course))
+
+
+def _print_runs(runs):
+    for r in runs:
+        arrivee = r["arrivee"] if r["arrivee"] else "-"
+        print(f"  {r['date']} {r['hippodrome'][:14]:14} R{r['reunion']}C{r['numero']:<2} "
+              f"{(r['type'] or '')[:6]:6} {r['distance'] or '':>5}m  #{r['num']:<2} "
+              f"{r['cheval'][:22]:22} {(r['jockey'] or '')[:18]:18} cote {r['cote'] or '-':>5}  arr. {arrivee}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requêtes sur le catalogue des courses")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for cmd in ("cheval", "jockey", "entraineur"):
+        p = sub.add_parser(cmd)
+        p.add_argument("nom")
+        p.add_argument("--from", dest="date_from")
+        p.add_argument("--to", dest="date_to")
+    h = sub.add_parser("hippodrome")
+    h.add_argument("nom")
+    h.add_argument("--terrain")
+    h.add_argument("--type", dest="type_course")
+    h.add_argument("--distance-min", type=int)
+    h.add_argument("--distance-max", type=int)
+    h.add_argument("--from", dest="date_from")
+    h.add_argument("--to", dest="date_to")
+    c = sub.add_parser("cotes")
+    c.add_argument("date")
+    c.add_argument("reunion")
+    c.add_argument("course")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.cmd in ("cheval", "jockey", "entraineur"):
+        func = {"cheval": courses_cheval, "jockey": courses_jockey,
+                "entraineur": courses_entraineur}[args.cmd]
+        rows = func(args.nom, args.date_from, args.date_to)
+        _print_runs(rows)
+    elif args.cmd == "hippodrome":
+        rows = courses_hippodrome(args.nom, args.terrain, args.type_course, args.distance_min,
+                                  args.distance_max, args.date_from, args.date_to)
+        for r in rows:
+            print(f"  {r['date']} R{r['reunion']}C{r['numero']:<2} {(r['type'] or '')[:6]:6} "
+                  f"{r['distance'] or '':>5}m {(r['terrain'] or '')[:12]:12} "
+                  f"{r['nb_partants']:>2} partants  {r['nom']}")
+    else:
+        reunion = int(args.reunion.upper().lstrip("R"))
+        course = int(args.course.upper().lstrip("C"))
+        rows = cotes_course(args.date, reunion, course)
+        for r in rows:
+            print(f"  #{r['num']:<2} {r['t']}  cote {r['cote']}  ref {r['ref']} {r['tendance'] or ''}")
+
+    print(f"📊 {len(rows)} ligne(s) en {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,13 +16,14 @@ Usage:
 """
 
 import csv
-import json
 import os
 import sys
 import re
 import logging
 from datetime import datetime
 
+from json_io import write_json
+
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
@@ -264,8 +265,7 @@ def save_json(data, category):
     os.makedirs(DATA_DIR, exist_ok=True)
     filepath = os.path.join(DATA_DIR, f"{category}.json")
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json(filepath, data)
     
     logger.info(f"💾 Sauvegardé: {filepath}")
 
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Série temporelle append-only des cotes live (data/cotes_live/series/).
+
+scraper_pre_course.py ne garde qu'une capture par course dans
+data/cotes_live/*_live.json (1ère capture = la bonne). Ici chaque capture
+est ajoutée, pour conserver la forme du mouvement des cotes.
+
+Format : un fichier JSON Lines par jour, {date}.jsonl, une ligne compacte
+par snapshot de course, colonnes en tableaux alignés sur numPmu :
+
+    {"t": "2026-04-12T11:49:15", "r": 1, "c": 3, "hippo": "PARISLONGCHAMP",
+     "depart": 1775995080000, "num": [1, 2], "cote": [5.9, 12.0],
+     "ref": [7.2, 9.9], "tend": ["-", ""]}
+
+Clé logique : (date, réunion, course, numPmu). On n'écrit qu'en fin de
+fichier : un crash peut laisser une dernière ligne tronquée, ignorée à la
+lecture ; l'ajout suivant la termine d'abord par un saut de ligne pour ne
+pas se coller au fragment.
+
+Usage:
+    from cotes_store import append_snapshot, drift_course, drift_jour
+    python3 cotes_store.py import              # amorce depuis les *_live.json
+    python3 cotes_store.py 2026-04-12 R1 C3    # affiche la courbe d'une course
+"""
+
+import json
+import os
+import re
+import sys
+
+from json_io import read_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LIVE_DIR = os.path.join(ROOT, 'data', 'cotes_live')
+SERIES_DIR = os.path.join(LIVE_DIR, 'series')
+
+LIVE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})_(.+?)_R(\d+)C(\d+)_live\.json$')
+
+
+def series_path(date_iso, series_dir=SERIES_DIR):
+    return os.path.join(series_dir, f"{date_iso}.jsonl")
+
+
+def snapshot_from_capture(capture):
+    """Convertit un résultat de scrape_cotes_course en ligne columnar."""
+    participants = capture.get("participants", [])
+    return {
+        "t": capture.get("scraped_at"),
+        "r": capture.get("reunion"),
+        "c": capture.get("numero"),
+        "hippo": capture.get("hippodrome", ""),
+        "depart": capture.get("heure_depart"),
+        "num": [p.get("numPmu") for p in participants],
+        "cote": [p.get("cote_live") for p in participants],
+        "ref": [p.get("cote_reference") for p in participants],
+        "tend": [p.get("tendance", "") for p in participants],
+    }
+
+
+def append_snapshot(date_iso, capture, series_dir=SERIES_DIR):
+    """Ajoute une capture (format scraper_pre_course) à la série du jour."""
+    os.makedirs(series_dir, exist_ok=True)
+    line = json.dumps(snapshot_from_capture(capture), ensure_ascii=False, separators=(',', ':'))
+    with open(series_path(date_iso, series_dir), 'ab+') as f:
+        # Fragment d'une écriture interrompue : le clore avant d'ajouter
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = "\n" + line
+        f.write((line + "\n").encode('utf-8'))
+
+
+def read_snapshots(date_iso, series_dir=SERIES_DIR):
+    """Toutes les lignes du jour, dans l'ordre d'écriture."""
+    path = series_path(date_iso, series_dir)
+    if not os.path.exists(path):
+        return []
+    snapshots = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                snapshots.append(json.loads(line))
+            except ValueError:
+                # Dernière ligne tronquée (crash pendant l'écriture)
+                continue
+    return snapshots
+
+
+def _drift(snapshots):
+    """Regroupe des snapshots d'une même course par numPmu, triés par temps."""
+    snapshots = sorted(snapshots, key=lambda s: s.get("t") or "")
+    runners = {}
+    for snap in snapshots:
+        for num, cote, ref, tend in zip(snap["num"], snap["cote"], snap["ref"], snap["tend"]):
+            serie = runners.setdefault(num, {"t": [], "cote": [], "ref": [], "tendance": []})
+            serie["t"].append(snap.get("t"))
+            serie["cote"].append(cote)
+            serie["ref"].append(ref)
+            serie["tendance"].append(tend)
+    first = snapshots[0] if snapshots else {}
+    return {
+        "hippodrome": first.get("hippo", ""),
+        "depart": first.get("depart"),
+        "t": [s.get("t") for s in snapshots],
+        "runners": runners,
+    }
+
+
+def drift_jour(date_iso, series_dir=SERIES_DIR):
+    """{(reunion, course): courbe} pour toutes les courses capturées du jour.
+
+    Courbe = {"hippodrome", "depart", "t": [...], "runners": {numPmu:
+    {"t", "cote", "ref", "tendance"}}}.
+    """
+    by_course = {}
+    for snap in read_snapshots(date_iso, series_dir):
+        by_course.setdefault((snap.get("r"), snap.get("c")), []).append(snap)
+    return {key: _drift(snaps) for key, snaps in sorted(by_course.items())}
+
+
+def drift_course(date_iso, reunion, course, series_dir=SERIES_DIR):
+    """Courbe de cotes d'une course (None si jamais capturée)."""
+    snaps = [s for s in read_snapshots(date_iso, series_dir)
+             if s.get("r") == reunion and s.get("c") == course]
+    return _drift(snaps) if snaps else None
+
+
+def importer_captures(live_dir=LIVE_DIR, series_dir=SERIES_DIR):
+    """Amorce la série à partir des *_live.json existants (une ligne chacun).
+
+    Les jours qui ont déjà un fichier .jsonl sont laissés tels quels.
+    """
+    deja = {name[:-len(".jsonl")] for name in os.listdir(series_dir)} if os.path.isdir(series_dir) else set()
+    by_date = {}
+    for name in sorted(os.listdir(live_dir)):
+        m = LIVE_PATTERN.match(name)
+        if not m or m.group(1) in deja:
+            continue
+        try:
+            capture = read_json(os.path.join(live_dir, name))
+        except (OSError, ValueError):
+            continue
+        by_date.setdefault(m.group(1), []).append(capture)
+
+    count = 0
+    for date_iso, captures in sorted(by_date.items()):
+        for capture in sorted(captures, key=lambda c: c.get("scraped_at") or ""):
+            append_snapshot(date_iso, capture, series_dir)
+            count += 1
+    return count
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "import":
+        n = importer_captures()
+        print(f"✅ {n} capture(s) importée(s) dans {SERIES_DIR}")
+        return
+
+    if len(sys.argv) < 2:
+        print("Usage: python3 cotes_store.py import | YYYY-MM-DD [R1 C3]", file=sys.stderr)
+        sys.exit(1)
+
+    date_iso = sys.argv[1]
+    if len(sys.argv) >= 4:
+        reunion = int(sys.argv[2].upper().lstrip("R"))
+        course = int(sys.argv[3].upper().lstrip("C"))
+        courbes = {(reunion, course): drift_course(date_iso, reunion, course)}
+    else:
+        courbes = drift_jour(date_iso)
+
+    for (reunion, course), courbe in courbes.items():
+        if not courbe:
+            print(f"❌ R{reunion}C{course}: aucune capture le {date_iso}")
+            continue
+        print(f"\n🏟️  {courbe['hippodrome']} R{reunion}C{course} — {len(courbe['t'])} snapshot(s)")
+        for num, serie in sorted(courbe["runners"].items(), key=lambda kv: kv[0] or 0):
+            points = " → ".join(f"{c}" for c in serie["cote"])
+            print(f"  #{num:>2} ref {serie['ref'][-1]}  {points}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Catalogue SQLite des courses, participants et cotes live.
+
+Maintenu en continu par les scrapers (upsert après chaque fichier écrit) :
+  - scraper_courses_pmu.scrape_day  → upsert_reunion_file(data/courses/...)
+  - scraper_pre_course              → upsert_capture(date, capture)
+
+et resynchronisable à tout moment depuis les fichiers (seuls les fichiers
+dont mtime/taille ont changé sont relus) :
+    python3 courses_catalog.py sync
+    python3 courses_catalog.py rebuild
+
+Les requêtes sont dans catalog_query.py.
+
+Tables :
+  fichiers(fichier, mtime, size)            fichiers déjà indexés
+  courses(id, fichier, date, hippodrome, reunion, numero, nom, horaire,
+          type, distance, terrain, penetrometre, type_piste, arrivee_definitive)
+  participants(course_id, num, cheval, cheval_label, jockey, entraineur,
+               proprietaire, musique, cote, cote_reference, valeur, arrivee, ...)
+  cotes_live(date, reunion, course, num, t, hippodrome, cote, ref, tendance)
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+
+from json_io import read_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CATALOG_PATH = os.path.join(ROOT, 'data', 'catalog.sqlite')
+COURSES_DIR = os.path.join(ROOT, 'data', 'courses')
+SERIES_DIR = os.path.join(ROOT, 'data', 'cotes_live', 'series')
+
+COURSE_FILE = re.compile(r'^(\d{4}-\d{2}-\d{2})_(.+)\.json$')
+_RE_REUNION = re.compile(r'/R(\d+)$')
+# "ARCHIVIST H.PU. 4 a." → "ARCHIVIST"
+_RE_CHEVAL = re.compile(r'^(.+?)(?:\s+[A-Z]\.[A-Z]*\.?)?(?:\s+\d+\s*a\.)?$')
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fichiers (
+    fichier TEXT PRIMARY KEY,
+    mtime   REAL NOT NULL,
+    size    INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS courses (
+    id                 INTEGER PRIMARY KEY,
+    fichier            TEXT NOT NULL,
+    date               TEXT NOT NULL,
+    hippodrome         TEXT NOT NULL,
+    reunion            INTEGER,
+    numero             INTEGER NOT NULL,
+    nom                TEXT,
+    horaire            TEXT,
+    type               TEXT,
+    distance           INTEGER,
+    terrain            TEXT,
+    penetrometre       TEXT,
+    type_piste         TEXT,
+    arrivee_definitive INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (fichier, numero)
+);
+CREATE TABLE IF NOT EXISTS participants (
+    course_id      INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    num            INTEGER NOT NULL,
+    cheval         TEXT NOT NULL,
+    cheval_label   TEXT,
+    jockey         TEXT,
+    entraineur     TEXT,
+    proprietaire   TEXT,
+    musique        TEXT,
+    cote           REAL,
+    cote_reference REAL,
+    valeur         REAL,
+    nb_courses     INTEGER,
+    nb_victoires   INTEGER,
+    nb_places      INTEGER,
+    arrivee        INTEGER,
+    PRIMARY KEY (course_id, num)
+);
+CREATE TABLE IF NOT EXISTS cotes_live (
+    date       TEXT NOT NULL,
+    reunion    INTEGER NOT NULL,
+    course     INTEGER NOT NULL,
+    num        INTEGER NOT NULL,
+    t          TEXT NOT NULL,
+    hippodrome TEXT,
+    cote       REAL,
+    ref        REAL,
+    tendance   TEXT,
+    PRIMARY KEY (date, reunion, course, num, t)
+);
+CREATE INDEX IF NOT EXISTS idx_courses_date       ON courses(date);
+CREATE INDEX IF NOT EXISTS idx_courses_hippodrome ON courses(hippodrome, date);
+CREATE INDEX IF NOT EXISTS idx_courses_type       ON courses(type, distance);
+CREATE INDEX IF NOT EXISTS idx_courses_distance   ON courses(distance);
+CREATE INDEX IF NOT EXISTS idx_courses_reunion    ON courses(date, reunion, numero);
+CREATE INDEX IF NOT EXISTS idx_part_cheval        ON participants(cheval);
+CREATE INDEX IF NOT EXISTS idx_part_jockey        ON participants(jockey);
+CREATE INDEX IF NOT EXISTS idx_part_entraineur    ON participants(entraineur);
+"""
+
+
+def connect(path=CATALOG_PATH):
+    """Ouvre (et crée si besoin) le catalogue."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def nom_cheval(label):
+    """Nom nu du cheval à partir du libellé du scraper ("NOM H.PU. 4 a.")."""
+    label = (label or "").strip()
+    m = _RE_CHEVAL.match(label)
+    return m.group(1) if m else label
+
+
+def _int(value):
+    try:
+        return int(re.search(r'\d+', str(value)).group(0))
+    except (AttributeError, ValueError, TypeError):
+        return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+# ============================================================
+# Upserts
+# ============================================================
+
+def _insert_reunion(conn, fichier, data):
+    m = COURSE_FILE.match(fichier)
+    date_iso = m.group(1) if m else ""
+    hippodrome = data.get("hippodrome", "")
+    rm = _RE_REUNION.search(data.get("url_source", ""))
+    reunion = int(rm.group(1)) if rm else None
+
+    conn.execute("DELETE FROM courses WHERE fichier = ?", (fichier,))
+    n = 0
+    for course in data.get("courses", []):
+        numero = _int(course.get("numero"))
+        if numero is None:
+            continue
+        cur = conn.execute(
+            "INSERT OR REPLACE INTO courses (fichier, date, hippodrome, reunion, numero, nom, horaire, "
+            "type, distance, terrain, penetrometre, type_piste, arrivee_definitive) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (fichier, date_iso, hippodrome, reunion, numero, course.get("nom"), course.get("horaire"),
+             course.get("type"), _int(course.get("distance")), course.get("terrain"),
+             course.get("penetrometre"), course.get("typePiste"),
+             1 if course.get("arrivee_definitive") else 0))
+        course_id = cur.lastrowid
+        rows = []
+        for p in course.get("participants", []):
+            num = _int(p.get("n°"))
+            if num is None:
+                continue
+            arrivee = p.get("arrivee")
+            rows.append((course_id, num, nom_cheval(p.get("cheval")), p.get("cheval"),
+                         p.get("jockey"), p.get("entraineur"), p.get("propriétaire"),
+                         p.get("musique"), _float(p.get("cote")), _float(p.get("cote_reference")),
+                         _float(p.get("valeur")), p.get("nb_courses"), p.get("nb_victoires"),
+                         p.get("nb_places"), arrivee if isinstance(arrivee, int) else None))
+        conn.executemany(
+            "INSERT OR REPLACE INTO participants (course_id, num, cheval, cheval_label, jockey, "
+            "entraineur, proprietaire, musique, cote, cote_reference, valeur, nb_courses, "
+            "nb_victoires, nb_places, arrivee) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows)
+        n += 1
+    return n
+
+
+def _mark_file(conn, fichier, filepath):
+    st = os.stat(filepath)
+    conn.execute("INSERT OR REPLACE INTO fichiers (fichier, mtime, size) VALUES (?, ?, ?)",
+                 (fichier, st.st_mtime, st.st_size))
+
+
+def upsert_reunion_file(filepath, conn=None):
+    """(Ré)indexe un fichier data/courses/{date}_{hippo}.json. Retourne le nb de courses."""
+    own = conn is None
+    conn = conn or connect()
+    try:
+        data = read_json(filepath)
+        fichier = os.path.basename(filepath)
+        with conn:
+            n = _insert_reunion(conn, fichier, data)
+            _mark_file(conn, fichier, filepath)
+        return n
+    finally:
+        if own:
+            conn.close()
+
+
+def _insert_capture(conn, date_iso, snap):
+    rows = [(date_iso, snap.get("r"), snap.get("c"), num, snap.get("t"), snap.get("hippo"),
+             cote, ref, tend)
+            for num, cote, ref, tend in zip(snap["num"], snap["cote"], snap["ref"], snap["tend"])
+            if num is not None]
+    conn.executemany(
+        "INSERT OR REPLACE INTO cotes_live (date, reunion, course, num, t, hippodrome, cote, ref, tendance) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+
+def upsert_capture(date_iso, capture, conn=None):
+    """Indexe une capture de cotes (format scraper_pre_course.scrape_cotes_course)."""
+    from cotes_store import snapshot_from_capture
+
+    own = conn is None
+    conn = conn or connect()
+    try:
+        with conn:
+            return _insert_capture(conn, date_iso, snapshot_from_capture(capture))
+    finally:
+        if own:
+            conn.close()
+
+
+def hook(func, *args):
+    """Appel d'upsert depuis un scraper : une erreur de catalogue ne doit
+    jamais faire échouer l'écriture des fichiers (source de vérité)."""
+    try:
+        return func(*args)
+    except (sqlite3.Error, OSError, ValueError) as e:
+        logger.warning(f"  ⚠️  Catalogue non mis à jour: {e}")
+        return None
+
+
+# ============================================================
+# Synchronisation depuis les fichiers
+# ============================================================
+
+def sync(conn=None, courses_dir=COURSES_DIR, series_dir=SERIES_DIR, full=False):
+    """Indexe les fichiers nouveaux ou modifiés (mtime/taille), retire les disparus.
+
+    Retourne {"fichiers": n relus, "supprimes": n, "inchanges": n}.
+    """
+    own = conn is None
+    conn = conn or connect()
+    try:
+        # full : tout relire, mais connaître les fichiers indexés pour
+        # retirer les disparus
+        known = {r["fichier"]: (r["mtime"], r["size"])
+                 for r in conn.execute("SELECT fichier, mtime, size FROM fichiers")}
+        stats = {"fichiers": 0, "supprimes": 0, "inchanges": 0}
+        presents = set()
+
+        with conn:
+            for name in sorted(os.listdir(courses_dir)):
+                if not COURSE_FILE.match(name):
+                    continue
+                presents.add(name)
+                path = os.path.join(courses_dir, name)
+                st = os.stat(path)
+                if not full and known.get(name) == (st.st_mtime, st.st_size):
+                    stats["inchanges"] += 1
+                    continue
+                try:
+                    data = read_json(path)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"  ⚠️  {name}: {e}")
+                    continue
+                _insert_reunion(conn, name, data)
+                _mark_file(conn, name, path)
+                stats["fichiers"] += 1
+
+            if os.path.isdir(series_dir):
+                from cotes_store import read_snapshots
+                for name in sorted(os.listdir(series_dir)):
+                    if not name.endswith(".jsonl"):
+                        continue
+                    key = f"series/{name}"
+                    presents.add(key)
+                    path = os.path.join(series_dir, name)
+                    st = os.stat(path)
+                    if not full and known.get(key) == (st.st_mtime, st.st_size):
+                        stats["inchanges"] += 1
+                        continue
+                    date_iso = name[:-len(".jsonl")]
+                    for snap in read_snapshots(date_iso, series_dir):
+                        _insert_capture(conn, date_iso, snap)
+                    _mark_file(conn, key, path)
+                    stats["fichiers"] += 1
+
+            for name in set(known) - presents:
+                if name.startswith("series/"):
+                    # Une série par jour : ses cotes live partent avec elle
+                    conn.execute("DELETE FROM cotes_live WHERE date = ?",
+                                 (name[len("series/"):-len(".jsonl")],))
+                else:
+                    conn.execute("DELETE FROM courses WHERE fichier = ?", (name,))
+                conn.execute("DELETE FROM fichiers WHERE fichier = ?", (name,))
+                stats["supprimes"] += 1
+        return stats
+    finally:
+        if own:
+            conn.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "sync"
+    if cmd not in ("sync", "rebuild"):
+        print("Usage: python3 courses_catalog.py [sync|rebuild]", file=sys.stderr)
+        sys.exit(1)
+
+    if cmd == "rebuild" and os.path.exists(CATALOG_PATH):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(CATALOG_PATH + suffix):
+                os.remove(CATALOG_PATH + suffix)
+
+    t0 = time.perf_counter()
+    conn = connect()
+    stats = sync(conn)
+    nb_courses = conn.execute("SELECT COUNT(*) FROM courses").fetchone()[0]
+    nb_part = conn.execute("SELECT COUNT(*) FROM participants").fetchone()[0]
+    conn.close()
+    logger.info(f"✅ {CATALOG_PATH}: {stats['fichiers']} fichier(s) relu(s), "
+                f"{stats['inchanges']} inchangé(s), {stats['supprimes']} supprimé(s) "
+                f"— {nb_courses} courses, {nb_part} participants en {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
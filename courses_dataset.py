@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Dataset columnar de tous les participants de data/courses/.
+
+Les scripts d'analyse font tous glob("data/courses/2026-*.json") puis
+json.load de chaque fichier (1000+ fichiers indentés, ~70 MB) avant de
+parcourir des dicts imbriqués. Ici tout est aplati une fois en colonnes
+typées NumPy, une colonne = un fichier .npy, relisible en memory-map.
+
+Colonnes texte dictionnaire-encodées : {col}.npy contient des codes int32,
+{col}.cat.npy les valeurs distinctes (code -1 = absent).
+
+    data/dataset/participants/
+        meta.json                 # colonnes, nb lignes, date de build
+        date.npy                  # datetime64[D]
+        hippodrome.npy + hippodrome.cat.npy
+        ...
+
+Colonnes *_id (int32) : identifiants d'entités internés par entity_ids.py
+(cheval, jockey, entraineur, proprietaire, eleveur), -1 si absent ; les
+jointures avec les classements se font sur ces entiers.
+
+Une ligne = un participant. Les participants d'une même course sont
+contigus ; course_id (int32) les regroupe et course_start.npy donne le
+premier indice de chaque course (utilisable avec np.add.reduceat).
+
+Usage:
+    python3 courses_dataset.py build
+    python3 courses_dataset.py info
+
+    from courses_dataset import load_dataset
+    ds = load_dataset()
+    cotes = ds["cote"]                  # float32, NaN si absente
+    hippos = ds.decode("hippodrome")    # tableau de str
+    jockeys = ds["jockey_id"]           # int32, ids de entity_ids
+"""
+
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from entity_ids import load_ids
+from json_io import read_json, write_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+COURSES_DIR = os.path.join(ROOT, 'data', 'courses')
+DATASET_DIR = os.path.join(ROOT, 'data', 'dataset', 'participants')
+
+FILE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})_(.+)\.json$')
+
+# nom de colonne → dtype NumPy (None = texte dictionnaire-encodé)
+COLUMNS = {
+    "date": "datetime64[D]",
+    "fichier": None,
+    "hippodrome": None,
+    "course_id": np.int32,
+    "course_numero": np.int16,
+    "course_nom": None,
+    "horaire": None,
+    "type": None,
+    "terrain": None,
+    "distance": np.int32,
+    "arrivee_definitive": np.bool_,
+    "nb_partants": np.int16,
+    "numPmu": np.int16,
+    "cheval": None,
+    "jockey": None,
+    "entraineur": None,
+    "proprietaire": None,
+    "eleveur": None,
+    "musique": None,
+    "cote": np.float32,
+    "cote_reference": np.float32,
+    "valeur": np.float32,
+    "nb_courses": np.int32,
+    "nb_victoires": np.int32,
+    "nb_places": np.int32,
+    "arrivee": np.int16,          # 0 = pas d'arrivée connue
+}
+
+# colonne texte → (colonne id int32, type d'entité de entity_ids)
+ID_COLUMNS = {
+    "cheval": ("cheval_id", "chevaux"),
+    "jockey": ("jockey_id", "jockeys"),
+    "entraineur": ("entraineur_id", "entraineurs"),
+    "proprietaire": ("proprietaire_id", "proprietaires"),
+    "eleveur": ("eleveur_id", "eleveurs"),
+}
+
+
+def _int(value, default=0):
+    try:
+        return int(re.search(r'-?\d+', str(value)).group(0))
+    except (AttributeError, ValueError, TypeError):
+        return default
+
+
+def _float(value):
+    try:
+        x = float(value)
+    except (ValueError, TypeError):
+        return float("nan")
+    return x if x > 0 else float("nan")
+
+
+def list_course_files(courses_dir=COURSES_DIR):
+    return sorted(name for name in os.listdir(courses_dir)
+                  if FILE_PATTERN.match(name))
+
+
+def iter_rows(courses_dir=COURSES_DIR):
+    """Aplatit chaque participant en dict de colonnes (ordre: fichier, course)."""
+    course_id = 0
+    for name in list_course_files(courses_dir):
+        date_iso = FILE_PATTERN.match(name).group(1)
+        try:
+            data = read_json(os.path.join(courses_dir, name))
+        except (OSError, ValueError):
+            continue
+        hippodrome = data.get("hippodrome", "")
+        for course in data.get("courses", []):
+            participants = course.get("participants", [])
+            if not participants:
+                continue
+            for p in participants:
+                arrivee = p.get("arrivee")
+                yield {
+                    "date": date_iso,
+                    "fichier": name,
+                    "hippodrome": hippodrome,
+                    "course_id": course_id,
+                    "course_numero": _int(course.get("numero")),
+                    "course_nom": course.get("nom", ""),
+                    "horaire": course.get("horaire", ""),
+                    "type": course.get("type", ""),
+                    "terrain": course.get("terrain", ""),
+                    "distance": _int(course.get("distance")),
+                    "arrivee_definitive": bool(course.get("arrivee_definitive")),
+                    "nb_partants": len(participants),
+                    "numPmu": _int(p.get("n°")),
+                    "cheval": p.get("cheval", ""),
+                    "jockey": p.get("jockey", ""),
+                    "entraineur": p.get("entraineur", ""),
+                    "proprietaire": p.get("propriétaire", ""),
+                    "eleveur": p.get("éleveurs", ""),
+                    "musique": p.get("musique", ""),
+                    "cote": _float(p.get("cote")),
+                    "cote_reference": _float(p.get("cote_reference")),
+                    "valeur": _float(p.get("valeur")),
+                    "nb_courses": p.get("nb_courses") or 0,
+                    "nb_victoires": p.get("nb_victoires") or 0,
+                    "nb_places": p.get("nb_places") or 0,
+                    "arrivee": arrivee if isinstance(arrivee, int) else 0,
+                }
+            course_id += 1
+
+
+def encode_strings(values):
+    """Dictionnaire-encode une liste de str → (codes int32, catégories U)."""
+    categories = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        if not v:
+            codes[i] = -1
+            continue
+        code = categories.get(v)
+        if code is None:
+            code = categories[v] = len(categories)
+        codes[i] = code
+    cat = np.array(list(categories), dtype=str) if categories else np.array([], dtype="U1")
+    return codes, cat
+
+
+def build_dataset(courses_dir=COURSES_DIR, out_dir=DATASET_DIR, ids=None):
+    """(Re)construit le dataset complet. Retourne le nombre de lignes.
+
+    Les noms inconnus du dictionnaire d'entités y sont ajoutés (ids stables
+    d'un build à l'autre).
+    """
+    ids = ids or load_ids()
+    columns = {name: [] for name in COLUMNS}
+    for row in iter_rows(courses_dir):
+        for name in COLUMNS:
+            columns[name].append(row[name])
+
+    os.makedirs(out_dir, exist_ok=True)
+    n = len(columns["date"])
+    for name, dtype in COLUMNS.items():
+        if dtype is None:
+            codes, cat = encode_strings(columns[name])
+            np.save(os.path.join(out_dir, f"{name}.npy"), codes)
+            np.save(os.path.join(out_dir, f"{name}.cat.npy"), cat)
+            if name in ID_COLUMNS:
+                id_col, kind = ID_COLUMNS[name]
+                # ids calculés par catégorie puis propagés aux lignes
+                cat_ids = np.append(ids[kind].ids(cat.tolist()), np.int32(-1))
+                np.save(os.path.join(out_dir, f"{id_col}.npy"), cat_ids[codes])
+        else:
+            np.save(os.path.join(out_dir, f"{name}.npy"), np.array(columns[name], dtype=dtype))
+
+    course_ids = np.array(columns["course_id"], dtype=np.int32)
+    starts = np.flatnonzero(np.r_[True, course_ids[1:] != course_ids[:-1]]) if n else np.array([], dtype=np.int64)
+    np.save(os.path.join(out_dir, "course_start.npy"), starts.astype(np.int64))
+
+    ids.save()
+
+    columns_meta = {name: ("dict" if dtype is None else np.dtype(dtype).name)
+                    for name, dtype in COLUMNS.items()}
+    columns_meta.update({id_col: "int32" for id_col, _ in ID_COLUMNS.values()})
+    meta = {
+        "built_at": datetime.now().isoformat(timespec='seconds'),
+        "rows": n,
+        "courses": int(len(starts)),
+        "columns": columns_meta,
+    }
+    write_json(os.path.join(out_dir, "meta.json"), meta)
+    return n
+
+
+class ParticipantsDataset:
+    """Accès aux colonnes du dataset (memory-map par défaut)."""
+
+    def __init__(self, path=DATASET_DIR, mmap=True):
+        self.path = path
+        self.mmap_mode = "r" if mmap else None
+        self.meta = read_json(os.path.join(path, "meta.json"))
+        self._cache = {}
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def columns(self):
+        return list(self.meta["columns"])
+
+    def _load(self, filename):
+        if filename not in self._cache:
+            self._cache[filename] = np.load(os.path.join(self.path, filename),
+                                            mmap_mode=self.mmap_mode)
+        return self._cache[filename]
+
+    def __getitem__(self, name):
+        """Colonne brute (codes int32 pour les colonnes texte)."""
+        if name not in self.meta["columns"] and name != "course_start":
+            raise KeyError(name)
+        return self._load(f"{name}.npy")
+
+    def categories(self, name):
+        return self._load(f"{name}.cat.npy")
+
+    def decode(self, name):
+        """Colonne texte décodée en tableau de str ('' si absent)."""
+        codes = np.asarray(self[name])
+        cat = np.append(np.asarray(self.categories(name)), "")
+        return cat[codes]          # code -1 → dernier élément ""
+
+    def code(self, name, value):
+        """Code d'une valeur texte (-1 si inconnue), pour filtrer sans décoder."""
+        hits = np.flatnonzero(np.asarray(self.categories(name)) == value)
+        return int(hits[0]) if len(hits) else -1
+
+
+def load_dataset(path=DATASET_DIR, mmap=True):
+    return ParticipantsDataset(path, mmap=mmap)
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if cmd == "build":
+        t0 = time.perf_counter()
+        n = build_dataset()
+        size = sum(os.path.getsize(os.path.join(DATASET_DIR, f)) for f in os.listdir(DATASET_DIR))
+        print(f"✅ {DATASET_DIR} — {n} participants, {size / 1e6:.1f} MB "
+              f"en {time.perf_counter() - t0:.1f}s")
+    elif cmd == "info":
+        t0 = time.perf_counter()
+        ds = load_dataset()
+        cotes = np.asarray(ds["cote"])
+        print(f"📦 {len(ds)} participants, {ds.meta['courses']} courses (build {ds.meta['built_at']})")
+        print(f"   colonnes: {', '.join(ds.columns)}")
+        print(f"   cote renseignée: {np.isfinite(cotes).mean() * 100:.1f}% "
+              f"— chargement {1000 * (time.perf_counter() - t0):.1f} ms")
+    else:
+        print("Usage: python3 courses_dataset.py [build|info]", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Index frontend incrémentaux : data/courses/_index.json (+ shards mensuels
+data/courses/_index/YYYY-MM.json) et data/cotes_live/_index.json.
+
+Chaque index est adossé à un manifeste persistant (data/.manifests/,
+non versionné) : nom de fichier → mtime, taille et entrée d'index déjà
+calculée. Un passage complet ne relit que les fichiers nouveaux ou
+modifiés ; les scrapers appellent update_*_index([chemin]) juste après
+avoir écrit un fichier, sans re-lister le répertoire.
+
+Sans manifeste (checkout neuf en CI, où les mtimes sont ceux du
+checkout), il est amorcé depuis les entrées de l'index versionné : un
+fichier dont la taille n'a pas changé garde son entrée sans être relu.
+
+Usage:
+    from data_index import update_courses_index, update_cotes_live_index
+    update_courses_index()                      # passage complet
+    update_cotes_live_index([filepath])         # hook après écriture
+
+Shards mensuels : une entrée résumée par fichier de réunion, pour trier
+les fichiers sans les ouvrir :
+
+    {"name": "2026-04-12_parislongchamp.json", "size": 91234,
+     "date": "2026-04-12", "hippodrome": "PARISLONGCHAMP",
+     "nb_courses": 8, "nb_partants": 97, "disciplines": ["Plat"],
+     "nb_arrivees_definitives": 8, "premier_depart": "13h35",
+     "dernier_depart": "17h25"}
+
+_index.json garde sa liste plate {name, size} (lue par index.html) et
+référence les shards : "shards": [{"mois", "path", "count"}].
+
+CLI : scripts/update_courses_index.py, scripts/update_cotes_live_index.py
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timezone
+
+from json_io import read_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+COURSES_DIR = os.path.join(ROOT, 'data', 'courses')
+LIVE_DIR = os.path.join(ROOT, 'data', 'cotes_live')
+MANIFEST_DIR = os.path.join(ROOT, 'data', '.manifests')
+SHARDS_DIRNAME = '_index'
+
+COURSE_PATTERN = re.compile(r'^(\d{4}-\d{2})-\d{2}_.+\.json$')
+LIVE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})_(.+?)_R(\d+)C(\d+)_live\.json$')
+
+logger = logging.getLogger(__name__)
+
+# Les scrapers peuvent écrire depuis plusieurs threads (backfill)
+_lock = threading.Lock()
+
+
+class Manifest:
+    """{nom: {"mtime", "size", "entry"}} persisté en JSON (écriture atomique)."""
+
+    def __init__(self, path, version=1):
+        self.path = path
+        self.version = version
+        self.entries = {}
+        self.loaded = False
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            # Format d'entrée changé → tout recalculer
+            if data.get("version", 1) == version:
+                self.entries = data.get("files", {})
+                self.loaded = True
+
+    def seed(self, entries):
+        """Amorce depuis les entrées d'un index versionné (nom + taille,
+        mtime inconnu : validé à la taille seule au premier passage)."""
+        for entry in entries:
+            if entry.get("name") and entry.get("size") is not None:
+                self.entries[entry["name"]] = {"mtime": None, "size": entry["size"], "entry": entry}
+
+    def fresh(self, name, st):
+        known = self.entries.get(name)
+        if not known or known["size"] != st.st_size:
+            return False
+        if known["mtime"] is None:
+            known["mtime"] = st.st_mtime
+            return True
+        return known["mtime"] == st.st_mtime
+
+    def set(self, name, st, entry):
+        self.entries[name] = {"mtime": st.st_mtime, "size": st.st_size, "entry": entry}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.version, "files": self.entries}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+
+def _accept(name):
+    return name.endswith('.json') and not name.startswith(('_', '.'))
+
+
+def _names(directory, paths):
+    """Noms des fichiers donnés qui appartiennent au répertoire indexé."""
+    # Fichiers hors du répertoire indexé (OUTPUT_DIR modifié...) ignorés
+    directory_abs = os.path.abspath(directory)
+    return [os.path.basename(p) for p in paths
+            if _accept(os.path.basename(p))
+            and os.path.dirname(os.path.abspath(p)) == directory_abs]
+
+
+def _refresh(directory, manifest, build_entry, paths=None, force=()):
+    """Met à jour le manifeste. paths=None → scan complet du répertoire
+    (fichiers disparus retirés) ; sinon seulement les fichiers donnés.
+    Les noms de `force` (fichiers que l'appelant vient d'écrire) sont
+    toujours relus : même taille et mtime amorcé ne prouvent rien.
+
+    Retourne le nombre d'entrées recalculées.
+    """
+    if paths is None:
+        names = [n for n in os.listdir(directory) if _accept(n)]
+        for gone in set(manifest.entries) - set(names):
+            del manifest.entries[gone]
+    else:
+        names = _names(directory, paths)
+    force = set(force)
+
+    recalcules = 0
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            manifest.entries.pop(name, None)
+            continue
+        if name not in force and manifest.fresh(name, st):
+            continue
+        entry = build_entry(path, name, st)
+        if entry is None:
+            manifest.entries.pop(name, None)
+            continue
+        manifest.set(name, st, entry)
+        recalcules += 1
+    return recalcules
+
+
+def _write_json(path, payload):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _write_index(directory, manifest):
+    files = [manifest.entries[name]["entry"] for name in sorted(manifest.entries)]
+    _write_json(os.path.join(directory, '_index.json'), {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'count': len(files),
+        'files': files,
+    })
+    return len(files)
+
+
+def _index_entries(directory):
+    """Entrées de l'_index.json versionné d'un répertoire ([] si absent)."""
+    try:
+        return read_json(os.path.join(directory, '_index.json')).get("files", [])
+    except (OSError, ValueError):
+        return []
+
+
+def _update(directory, manifest_name, build_entry, paths, write_index=_write_index, version=1,
+            seed_entries=_index_entries):
+    with _lock:
+        manifest = Manifest(os.path.join(MANIFEST_DIR, manifest_name), version)
+        force = _names(directory, paths) if paths is not None else ()
+        # Hook sans manifeste existant : un scan complet est nécessaire une fois,
+        # amorcé par l'index versionné pour ne relire que ce qui a changé
+        # (hors fichiers nommés, toujours relus)
+        if not manifest.loaded:
+            manifest.seed(seed_entries(directory))
+            paths = None
+        recalcules = _refresh(directory, manifest, build_entry, paths, force)
+        if paths is not None and not recalcules:
+            return {"count": len(manifest.entries), "recalcules": 0}
+        count = write_index(directory, manifest)
+        manifest.save()
+        return {"count": count, "recalcules": recalcules}
+
+
+# ============================================================
+# data/courses/_index.json
+# ============================================================
+
+def resume_reunion(data):
+    """Résumé d'un fichier de réunion (dict déjà chargé)."""
+    courses = data.get("courses", [])
+    horaires = sorted(c["horaire"] for c in courses if c.get("horaire"))
+    return {
+        'hippodrome': data.get("hippodrome", ""),
+        'nb_courses': len(courses),
+        'nb_partants': sum(len(c.get("participants", [])) for c in courses),
+        'disciplines': sorted({c["type"] for c in courses if c.get("type")}),
+        'nb_arrivees_definitives': sum(1 for c in courses if c.get("arrivee_definitive")),
+        'premier_depart': horaires[0] if horaires else None,
+        'dernier_depart': horaires[-1] if horaires else None,
+    }
+
+
+def _courses_entry(path, name, st):
+    entry = {'name': name, 'size': st.st_size}
+    m = COURSE_PATTERN.match(name)
+    if not m:
+        return entry
+    entry['date'] = name[:10]
+    try:
+        entry.update(resume_reunion(read_json(path)))
+    except (OSError, ValueError) as e:
+        logger.warning(f"  ⚠️  {name}: résumé impossible ({e})")
+    return entry
+
+
+def _write_courses_index(directory, manifest):
+    """_index.json plat (compatible frontend) + un shard par mois."""
+    shards_dir = os.path.join(directory, SHARDS_DIRNAME)
+    os.makedirs(shards_dir, exist_ok=True)
+    generated_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    by_month = {}
+    flat = []
+    for name in sorted(manifest.entries):
+        entry = manifest.entries[name]["entry"]
+        flat.append({'name': entry['name'], 'size': entry['size']})
+        m = COURSE_PATTERN.match(name)
+        if m:
+            by_month.setdefault(m.group(1), []).append(entry)
+
+    shards = []
+    for mois, entries in sorted(by_month.items()):
+        shard_path = os.path.join(shards_dir, f"{mois}.json")
+        shards.append({'mois': mois, 'path': f"{SHARDS_DIRNAME}/{mois}.json", 'count': len(entries)})
+        # Mois inchangés non réécrits (pas de diff git sur les vieux shards)
+        if _shard_files(shard_path) == entries:
+            continue
+        _write_json(shard_path, {
+            'generated_at': generated_at,
+            'mois': mois,
+            'count': len(entries),
+            'files': entries,
+        })
+    for name in os.listdir(shards_dir):
+        if name.endswith('.json') and name[:-len('.json')] not in by_month:
+            os.remove(os.path.join(shards_dir, name))
+
+    _write_json(os.path.join(directory, '_index.json'), {
+        'generated_at': generated_at,
+        'count': len(flat),
+        'files': flat,
+        'shards': shards,
+    })
+    return len(flat)
+
+
+def update_courses_index(paths=None, courses_dir=COURSES_DIR):
+    """Régénère data/courses/_index.json et ses shards mensuels.
+
+    Retourne {"count", "recalcules"}.
+    """
+    return _update(courses_dir, 'courses_index.json', _courses_entry, paths,
+                   write_index=_write_courses_index, version=2, seed_entries=_courses_seed)
+
+
+def _courses_seed(directory):
+    """Entrées complètes des shards mensuels ; {name, size} de l'index plat
+    pour les fichiers hors shard (nom non daté)."""
+    entries = {e["name"]: e for e in _index_entries(directory)}
+    shards_dir = os.path.join(directory, SHARDS_DIRNAME)
+    try:
+        shards = [n for n in os.listdir(shards_dir) if n.endswith('.json')]
+    except OSError:
+        shards = []
+    for name in shards:
+        for entry in _shard_files(os.path.join(shards_dir, name)) or []:
+            entries[entry["name"]] = entry
+    # Fichier daté absent des shards : son résumé est à recalculer
+    return [e for n, e in entries.items() if not COURSE_PATTERN.match(n) or 'date' in e]
+
+
+def _shard_files(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get("files")
+    except (OSError, ValueError):
+        return None
+
+
+def load_shard(mois, courses_dir=COURSES_DIR):
+    """Entrées résumées d'un mois ("2026-04"), [] si absent."""
+    return _shard_files(os.path.join(courses_dir, SHARDS_DIRNAME, f"{mois}.json")) or []
+
+
+# ============================================================
+# data/cotes_live/_index.json
+# ============================================================
+
+def _cotes_live_entry(path, name, st):
+    m = LIVE_PATTERN.match(name)
+    if not m:
+        return None
+    scraped_at = None
+    try:
+        scraped_at = read_json(path).get('scraped_at')
+    except Exception:
+        pass
+    return {
+        'name': name,
+        'size': st.st_size,
+        'date': m.group(1),
+        'hippo': m.group(2),
+        'reunion': int(m.group(3)),
+        'numero': int(m.group(4)),
+        'scraped_at': scraped_at,
+    }
+
+
+def update_cotes_live_index(paths=None, live_dir=LIVE_DIR):
+    """Régénère data/cotes_live/_index.json. Retourne {"count", "recalcules"}."""
+    return _update(live_dir, 'cotes_live_index.json', _cotes_live_entry, paths, version=2)
+
+
+def hook(func, *args):
+    """Appel depuis un scraper : un échec d'index n'interrompt pas le scraping."""
+    try:
+        return func(*args)
+    except (OSError, ValueError) as e:
+        logger.warning(f"  ⚠️  Index non mis à jour: {e}")
+        return None
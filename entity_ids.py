@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Dictionnaire persistant nom → identifiant entier des entités hippiques.
+
+Chevaux, jockeys, entraîneurs, propriétaires et éleveurs apparaissent
+comme chaînes libres partout (participants des fichiers de courses,
+JSON de classements, CSV France Galop), avec des variantes d'écriture :
+"D.COTTIN" / "D. COTTIN", "Ecurie D' AJAC" / "ECURIE D'AJAC", accents,
+libellé cheval "NOM H.PU. 4 a.". Chaque nom est normalisé une fois
+(cle()) puis interné : un id int32 stable, jamais réattribué, utilisable
+dans les stores NumPy (courses_dataset, rankings_history) à la place des
+chaînes.
+
+Les variantes connues qui ne se réduisent pas à la même clé sont
+enregistrées comme alias (ex: data/claude_correspondances.json,
+NomPostal ≠ Nom dans les classements).
+
+    data/entity_ids.json (non versionné, append-only)
+    {"version": 1,
+     "kinds": {"jockeys": {"noms": ["MICKAEL BARZALONA", ...],   # id = indice
+                           "alias": {"M.BARZALONA": 0, ...}}}}
+
+Usage:
+    python3 entity_ids.py build        # classements + fichiers de courses
+    python3 entity_ids.py info
+    python3 entity_ids.py get jockeys "C. DEMURO"
+
+    from entity_ids import load_ids
+    ids = load_ids()
+    ids["jockeys"].id("MICKAEL BARZALONA")        # crée si inconnu
+    ids["jockeys"].get("M. BARZALONA")            # -1 si inconnu
+    ids["chevaux"].ids(noms)                      # np.int32
+"""
+
+import os
+import re
+import sys
+import threading
+import unicodedata
+
+import numpy as np
+
+from json_io import read_json, write_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'data')
+IDS_PATH = os.path.join(DATA_DIR, 'entity_ids.json')
+COURSES_DIR = os.path.join(DATA_DIR, 'courses')
+CORRESPONDANCES_PATH = os.path.join(DATA_DIR, 'claude_correspondances.json')
+
+VERSION = 1
+KINDS = ("chevaux", "jockeys", "entraineurs", "proprietaires", "eleveurs")
+
+# Champ participant (fichiers de courses) → type d'entité
+CHAMPS_PARTICIPANT = {
+    "cheval": "chevaux",
+    "jockey": "jockeys",
+    "entraineur": "entraineurs",
+    "propriétaire": "proprietaires",
+    "éleveurs": "eleveurs",
+}
+
+# Libellé du scraper : "NOM H.PU. 4 a." → "NOM" (cf. courses_catalog.nom_cheval)
+_RE_CHEVAL = re.compile(r'^(.+?)(?:\s+[A-Z]\.[A-Z]*\.?)?(?:\s+\d+\s*a\.)?$')
+_RE_PONCTUATION = re.compile(r"\s*([.'])\s*")
+_RE_ESPACES = re.compile(r'\s+')
+_RE_HOMONYME = re.compile(r'#\d+$')
+
+_lock = threading.Lock()
+
+
+def kind_for_source(source):
+    """"jockeys_2025.csv" / "cravache_or" → "jockeys" (None si inconnue)."""
+    base = os.path.basename(source)
+    for suffix in (".csv", ".json", "_ponderated_latest", "_2025"):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    if base == "cravache_or":
+        return "jockeys"
+    return base if base in KINDS else None
+
+
+def cle(nom, kind=None):
+    """Clé normalisée : majuscules sans accents, espaces autour de . et '
+    supprimés, espaces multiples réduits. Pour les chevaux, le suffixe
+    sexe/race/âge du libellé PMU est retiré."""
+    if not nom:
+        return ""
+    nom = _RE_HOMONYME.sub("", str(nom).strip())
+    if kind == "chevaux":
+        m = _RE_CHEVAL.match(nom)
+        if m:
+            nom = m.group(1)
+    if not nom.isascii():
+        nom = unicodedata.normalize("NFKD", nom)
+        nom = "".join(c for c in nom if not unicodedata.combining(c))
+    nom = nom.upper()
+    nom = _RE_PONCTUATION.sub(r"\1", nom)
+    return _RE_ESPACES.sub(" ", nom).strip()
+
+
+class Dictionnaire:
+    """Noms internés d'un type d'entité : id = indice dans noms."""
+
+    def __init__(self, kind, noms=None, alias=None):
+        self.kind = kind
+        self.noms = list(noms or [])
+        self.alias = dict(alias or {})
+        # noms déjà normalisés (cle() n'est pas réappliquée au rechargement)
+        self.index = {nom: i for i, nom in enumerate(self.noms)}
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.noms)
+
+    def get(self, nom):
+        """Id du nom ou d'un de ses alias, -1 si inconnu."""
+        k = cle(nom, self.kind)
+        i = self.index.get(k)
+        if i is None:
+            i = self.alias.get(k, -1)
+        return i
+
+    def id(self, nom):
+        """Id du nom, créé s'il est inconnu (-1 pour un nom vide)."""
+        i = self.get(nom)
+        if i >= 0:
+            return i
+        k = cle(nom, self.kind)
+        if not k:
+            return -1
+        i = self.index[k] = len(self.noms)
+        self.noms.append(k)
+        self.dirty = True
+        return i
+
+    def ids(self, noms, creer=True):
+        """Tableau int32 des ids (-1 si vide ou inconnu et creer=False)."""
+        lookup = self.id if creer else self.get
+        memo = {}
+        out = np.empty(len(noms), dtype=np.int32)
+        for j, nom in enumerate(noms):
+            i = memo.get(nom)
+            if i is None:
+                i = memo[nom] = lookup(nom)
+            out[j] = i
+        return out
+
+    def nom(self, i):
+        return self.noms[i] if 0 <= i < len(self.noms) else None
+
+    def ajouter_alias(self, variante, nom):
+        """Fait pointer variante vers l'id de nom (créé si besoin).
+
+        Retourne False si la variante est déjà un nom canonique distinct
+        (les deux entités existent séparément : on ne les fusionne pas).
+        """
+        k = cle(variante, self.kind)
+        if not k:
+            return False
+        i = self.id(nom)
+        if k in self.index:
+            return self.index[k] == i
+        if self.alias.get(k) != i:
+            self.alias[k] = i
+            self.dirty = True
+        return True
+
+    def to_json(self):
+        return {"noms": self.noms, "alias": self.alias}
+
+
+class EntityIds:
+    """Les cinq dictionnaires, persistés dans data/entity_ids.json."""
+
+    def __init__(self, path=IDS_PATH):
+        self.path = path
+        data = {}
+        if os.path.exists(path):
+            try:
+                data = read_json(path)
+            except (OSError, ValueError):
+                data = {}
+        if data.get("version") != VERSION:
+            data = {}
+        kinds = data.get("kinds", {})
+        self.dicos = {kind: Dictionnaire(kind, kinds.get(kind, {}).get("noms"),
+                                         kinds.get(kind, {}).get("alias"))
+                      for kind in KINDS}
+
+    def __getitem__(self, kind):
+        return self.dicos[kind]
+
+    @property
+    def dirty(self):
+        return any(d.dirty for d in self.dicos.values())
+
+    def save(self, force=False):
+        """Écrit le fichier si un id ou un alias a été ajouté."""
+        if not (force or self.dirty):
+            return False
+        with _lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            write_json(self.path, {"version": VERSION,
+                                   "kinds": {k: d.to_json() for k, d in self.dicos.items()}})
+        for d in self.dicos.values():
+            d.dirty = False
+        return True
+
+    # ---------- alimentation ----------
+
+    def ingerer_classements(self, data_dir=DATA_DIR):
+        """Noms des JSON de classements ; NomPostal ≠ Nom devient un alias."""
+        fichiers = 0
+        for name in sorted(os.listdir(data_dir)):
+            kind = kind_for_source(name) if name.endswith(".json") else None
+            if kind is None:
+                continue
+            try:
+                data = read_json(os.path.join(data_dir, name))
+            except (OSError, ValueError):
+                continue
+            resultats = data.get("resultats", []) if isinstance(data, dict) else []
+            dico = self.dicos[kind]
+            for item in resultats:
+                nom = item.get("Nom") or item.get("NomPostal")
+                if not nom:
+                    continue
+                dico.id(nom)
+                postal = item.get("NomPostal")
+                if postal and postal != nom:
+                    dico.ajouter_alias(postal, nom)
+            fichiers += 1
+        return fichiers
+
+    def ingerer_participants(self, participants):
+        """Noms d'une liste de participants (format data/courses)."""
+        for p in participants:
+            for champ, kind in CHAMPS_PARTICIPANT.items():
+                if p.get(champ):
+                    self.dicos[kind].id(p[champ])
+
+    def ingerer_courses(self, courses_dir=COURSES_DIR):
+        fichiers = 0
+        for name in sorted(os.listdir(courses_dir)):
+            if not name.endswith(".json") or name.startswith(("_", ".")):
+                continue
+            try:
+                data = read_json(os.path.join(courses_dir, name))
+            except (OSError, ValueError):
+                continue
+            for course in data.get("courses", []):
+                self.ingerer_participants(course.get("participants", []))
+            fichiers += 1
+        return fichiers
+
+    def ingerer_correspondances(self, path=CORRESPONDANCES_PATH):
+        """Alias PMU → France Galop validés (confiance ≥ 90)."""
+        try:
+            data = read_json(path)
+        except (OSError, ValueError):
+            return 0
+        ajoutes = 0
+        for variante, c in data.get("correspondances", {}).items():
+            kind = c.get("categorie")
+            if kind in self.dicos and c.get("match") and c.get("confiance", 0) >= 90:
+                ajoutes += self.dicos[kind].ajouter_alias(variante, c["match"])
+        return ajoutes
+
+
+_shared = {}
+
+
+def load_ids(path=IDS_PATH):
+    """Dictionnaire partagé (un seul chargement par processus)."""
+    if path not in _shared:
+        _shared[path] = EntityIds(path)
+    return _shared[path]
+
+
+def build(path=IDS_PATH):
+    ids = load_ids(path)
+    n_classements = ids.ingerer_classements()
+    n_courses = ids.ingerer_courses()
+    n_alias = ids.ingerer_correspondances()
+    ids.save()
+    return ids, n_classements, n_courses, n_alias
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "info"
+    if cmd == "build":
+        ids, n_classements, n_courses, n_alias = build()
+        print(f"✅ {IDS_PATH} — {n_classements} classements, {n_courses} fichiers de courses, "
+              f"{n_alias} alias de correspondances")
+        cmd = "info"
+    if cmd == "info":
+        ids = load_ids()
+        for kind in KINDS:
+            d = ids[kind]
+            print(f"  {kind:<14} {len(d):>7} ids  {len(d.alias):>6} alias")
+    elif cmd == "get" and len(sys.argv) == 4:
+        d = load_ids()[sys.argv[2]]
+        i = d.get(sys.argv[3])
+        if i < 0:
+            print(f"❌ {sys.argv[3]} inconnu ({sys.argv[2]})")
+            sys.exit(1)
+        print(f"{i}\t{d.nom(i)}")
+    elif cmd != "info":
+        print("Usage: python3 entity_ids.py build|info|get <type> <nom>", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Features par partant précalculées par fichier de courses, invalidées
+par mtime.
+
+diagnostic_derive_cote, validation_out_of_sample, integre_derive_ab_test
+et backtest_segmente_paris relisaient tous les JSON de data/courses/ et
+recalculaient à chaque lancement les mêmes features. Ici elles sont
+calculées une fois par fichier de réunion et rangées en colonnes .npy
+relues en memory-map. meta.json garde pour chaque fichier sa signature
+(mtime, taille) et sa tranche de lignes : à la mise à jour, seuls les
+fichiers nouveaux ou modifiés sont relus, les autres tranches sont
+reprises telles quelles.
+
+    data/features/                  (non versionné)
+        meta.json                   {fichier: signature, tranches partants / courses}
+        <colonne>.npy               partants ; course_<colonne>.npy par course
+
+Colonnes par partant (fs["cote"]) :
+    numero, arrivee (0 = inconnue), arrivee_connue, gagnant (premier
+    partant classé 1er, comme les backtests), cote, cote_reference,
+    valeur (float64 brut, NaN si absent ou illisible ; pas de défaut),
+    proba = 1/cote, derive = log(cote/cote_reference) (NaN si une cote
+    ≤ 0), musique_live, musique_baseline (musique_parser), nb_courses,
+    nb_victoires
+
+Colonnes par course (fs.course("distance"), fs.partant("distance")) :
+    fichier (indice dans fs.fichiers), date, hippodrome, distance, segment
+    (scoring_engine, bornes baseline), terrain (TERRAINS), nb_partants,
+    arrivee_definitive, nom, type
+
+Usage:
+    python3 feature_store.py build          # relit les fichiers modifiés
+    python3 feature_store.py info
+
+    from feature_store import load_features
+    fs = load_features()                    # mise à jour si besoin
+    idx, starts = fs.selection(fs.masque_fichiers(lambda f: "chantilly" in f))
+    derive = fs["derive"][idx]              # partants contigus par course (starts)
+"""
+
+import math
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from courses_dataset import COURSES_DIR, FILE_PATTERN, list_course_files
+from json_io import read_json, write_json
+from musique_parser import score_baseline, score_live
+from scoring_engine import BORNES_BASELINE, segments
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FEATURES_DIR = os.path.join(ROOT, 'data', 'features')
+
+VERSION = 1
+
+# Seaux de terrain de backtest_segmente_paris.segmenter_course (0 = non renseigné)
+TERRAINS = ("", "lourd", "souple", "bon")
+_TERRAINS_LOURDS = ("lourd", "tres souple", "très souple", "collant")
+
+COLONNES_PARTANT = {
+    "numero": np.int16,
+    "arrivee": np.int16,
+    "arrivee_connue": np.bool_,
+    "gagnant": np.bool_,
+    "cote": np.float64,
+    "cote_reference": np.float64,
+    "valeur": np.float64,
+    "proba": np.float64,
+    "derive": np.float64,
+    "musique_live": np.float64,
+    "musique_baseline": np.float64,
+    "nb_courses": np.int32,
+    "nb_victoires": np.int32,
+}
+COLONNES_COURSE = {
+    "fichier": np.int32,
+    "date": "datetime64[D]",
+    "hippodrome": str,
+    "distance": np.int32,
+    "segment": np.int8,
+    "terrain": np.int8,
+    "nb_partants": np.int16,
+    "arrivee_definitive": np.bool_,
+    "nom": str,
+    "type": str,
+}
+
+_RE_ENTIER = re.compile(r'(\d+)')
+
+
+def _nombre(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return math.nan
+
+
+def _entier(value):
+    m = _RE_ENTIER.search(str(value))
+    return int(m.group(1)) if m else 0
+
+
+def terrain_code(terrain):
+    terrain = (terrain or "").lower()
+    if any(x in terrain for x in _TERRAINS_LOURDS):
+        return 1
+    if "souple" in terrain:
+        return 2
+    if "bon" in terrain:
+        return 3
+    return 0
+
+
+def features_fichier(data, date_iso):
+    """Colonnes partant + course d'un fichier de réunion (dict JSON)."""
+    partant = {name: [] for name in COLONNES_PARTANT}
+    course = {name: [] for name in COLONNES_COURSE if name != "fichier"}
+    for c in data.get("courses", []):
+        participants = c.get("participants", [])
+        if not participants:
+            continue
+        gagnant = next((p.get("n°") for p in participants if p.get("arrivee") == 1), None)
+        course["date"].append(date_iso)
+        course["hippodrome"].append(data.get("hippodrome") or "")
+        course["distance"].append(_entier(c.get("distance", "0")))
+        course["terrain"].append(terrain_code(c.get("terrain")))
+        course["nb_partants"].append(len(participants))
+        course["arrivee_definitive"].append(bool(c.get("arrivee_definitive")))
+        course["nom"].append(c.get("nom") or "")
+        course["type"].append(c.get("type") or "")
+        for p in participants:
+            arrivee = p.get("arrivee")
+            cote = _nombre(p.get("cote"))
+            ref = _nombre(p.get("cote_reference"))
+            musique = p.get("musique", "")
+            partant["numero"].append(_entier(p.get("n°")))
+            partant["arrivee"].append(arrivee if isinstance(arrivee, int) else 0)
+            partant["arrivee_connue"].append(arrivee is not None)
+            partant["gagnant"].append(gagnant is not None and p.get("n°") == gagnant)
+            partant["cote"].append(cote)
+            partant["cote_reference"].append(ref)
+            partant["valeur"].append(_nombre(p.get("valeur")))
+            partant["proba"].append(1.0 / cote if cote > 0 else math.nan)
+            partant["derive"].append(math.log(cote / ref) if cote > 0 and ref > 0 else math.nan)
+            partant["musique_live"].append(score_live(musique))
+            partant["musique_baseline"].append(score_baseline(musique))
+            partant["nb_courses"].append(p.get("nb_courses") or 0)
+            partant["nb_victoires"].append(p.get("nb_victoires") or 0)
+    cols = {name: np.array(values, dtype=COLONNES_PARTANT[name]) for name, values in partant.items()}
+    for name, values in course.items():
+        cols[f"course_{name}"] = np.array(values, dtype=COLONNES_COURSE[name])
+    cols["course_segment"] = segments(cols["course_distance"], BORNES_BASELINE)
+    return cols
+
+
+def _signature(courses_dir, name):
+    st = os.stat(os.path.join(courses_dir, name))
+    return [st.st_mtime, st.st_size]
+
+
+def _charger_colonnes(path, meta):
+    """Colonnes existantes (memory-map) si le store est au bon format."""
+    if meta.get("version") != VERSION:
+        return None
+    try:
+        return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+                for name in list(COLONNES_PARTANT) + [f"course_{c}" for c in COLONNES_COURSE]}
+    except (OSError, ValueError):
+        return None
+
+
+def update_features(courses_dir=COURSES_DIR, path=FEATURES_DIR):
+    """Recalcule les fichiers nouveaux / modifiés ; les autres sont repris
+    tels quels du store existant. Retourne le nombre de fichiers recalculés
+    (0 : store déjà à jour, rien n'est réécrit)."""
+    try:
+        meta = read_json(os.path.join(path, "meta.json"))
+    except (OSError, ValueError):
+        meta = {}
+    anciens = _charger_colonnes(path, meta)
+    connus = meta.get("fichiers", {}) if anciens is not None else {}
+
+    noms = list_course_files(courses_dir)
+    signatures = {name: _signature(courses_dir, name) for name in noms}
+    if list(connus) == noms and all(connus[n]["signature"] == signatures[n] for n in noms):
+        return 0
+
+    morceaux = []          # (colonnes partant + course) de chaque fichier, dans l'ordre
+    fichiers = {}
+    recalcules = 0
+    partants = courses = 0
+    for i, name in enumerate(noms):
+        known = connus.get(name)
+        if known and known["signature"] == signatures[name]:
+            (p0, pn), (c0, cn) = known["partants"], known["courses"]
+            cols = {k: anciens[k][p0:p0 + pn] for k in COLONNES_PARTANT}
+            cols.update({f"course_{k}": anciens[f"course_{k}"][c0:c0 + cn]
+                         for k in COLONNES_COURSE if k != "fichier"})
+        else:
+            try:
+                data = read_json(os.path.join(courses_dir, name))
+            except (OSError, ValueError):
+                data = {}
+            cols = features_fichier(data, FILE_PATTERN.match(name).group(1))
+            recalcules += 1
+        pn, cn = len(cols["cote"]), len(cols["course_distance"])
+        cols["course_fichier"] = np.full(cn, i, dtype=np.int32)
+        fichiers[name] = {"signature": signatures[name],
+                          "partants": [partants, pn], "courses": [courses, cn]}
+        partants += pn
+        courses += cn
+        morceaux.append(cols)
+
+    cols = {}
+    for name, dtype in COLONNES_PARTANT.items():
+        cols[name] = np.concatenate([m[name] for m in morceaux] + [np.zeros(0, dtype=dtype)])
+    for name, dtype in COLONNES_COURSE.items():
+        key = f"course_{name}"
+        valeurs = [m[key] for m in morceaux if len(m[key])]
+        cols[key] = np.concatenate(valeurs) if valeurs else np.zeros(0, dtype=dtype)
+    tailles = cols["course_nb_partants"].astype(np.int64)
+    cols["course_start"] = np.concatenate(([0], np.cumsum(tailles)[:-1])) if len(tailles) else tailles
+
+    os.makedirs(path, exist_ok=True)
+    # Store invalide tant que les colonnes sont remplacées une à une : sans
+    # meta.json, une interruption ici force une reconstruction complète au
+    # lieu de découper les nouvelles colonnes avec les anciens intervalles.
+    try:
+        os.remove(os.path.join(path, "meta.json"))
+    except FileNotFoundError:
+        pass
+    for name, values in cols.items():
+        tmp = os.path.join(path, f"{name}.tmp.npy")
+        np.save(tmp, values, allow_pickle=False)
+        os.replace(tmp, os.path.join(path, f"{name}.npy"))
+    write_json(os.path.join(path, "meta.json"), {
+        "version": VERSION,
+        "built_at": datetime.now().isoformat(timespec='seconds'),
+        "rows": partants,
+        "courses": courses,
+        "fichiers": fichiers,
+    })
+    return recalcules
+
+
+class FeatureStore:
+    """Colonnes concaténées (memory-map)."""
+
+    def __init__(self, path=FEATURES_DIR, mmap=True):
+        self.path = path
+        self.meta = read_json(os.path.join(path, "meta.json"))
+        if self.meta.get("version") != VERSION:
+            raise ValueError(f"{path}: version {self.meta.get('version')} ≠ {VERSION}")
+        self.mmap_mode = "r" if mmap else None
+        self.fichiers = list(self.meta["fichiers"])
+        self._cache = {}
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def _load(self, name):
+        if name not in self._cache:
+            self._cache[name] = np.load(os.path.join(self.path, f"{name}.npy"),
+                                        mmap_mode=self.mmap_mode, allow_pickle=False)
+        return self._cache[name]
+
+    def __getitem__(self, name):
+        """Colonne par partant."""
+        if name not in COLONNES_PARTANT:
+            raise KeyError(name)
+        return self._load(name)
+
+    @property
+    def starts(self):
+        """Indice du premier partant de chaque course."""
+        return self._load("course_start")
+
+    def course(self, name):
+        """Colonne par course."""
+        if name not in COLONNES_COURSE:
+            raise KeyError(name)
+        return self._load(f"course_{name}")
+
+    def partant(self, valeurs):
+        """Valeurs par course (nom de colonne ou tableau) → par partant."""
+        if isinstance(valeurs, str):
+            valeurs = self.course(valeurs)
+        tailles = np.diff(np.append(np.asarray(self.starts), len(self)))
+        return np.repeat(np.asarray(valeurs), tailles)
+
+    def selection(self, courses):
+        """Partants des courses retenues (masque par course) → (indices,
+        starts de ces courses dans la sélection)."""
+        courses = np.asarray(courses, dtype=bool)
+        tailles = np.asarray(self.course("nb_partants"))[courses].astype(np.int64)
+        starts = np.concatenate(([0], np.cumsum(tailles)[:-1])) if len(tailles) else tailles
+        return np.flatnonzero(self.partant(courses)), starts
+
+    def masque_fichiers(self, predicat):
+        """Masque par course des fichiers dont le nom vérifie predicat(nom)."""
+        retenus = np.array([bool(predicat(name)) for name in self.fichiers] + [False])
+        return retenus[np.asarray(self.course("fichier"))]
+
+
+def load_features(courses_dir=COURSES_DIR, path=FEATURES_DIR):
+    """Store à jour (shards recalculés pour les seuls fichiers modifiés)."""
+    update_features(courses_dir, path)
+    return FeatureStore(path)
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if cmd == "build":
+        t0 = time.perf_counter()
+        n = update_features()
+        fs = FeatureStore()
+        print(f"✅ {FEATURES_DIR} — {n} fichiers recalculés, {len(fs)} partants, "
+              f"{fs.meta['courses']} courses en {time.perf_counter() - t0:.2f}s")
+    elif cmd == "info":
+        t0 = time.perf_counter()
+        fs = load_features()
+        derive = np.asarray(fs["derive"])
+        print(f"📦 {len(fs)} partants, {fs.meta['courses']} courses, {len(fs.fichiers)} fichiers "
+              f"(build {fs.meta['built_at']})")
+        print(f"   dérive renseignée: {np.isfinite(derive).mean() * 100:.1f}% "
+              f"— chargement {1000 * (time.perf_counter() - t0):.1f} ms")
+    else:
+        print("Usage: python3 feature_store.py [build|info]", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Résolution des noms de chevaux PMU vers les classements France Galop.
+
+live-scoring.score_participant cherchait le `nom` PMU brut (upper) dans
+chevaux_ponderated_latest.json : accents, suffixe pays ("AZANIYA IRE",
+"NO TUNE (GB)"), apostrophes ou espaces ("MURMURE D ETOILE",
+"DEVIL'SPEAK") et fautes de frappe ratent silencieusement et retombent
+sur taux_v = 8. Ici chaque nom est résolu par étapes, de la plus sûre à
+la plus large :
+
+    exacte      clé normalisée (entity_ids.cle : accents, libellé PMU)
+    compacte    sans suffixe pays ni ponctuation/espaces
+    approx      variante orthographique à une édition de la clé compacte :
+                transposition, lettre doublée, umlaut transcrit
+                ("KOENIGIN" / "KONIGIN")
+    proche      toute autre édition unique ("OASIS BOY" / "OASIS BAY") :
+                souvent un autre cheval, proposée mais pas utilisée
+
+Les voisins à une édition sont trouvés via un index de voisinage par
+suppression (chaque clé rangée sous ses variantes à un caractère
+supprimé) : une requête ne consulte que ses propres variantes, sans
+parcourir le classement.
+
+Plusieurs chevaux distincts à la même étape → "ambigu". Les paires
+approx / proche sont mémorisées dans data/chevaux_correspondances.json
+(non versionné, même esprit que data/claude_correspondances.json) pour
+relecture ; passer une entrée en "methode": "manuel" la valide
+("match": "" pour l'interdire).
+
+Usage:
+    python3 horse_resolver.py chevaux "AZANIYA" "MURMURE D'ETOILE"
+    python3 horse_resolver.py audit 2026-07-12      # partants d'une journée
+
+    from horse_resolver import ChevalResolver
+    resolver = ChevalResolver(rankings["chevaux"])     # dict nom → entrée
+    resolver.resoudre("AZANIYA").cle                   # "AZANIYA IRE"
+    resolver.match("AZANIYA")                          # entrée ou None
+    resolver.resoudre_tous(noms)                       # {nom: Resultat}
+    resolver.save()
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import date
+
+from entity_ids import cle
+from json_io import read_json, write_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'data')
+CACHE_PATH = os.path.join(DATA_DIR, 'chevaux_correspondances.json')
+
+# Suffixes pays des classements ("IRE", "(GB)"...)
+PAYS = ("IRE", "GB", "FR", "GER", "USA", "SPA", "SWI", "JPN", "POL", "ITY", "CZE", "AUS",
+        "NZ", "ARG", "BRZ", "CAN", "CHI", "HOL", "BEL", "DEN", "SWE", "NOR", "TUR", "QA",
+        "UAE", "SAF", "HUN", "SVK", "AUT", "KSA", "IND", "MOR", "URU", "PER")
+_RE_PAYS = re.compile(r'\s+\(?(?:%s)\)?$' % "|".join(PAYS))
+_RE_NON_ALNUM = re.compile(r'[^A-Z0-9]')
+MIN_APPROX = 8      # noms courts : trop de chevaux distincts à une édition près
+
+# Méthodes dont le résultat est utilisé par match()
+ACCEPTEES = ("exacte", "compacte", "approx", "manuel")
+
+Resultat = namedtuple("Resultat", "cle methode candidats")
+AUCUN = Resultat(None, None, ())
+
+_lock = threading.Lock()
+
+
+def _compacter(k):
+    return _RE_NON_ALNUM.sub("", _RE_PAYS.sub("", k))
+
+
+def compacte(nom):
+    """"NO TUNE (GB)" → "NOTUNE" ; "MURMURE D'ETOILE" → "MURMUREDETOILE"."""
+    return _compacter(cle(nom, "chevaux"))
+
+
+def suppressions(k):
+    """Voisinage par suppression : k et ses variantes à un caractère en moins."""
+    return {k[:i] + k[i + 1:] for i in range(len(k))} | {k}
+
+
+def distance_max_1(a, b):
+    """True si a et b sont à une édition près (Damerau : transposition incluse)."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return (len(diff) == 2 and diff[1] == diff[0] + 1
+                and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def variante_orthographique(a, b):
+    """a et b (à une édition près) ne diffèrent que par une transposition,
+    une lettre doublée ou un E d'umlaut transcrit (OE/UE/AE)."""
+    if len(a) == len(b):
+        return a != b and sorted(a) == sorted(b)
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    x = b[i]
+    doublee = (i > 0 and b[i - 1] == x) or (i + 1 < len(b) and b[i + 1] == x)
+    umlaut = x == "E" and i > 0 and b[i - 1] in "AOU"
+    return doublee or umlaut
+
+
+class ChevalResolver:
+    """Index de résolution sur les clés d'un classement chevaux."""
+
+    def __init__(self, data, cache_path=CACHE_PATH, cles=None, voisins=None):
+        """data : {nom: entrée}. cles (clé exacte, clé compacte) alignées sur
+        les noms de data et voisins (objet .get(suppression, défaut)) peuvent
+        être fournis précalculés (rankings_merged) pour sauter leur calcul."""
+        self.data = data
+        self.cache_path = cache_path
+        self.exactes = {}
+        self.compactes = {}
+        construire_voisins = voisins is None
+        self.voisins = {} if construire_voisins else voisins
+        if cles is None:
+            cles = ((k, _compacter(k)) for k in (cle(key, "chevaux") for key in data))
+        for key, (k, c) in zip(data, cles):
+            self.exactes.setdefault(k, key)
+            if not c:
+                continue
+            self.compactes.setdefault(c, []).append(key)
+            if construire_voisins and len(c) >= MIN_APPROX:
+                for d in suppressions(c):
+                    self.voisins.setdefault(d, set()).add(c)
+        self.memo = {}
+        self.paires = self._charger_cache()
+        self.dirty = False
+
+    # ---------- cache persistant ----------
+
+    def _charger_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            return read_json(self.cache_path).get("paires", {})
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Écrit les nouvelles paires (fusion avec le fichier existant)."""
+        if not self.dirty or not self.cache_path:
+            return False
+        with _lock:
+            paires = self._charger_cache()
+            paires.update(self.paires)
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            write_json(self.cache_path, {"version": 1, "total": len(paires), "paires": paires})
+        self.dirty = False
+        return True
+
+    def _memoriser(self, c, res):
+        cible = compacte(res.cle)
+        known = self.paires.get(c)
+        if known and known.get("match") == cible:
+            return
+        self.paires[c] = {"match": cible, "nom": res.cle, "methode": res.methode,
+                          "date": date.today().isoformat()}
+        self.dirty = True
+
+    # ---------- résolution ----------
+
+    def _unique(self, c, methode):
+        keys = self.compactes.get(c, ())
+        if len(keys) == 1:
+            return Resultat(keys[0], methode, (keys[0],))
+        if keys:
+            return Resultat(None, "ambigu", tuple(keys))
+        return None
+
+    def _resoudre(self, nom):
+        k = cle(nom, "chevaux")
+        exacte = self.exactes.get(k)
+        if exacte is not None:
+            return Resultat(exacte, "exacte", (exacte,))
+        c = _compacter(k)
+        if not c:
+            return AUCUN
+
+        known = self.paires.get(c)
+        if known:
+            if known.get("methode") == "manuel" and not known.get("match"):
+                return AUCUN
+            res = self._unique(known["match"], known.get("methode", "proche"))
+            if res is not None and res.cle is not None:
+                return res
+
+        res = self._unique(c, "compacte")
+        if res is not None:
+            return res
+        if len(c) < MIN_APPROX:
+            return AUCUN
+
+        proches = set()
+        for d in suppressions(c):
+            proches |= self.voisins.get(d, set())
+        proches = sorted(p for p in proches if distance_max_1(c, p))
+        if len(proches) == 1:
+            methode = "approx" if variante_orthographique(c, proches[0]) else "proche"
+            res = self._unique(proches[0], methode)
+            if res.cle is not None:
+                self._memoriser(c, res)
+            return res
+        if proches:
+            return Resultat(None, "ambigu", tuple(k for p in proches for k in self.compactes[p]))
+        return AUCUN
+
+    def resoudre(self, nom):
+        if not nom:
+            return AUCUN
+        res = self.memo.get(nom)
+        if res is None:
+            res = self.memo[nom] = self._resoudre(nom)
+        return res
+
+    def resoudre_tous(self, noms):
+        return {nom: self.resoudre(nom) for nom in noms}
+
+    def match(self, nom):
+        """Entrée du classement pour ce cheval, None si absent, ambigu ou
+        seulement proche."""
+        res = self.resoudre(nom)
+        return self.data[res.cle] if res.methode in ACCEPTEES else None
+
+
+def charger_classement(cat, data_dir=DATA_DIR):
+    """{Nom: entrée} de data/{cat}_ponderated_latest.json (cat: chevaux, chevaux_2025)."""
+    path = os.path.join(data_dir, f"{cat}_ponderated_latest.json")
+    try:
+        resultats = read_json(path).get("resultats", [])
+    except (OSError, ValueError):
+        return {}
+    return {item["Nom"].upper().strip(): item for item in resultats if item.get("Nom")}
+
+
+def audit(date_iso):
+    """Partants d'une journée (data/courses) résolus contre chevaux et chevaux_2025."""
+    from courses_dataset import load_dataset
+    ds = load_dataset()
+    import numpy as np
+    noms = sorted(set(ds.decode("cheval")[np.asarray(ds["date"]) == np.datetime64(date_iso)].tolist()))
+    for cat in ("chevaux", "chevaux_2025"):
+        t0 = time.perf_counter()
+        resolver = ChevalResolver(charger_classement(cat))
+        t_index = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        resultats = resolver.resoudre_tous(noms)
+        t_res = time.perf_counter() - t0
+        stats = Counter(r.methode or "absent" for r in resultats.values())
+        print(f"📊 {cat}: {len(noms)} partants le {date_iso} — index {t_index * 1000:.0f} ms, "
+              f"résolution {t_res * 1000:.0f} ms")
+        print("   " + ", ".join(f"{m}: {stats[m]}"
+                                for m in ("exacte", "compacte", "approx", "proche", "ambigu", "absent")))
+        for nom, r in resultats.items():
+            if r.methode in ("compacte", "approx", "proche", "ambigu"):
+                print(f"   {r.methode:<8} {nom} → {' | '.join(r.candidats)}")
+        resolver.save()
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "audit":
+        audit(sys.argv[2])
+    elif len(sys.argv) >= 3:
+        resolver = ChevalResolver(charger_classement(sys.argv[1]))
+        for nom in sys.argv[2:]:
+            r = resolver.resoudre(nom)
+            if r.methode == "ambigu":
+                print(f"⚠️  {nom} → ambigu : {' | '.join(r.candidats)}")
+            elif r.methode == "proche":
+                print(f"❔ {nom} → {r.cle} (proche, non retenu)")
+            elif r.cle:
+                print(f"✅ {nom} → {r.cle} ({r.methode})")
+            else:
+                print(f"❌ {nom} → aucun")
+        resolver.save()
+    else:
+        print("Usage: python3 horse_resolver.py <chevaux|chevaux_2025> <nom>... | audit <YYYY-MM-DD>",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Couche de sérialisation JSON partagée par les scrapers et les lecteurs.
+
+- mode compact (défaut) : pas d'indentation ni d'espaces, ~2x plus petit
+  que indent=2 et plus rapide à relire ; HIPPIQUE_JSON=indent pour revenir
+  au format lisible
+- sidecars compressés optionnels à côté du .json : fichier.json.gz et/ou
+  fichier.json.zst (HIPPIQUE_JSON_SIDECARS=gz,zst ou sidecars=("gz",))
+- orjson utilisé s'il est installé (sinon json standard), même sortie
+  logique
+- read_json accepte indifféremment .json indenté ou compact, .json.gz,
+  .json.zst, et retombe sur un sidecar si le .json est absent
+
+Le .json reste toujours écrit : le frontend (raw.githubusercontent) le lit
+directement avec JSON.parse, compact ou non.
+
+Usage:
+    from json_io import read_json, write_json
+    write_json(filepath, data)                   # compact, écriture atomique
+    data = read_json(filepath)
+
+    python3 json_io.py bench data/courses        # tailles + temps de chargement
+    python3 json_io.py compact data/courses      # réécrit les .json existants
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPACT = os.environ.get("HIPPIQUE_JSON", "compact") != "indent"
+SIDECARS = tuple(s.strip() for s in os.environ.get("HIPPIQUE_JSON_SIDECARS", "").split(",") if s.strip())
+SIDECAR_EXTS = {"gz": ".gz", "zst": ".zst"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+# ============================================================
+# Encodage / décodage
+# ============================================================
+
+def dumps(obj, compact=None):
+    """Sérialise en bytes UTF-8 (compact ou indent=2)."""
+    compact = COMPACT if compact is None else compact
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except (TypeError, orjson.JSONEncodeError):
+            pass  # entiers > 64 bits, types exotiques : json standard
+    if compact:
+        text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    else:
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+    return text.encode('utf-8')
+
+
+def loads(data):
+    """Décode bytes ou str JSON."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _compress(kind, raw):
+    if kind == "gz":
+        return gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    if kind == "zst":
+        if zstandard is None:
+            return None
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    raise ValueError(f"sidecar inconnu: {kind}")
+
+
+def _decompress(path, raw):
+    if path.endswith(".gz"):
+        return gzip.decompress(raw)
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError(f"{path}: module zstandard absent")
+        return zstandard.ZstdDecompressor().decompress(raw)
+    return raw
+
+
+# ============================================================
+# Fichiers
+# ============================================================
+
+def _write_bytes(path, raw):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(raw)
+    os.replace(tmp, path)
+
+
+def write_json(path, obj, compact=None, sidecars=None):
+    """Écrit obj dans path (atomique) + sidecars compressés éventuels.
+
+    Les sidecars non demandés qui existeraient encore sont supprimés pour
+    ne jamais laisser une version compressée périmée.
+    """
+    raw = dumps(obj, compact)
+    _write_bytes(path, raw)
+
+    sidecars = SIDECARS if sidecars is None else tuple(sidecars)
+    for kind, ext in SIDECAR_EXTS.items():
+        side_path = path + ext
+        if kind in sidecars:
+            packed = _compress(kind, raw)
+            if packed is None:
+                logger.warning(f"  ⚠️  zstandard absent, pas de sidecar {side_path}")
+                continue
+            _write_bytes(side_path, packed)
+        elif os.path.exists(side_path):
+            os.remove(side_path)
+    return len(raw)
+
+
+def read_json(path):
+    """Lit un .json (indenté ou compact), .json.gz ou .json.zst.
+
+    Si path est un .json absent, essaie path.gz puis path.zst.
+    Lève FileNotFoundError si rien n'existe, ValueError si illisible.
+    """
+    candidates = [path]
+    if path.endswith(".json"):
+        candidates += [path + ext for ext in SIDECAR_EXTS.values()]
+    for candidate in candidates:
+        try:
+            with open(candidate, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            continue
+        return loads(_decompress(candidate, raw))
+    raise FileNotFoundError(path)
+
+
+# ============================================================
+# Benchmark / conversion
+# ============================================================
+
+def _files(target):
+    if os.path.isdir(target):
+        return sorted(p for p in glob.glob(os.path.join(target, "*.json"))
+                      if not os.path.basename(p).startswith("_"))
+    return sorted(glob.glob(target))
+
+
+def bench(target):
+    """Compare tailles et temps de chargement indent=2 / compact / gz / zst.
+
+    Tout est fait en mémoire à partir des fichiers existants (rien n'est écrit).
+    """
+    paths = _files(target)
+    objs = [read_json(p) for p in paths]
+    formats = {
+        "indent": [dumps(o, compact=False) for o in objs],
+        "compact": [dumps(o, compact=True) for o in objs],
+    }
+    formats["compact.gz"] = [_compress("gz", b) for b in formats["compact"]]
+    if zstandard is not None:
+        formats["compact.zst"] = [_compress("zst", b) for b in formats["compact"]]
+
+    codecs = [("json", json.loads)]
+    if orjson is not None:
+        codecs.append(("orjson", orjson.loads))
+
+    print(f"📦 {len(paths)} fichiers ({target})")
+    base_size = sum(map(len, formats["indent"]))
+    header = f"  {'format':<12} {'taille':>10} {'ratio':>6}"
+    for name, _ in codecs:
+        header += f" {'load ' + name:>13}"
+    print(header)
+    for fmt, blobs in formats.items():
+        size = sum(map(len, blobs))
+        line = f"  {fmt:<12} {size / 1e6:>8.1f}MB {size / base_size:>6.2f}"
+        suffix = ".gz" if fmt.endswith(".gz") else ".zst" if fmt.endswith(".zst") else ""
+        for _, decode in codecs:
+            t0 = time.perf_counter()
+            for blob in blobs:
+                decode(_decompress("x" + suffix, blob))
+            line += f" {(time.perf_counter() - t0) * 1000:>11.0f}ms"
+        print(line)
+
+
+def compact_files(target, sidecars=None):
+    """Réécrit les .json existants au format courant (COMPACT / SIDECARS)."""
+    avant = apres = 0
+    paths = _files(target)
+    for path in paths:
+        avant += os.path.getsize(path)
+        apres += write_json(path, read_json(path), sidecars=sidecars)
+    print(f"✅ {len(paths)} fichiers réécrits: {avant / 1e6:.1f}MB → {apres / 1e6:.1f}MB")
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("bench", "compact"):
+        print("Usage: python3 json_io.py bench|compact <dossier ou glob>", file=sys.stderr)
+        sys.exit(1)
+    print(f"⚙️  codec: {'orjson' if orjson else 'json'}, "
+          f"zstd: {'oui' if zstandard else 'non'}, mode: {'compact' if COMPACT else 'indent'}")
+    if sys.argv[1] == "bench":
+        bench(sys.argv[2])
+    else:
+        compact_files(sys.argv[2])
+
+
+if __name__ == "__main__":
+    main()
@@ -9,29 +9,40 @@ Usage : python3 live-scoring.py
 
 Ou : python3 live-scoring.py R1 C3
   → Scoring d'une course spécifique (Réunion 1, Course 3)
+
+Options : --timing  → temps de fetch et de scoring affichés séparément
+          --watch N → re-poll toutes les N s les courses non parties,
+                      ne réaffiche que les lignes qui ont bougé
 """
 
-import requests
-import json
-import sys
+import argparse
+import logging
 import math
 import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 
-BASE_URL = "https://online.turfinfo.api.pmu.fr/rest/client/61"
-HEADERS = {'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'}
+from json_io import read_json
+from musique_parser import score_live as score_musique_live
+from name_matcher import InitialeMatcher
+from pmu_client import get_client
+from rankings_merged import load_merged
+
+FETCH_WORKERS = 8  # requêtes participants simultanées
 
 # Charger les classements 2025 (locaux)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 def load_rankings():
+    """Jockeys 2025/2026 (dicts NomPostal → entrée) + chevaux fusionnés
+    2025/2026 précompilés (rankings_merged, reconstruit si un JSON a changé)."""
     rankings = {}
-    for cat, key in [('chevaux_2025', 'Nom'), ('jockeys_2025', 'NomPostal'),
-                      ('chevaux', 'Nom'), ('jockeys', 'NomPostal')]:
-        fname = f'{cat}_ponderated_latest.json' if '2025' in cat else f'{cat}_ponderated_latest.json'
+    for cat, key in [('jockeys_2025', 'NomPostal'), ('jockeys', 'NomPostal')]:
         try:
-            path = os.path.join(SCRIPT_DIR, f'data/{fname}')
-            d = json.load(open(path))
+            path = os.path.join(SCRIPT_DIR, f'data/{cat}_ponderated_latest.json')
+            d = read_json(path)
             rankings[cat] = {}
             for item in d.get('resultats', []):
                 k = (item.get(key) or '').upper().strip()
@@ -39,54 +50,39 @@ def load_rankings():
                     rankings[cat][k] = item
         except:
             rankings[cat] = {}
+    rankings['chevaux'] = load_merged('chevaux')
     return rankings
 
 
+_matchers = {}
+
+
 def match_initiale(data, nom):
-    if not nom or len(nom) < 3:
-        return None
-    n = nom.upper().strip()
-    if n in data:
-        return data[n]
-    import re
-    cleaned = re.sub(r'^MME\s+|^MLLE\s+', '', n, flags=re.I)
-    m = re.match(r'^([A-Z]{1,3})\.?\s*(.+?)(?:\s*\(.*\))?$', cleaned)
-    if not m:
-        return None
-    init = m.group(1)[0]
-    fam = re.sub(r'\s*\([A-Z]\)\s*$', '', m.group(2)).strip()
-    if len(fam) < 3:
-        return None
-    for k, v in data.items():
-        if (k.endswith(fam) or f' {fam}' in k):
-            prenom = k.replace(fam, '').replace('MME ', '').strip()
-            if prenom and prenom[0] == init:
-                return v
-    return None
+    """Entrée de classement pour un nom PMU abrégé ("C. DEMURO"), None si
+    absent ou ambigu. L'index (name_matcher) est construit une fois par
+    classement puis réutilisé."""
+    matcher = _matchers.get(id(data))
+    if matcher is None or matcher.data is not data:
+        matcher = _matchers[id(data)] = InitialeMatcher(data)
+    return matcher.match(nom)
+
+
+def taux_victoire_cheval(rankings, nom):
+    """TauxVictoire combiné 2025/2026 (max des années classées), 8 si le
+    cheval n'est dans aucun classement. Le nom PMU est résolu par
+    horse_resolver (suffixe pays, ponctuation, variantes orthographiques)."""
+    taux = rankings['chevaux'].taux_victoire(nom)
+    return 8 if taux is None else taux
+
+
+def sauver_correspondances(rankings):
+    """Persiste les paires approchées trouvées pendant le scoring."""
+    rankings['chevaux'].resolver().save()
 
 
 def parse_musique(m):
-    if not m:
-        return 50
-    import re
-    positions = re.sub(r'\(\d+\)', '', m)
-    matches = re.findall(r'(\d+|[DRT])[a-z]', positions, re.I)
-    if len(matches) < 2:
-        return 50
-    last5 = []
-    for x in matches[:5]:
-        if x in 'DRT':
-            last5.append(12)
-        else:
-            n = int(x)
-            last5.append(12 if n == 0 else n)
-    sc, w = 0, 0
-    for i, pos in enumerate(last5):
-        wt = (len(last5) - i) / len(last5)
-        ps = {1: 100, 2: 80, 3: 65}.get(pos, 45 if pos <= 5 else (25 if pos <= 8 else 10))
-        sc += ps * wt
-        w += wt
-    return sc / w if w > 0 else 50
+    """Score musique 0-100 (musique_parser.score_live, mémoïsé)."""
+    return score_musique_live(m)
 
 
 def score_participant(p, dist, rankings, nb_partants=10):
@@ -116,11 +112,7 @@ def score_participant(p, dist, rankings, nb_partants=10):
     score_musique = parse_musique(musique)
 
     # Classement 2025 + 2026 combiné (comme ranking-loader.js)
-    rc25 = rankings.get('chevaux_2025', {}).get(ch_name)
-    rc26 = rankings.get('chevaux', {}).get(ch_name)
-    tv25 = float(rc25.get('TauxVictoire', 0)) if rc25 else None
-    tv26 = float(rc26.get('TauxVictoire', 0)) if rc26 else None
-    taux_v = max(tv25 or 0, tv26 or 0) if (tv25 is not None or tv26 is not None) else 8
+    taux_v = taux_victoire_cheval(rankings, ch_name)
 
     # Scoring par distance
     if dist < 1400:  # Sprint
@@ -162,38 +154,9 @@ def score_participant(p, dist, rankings, nb_partants=10):
     }
 
 
-def main():
-    date_pmu = datetime.now().strftime("%d%m%Y")
-    date_iso = datetime.now().strftime("%Y-%m-%d")
-
-    print(f"\n🏇 LIVE SCORING — {date_iso}")
-    print("=" * 60)
-
-    # Charger les classements
-    rankings = load_rankings()
-    print(f"📊 {len(rankings['chevaux_2025'])} chevaux 2025, {len(rankings['jockeys_2025'])} jockeys")
-
-    # Récupérer le programme
-    resp = requests.get(f"{BASE_URL}/programme/{date_pmu}?specialisation=INTERNET", headers=HEADERS)
-    if resp.status_code != 200:
-        print("❌ Pas de programme aujourd'hui")
-        return
-
-    reunions = resp.json().get('programme', {}).get('reunions', [])
-
-    # Filtrer par R/C si spécifié
-    filter_r = None
-    filter_c = None
-    if len(sys.argv) >= 2:
-        import re
-        m = re.match(r'R(\d+)', sys.argv[1], re.I)
-        if m:
-            filter_r = int(m.group(1))
-        if len(sys.argv) >= 3:
-            m = re.match(r'C(\d+)', sys.argv[2], re.I)
-            if m:
-                filter_c = int(m.group(1))
-
+def selectionner_courses(reunions, filter_r=None, filter_c=None):
+    """Courses retenues, dans l'ordre du programme."""
+    selection = []
     for reunion in reunions:
         r_num = reunion.get('numOfficiel', 0)
         if filter_r and r_num != filter_r:
@@ -206,69 +169,305 @@ def main():
             c_num = course.get('numOrdre', 0)
             if filter_c and c_num != filter_c:
                 continue
+            selection.append({'r_num': r_num, 'c_num': c_num, 'hippo_nom': hippo_nom, 'course': course})
+    return selection
+
+
+def fetch_participants(client, date_pmu, selection):
+    """Télécharge les participants de toutes les courses en parallèle (ordre conservé)."""
+    def fetch(item):
+        data = client.get(
+            f"programme/{date_pmu}/R{item['r_num']}/C{item['c_num']}/participants?specialisation=INTERNET"
+        )
+        return data.get('participants', []) if data else None
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        return list(pool.map(fetch, selection))
+
+
+def filtrer_partants(participants):
+    return [p for p in participants
+            if not p.get('estNonPartant') and p.get('statut', '').upper() != 'NON_PARTANT']
+
+
+def scorer_course(participants, distance, rankings):
+    """Score + normalisation 10-90 des partants d'une course (trié par score)."""
+    partants = filtrer_partants(participants)
+    if not partants:
+        return []
+
+    scored = [score_participant(p, distance, rankings, len(partants)) for p in partants]
+    return normaliser(scored)
 
-            c_nom = course.get('libelle', '')
-            distance = course.get('distance', 0)
-            depart_ts = course.get('heureDepart')
-            depart = ''
-            if depart_ts:
-                dt = datetime.fromtimestamp(depart_ts / 1000, tz=timezone.utc) + timedelta(hours=2)
-                depart = dt.strftime("%Hh%M")
-
-            # Charger les participants
-            p_resp = requests.get(
-                f"{BASE_URL}/programme/{date_pmu}/R{r_num}/C{c_num}/participants?specialisation=INTERNET",
-                headers=HEADERS
-            )
-            if p_resp.status_code != 200:
-                continue
 
-            participants = p_resp.json().get('participants', [])
-            partants = [p for p in participants
-                        if not p.get('estNonPartant') and p.get('statut', '').upper() != 'NON_PARTANT']
+def normaliser(scored):
+    scored.sort(key=lambda x: -x['score'])
 
-            if not partants:
+    # Normaliser 10-90
+    scores = [s['score'] for s in scored]
+    min_s, max_s = min(scores), max(scores)
+    rng = max_s - min_s or 1
+    for s in scored:
+        s['score_norm'] = round((s['score'] - min_s) / rng * 80 + 10, 1)
+    return scored
+
+
+def afficher_course(item, scored):
+    course = item['course']
+    c_nom = course.get('libelle', '')
+    distance = course.get('distance', 0)
+    depart_ts = course.get('heureDepart')
+    depart = ''
+    if depart_ts:
+        dt = datetime.fromtimestamp(depart_ts / 1000, tz=timezone.utc) + timedelta(hours=2)
+        depart = dt.strftime("%Hh%M")
+
+    dist_label = 'Sprint' if distance < 1400 else 'Mile' if distance < 1700 else 'Middle' if distance < 2200 else 'Staying'
+    print(f"\n{'━' * 60}")
+    print(f"🏟️  {item['hippo_nom']} R{item['r_num']}C{item['c_num']} — {c_nom}")
+    print(f"📏 {distance}m ({dist_label}) | ⏰ {depart} | 🐴 {len(scored)} partants")
+    print(f"{'━' * 60}")
+    print(f"{'#':>3} {'Cheval':<22} {'Cote':>5} {'Dérive':>7} {'Val':>4} {'Mus':>4} {'Score':>6}")
+    print(f"{'─' * 60}")
+
+    for i, s in enumerate(scored):
+        print(ligne_partant(i, s))
+
+    afficher_divergence(scored)
+
+
+def ligne_partant(i, s):
+    medal = '🥇' if i == 0 else '🥈' if i == 1 else '🥉' if i == 2 else '  '
+    cote_str = f"{s['cote']:.1f}" if s['cote'] > 0 else '-'
+    derive_color = s['derive']
+    return f"{medal}{s['num']:>2} {s['nom'][:21]:<22} {cote_str:>5} {derive_color:>7} {s['valeur']:>4.0f} {s['musique_score']:>4} {s['score_norm']:>6}"
+
+
+def divergence(scored):
+    """(favori marché, notre #1) — favori None si aucune cote."""
+    by_cote = sorted([s for s in scored if s['cote'] > 1], key=lambda x: x['cote'])
+    return (by_cote[0] if by_cote else None), scored[0]
+
+
+def afficher_divergence(scored):
+    # Favori marché
+    fav, notre1 = divergence(scored)
+    if fav:
+        if fav['num'] != notre1['num']:
+            print(f"\n⭐ Favori marché: #{fav['num']} {fav['nom'][:20]} (cote {fav['cote']:.1f})")
+            print(f"🎯 Notre #1:      #{notre1['num']} {notre1['nom'][:20]} (cote {notre1['cote']:.1f})")
+            print(f"   → DIVERGENCE = potentiel VALUE BET")
+        else:
+            print(f"\n✅ Notre #1 = Favori marché: #{notre1['num']} {notre1['nom'][:20]}")
+
+# ============================================================
+# Mode --watch : suivi des cotes jusqu'au départ
+# ============================================================
+
+def signature_rapport(p):
+    """Ce qui peut bouger avant le départ et change le score d'un partant."""
+    rd = p.get('dernierRapportDirect') or {}
+    rr = p.get('dernierRapportReference') or {}
+    return (rd.get('rapport') if isinstance(rd, dict) else None,
+            rr.get('rapport') if isinstance(rr, dict) else None,
+            rd.get('favoris') if isinstance(rd, dict) else None)
+
+
+class CourseSuivie:
+    """État en mémoire d'une course : signatures, scores et affichage courant."""
+
+    def __init__(self, item, participants, rankings):
+        self.item = item
+        self.distance = item['course'].get('distance', 0)
+        self.rankings = rankings
+        self.signatures = {}
+        self.scores = {}
+        self.scored = []
+        self.maj(participants)
+
+    def maj(self, participants):
+        """Re-score uniquement les partants dont la cote a changé.
+
+        Retourne le nombre de partants re-scorés. Si le nombre de partants
+        change (non-partant), toute la course est re-scorée (ajustement
+        peloton).
+        """
+        partants = filtrer_partants(participants)
+        nums = {p.get('numPmu') for p in partants}
+        tout = len(partants) != len(self.scores) or nums != set(self.scores)
+        if tout:
+            self.scores = {}
+            self.signatures = {}
+        rescored = 0
+        for p in partants:
+            num = p.get('numPmu')
+            sig = signature_rapport(p)
+            if not tout and self.signatures.get(num) == sig:
                 continue
+            self.signatures[num] = sig
+            self.scores[num] = score_participant(p, self.distance, self.rankings, len(partants))
+            rescored += 1
+        if rescored:
+            self.scored = normaliser([dict(s) for s in self.scores.values()])
+        return rescored
+
+    def affichage(self):
+        """{num: (rang, ligne)} + état de divergence, pour calculer le delta."""
+        lignes = {s['num']: (i, ligne_partant(i, s)) for i, s in enumerate(self.scored)}
+        fav, notre1 = divergence(self.scored) if self.scored else (None, None)
+        etat_div = (fav['num'] if fav else None, notre1['num'] if notre1 else None)
+        return lignes, etat_div
+
+
+def watch(client, date_pmu, selection, rankings, intervalle, timing=False):
+    """Poll les courses non parties toutes les `intervalle` secondes.
+
+    Classements et programme restent en mémoire ; seuls les partants dont
+    dernierRapportDirect a bougé sont re-scorés, et seules les lignes
+    modifiées (et les changements de divergence) sont réaffichées.
+    """
+    suivies = {}
+    participants_par_course = fetch_participants(client, date_pmu, selection)
+    for item, participants in zip(selection, participants_par_course):
+        if not participants:
+            continue
+        suivie = CourseSuivie(item, participants, rankings)
+        if suivie.scored:
+            suivies[(item['r_num'], item['c_num'])] = suivie
+            afficher_course(item, suivie.scored)
+
+    print(f"\n👀 Watch toutes les {intervalle:g}s — Ctrl+C pour arrêter")
+    try:
+        while True:
+            time.sleep(intervalle)
+            now_ms = time.time() * 1000
+            a_suivre = [s.item for s in suivies.values()
+                        if (s.item['course'].get('heureDepart') or 0) > now_ms]
+            if not a_suivre:
+                print("\n🏁 Toutes les courses suivies sont parties.")
+                break
+
+            t0 = time.perf_counter()
+            participants_par_course = fetch_participants(client, date_pmu, a_suivre)
+            t_fetch = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            deltas = []
+            nb_rescores = 0
+            for item, participants in zip(a_suivre, participants_par_course):
+                if not participants:
+                    continue
+                suivie = suivies[(item['r_num'], item['c_num'])]
+                avant, div_avant = suivie.affichage()
+                rescored = suivie.maj(participants)
+                if not rescored:
+                    continue
+                nb_rescores += rescored
+                apres, div_apres = suivie.affichage()
+                changees = sorted(rang_ligne for num, rang_ligne in apres.items()
+                                  if avant.get(num) != rang_ligne)
+                if changees or div_avant != div_apres:
+                    deltas.append((suivie, changees, div_avant != div_apres))
+            t_scoring = time.perf_counter() - t0
+
+            heure = datetime.now().strftime('%H:%M:%S')
+            for suivie, changees, div_change in deltas:
+                item = suivie.item
+                print(f"\n↻ {heure} {item['hippo_nom']} R{item['r_num']}C{item['c_num']} — "
+                      f"{len(changees)} ligne(s) modifiée(s)")
+                for _, ligne in changees:
+                    print(ligne)
+                if div_change:
+                    afficher_divergence(suivie.scored)
+            if timing:
+                print(f"⏱️  {heure} fetch {t_fetch * 1000:.0f} ms ({len(a_suivre)} courses), "
+                      f"scoring {t_scoring * 1000:.1f} ms ({nb_rescores} partants re-scorés)")
+    except KeyboardInterrupt:
+        print("\n⏹️  Watch arrêté.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Live scoring des courses du jour")
+    parser.add_argument('reunion', nargs='?', help="R1, R2... (optionnel)")
+    parser.add_argument('course', nargs='?', help="C1, C2... (optionnel)")
+    parser.add_argument('--timing', action='store_true',
+                        help="affiche le temps de fetch et de scoring séparément")
+    parser.add_argument('--watch', type=float, metavar='N', default=None,
+                        help="re-poll toutes les N secondes les courses non parties")
+    args = parser.parse_args(argv)
+
+    args.filter_r = None
+    args.filter_c = None
+    if args.reunion:
+        m = re.match(r'R(\d+)', args.reunion, re.I)
+        if m:
+            args.filter_r = int(m.group(1))
+    if args.course:
+        m = re.match(r'C(\d+)', args.course, re.I)
+        if m:
+            args.filter_c = int(m.group(1))
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.timing:
+        # Statistiques réseau de pmu_client (log_stats) : logger INFO
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+    date_pmu = datetime.now().strftime("%d%m%Y")
+    date_iso = datetime.now().strftime("%Y-%m-%d")
+
+    print(f"\n🏇 LIVE SCORING — {date_iso}")
+    print("=" * 60)
+
+    # Charger les classements
+    t0 = time.perf_counter()
+    rankings = load_rankings()
+    rankings['chevaux'].resolver()
+    t_rankings = time.perf_counter() - t0
+    print(f"📊 {rankings['chevaux'].nb('2025')} chevaux 2025, {len(rankings['jockeys_2025'])} jockeys")
+
+    # Récupérer le programme puis tous les participants en parallèle
+    t0 = time.perf_counter()
+    client = get_client()
+    programme = client.get(f"programme/{date_pmu}?specialisation=INTERNET")
+    if not programme:
+        print("❌ Pas de programme aujourd'hui")
+        return
+
+    reunions = programme.get('programme', {}).get('reunions', [])
+    selection = selectionner_courses(reunions, args.filter_r, args.filter_c)
+
+    if args.watch:
+        watch(client, date_pmu, selection, rankings, args.watch, timing=args.timing)
+        sauver_correspondances(rankings)
+        return
+
+    participants_par_course = fetch_participants(client, date_pmu, selection)
+    t_fetch = time.perf_counter() - t0
+
+    # Scorer (dans l'ordre du programme)
+    t0 = time.perf_counter()
+    resultats = []
+    for item, participants in zip(selection, participants_par_course):
+        if not participants:
+            continue
+        scored = scorer_course(participants, item['course'].get('distance', 0), rankings)
+        if scored:
+            resultats.append((item, scored))
+    t_scoring = time.perf_counter() - t0
+    sauver_correspondances(rankings)
 
-            # Scorer
-            scored = [score_participant(p, distance, rankings, len(partants)) for p in partants]
-            scored.sort(key=lambda x: -x['score'])
-
-            # Normaliser 10-90
-            scores = [s['score'] for s in scored]
-            min_s, max_s = min(scores), max(scores)
-            rng = max_s - min_s or 1
-            for s in scored:
-                s['score_norm'] = round((s['score'] - min_s) / rng * 80 + 10, 1)
-
-            # Afficher
-            dist_label = 'Sprint' if distance < 1400 else 'Mile' if distance < 1700 else 'Middle' if distance < 2200 else 'Staying'
-            print(f"\n{'━' * 60}")
-            print(f"🏟️  {hippo_nom} R{r_num}C{c_num} — {c_nom}")
-            print(f"📏 {distance}m ({dist_label}) | ⏰ {depart} | 🐴 {len(partants)} partants")
-            print(f"{'━' * 60}")
-            print(f"{'#':>3} {'Cheval':<22} {'Cote':>5} {'Dérive':>7} {'Val':>4} {'Mus':>4} {'Score':>6}")
-            print(f"{'─' * 60}")
-
-            for i, s in enumerate(scored):
-                medal = '🥇' if i == 0 else '🥈' if i == 1 else '🥉' if i == 2 else '  '
-                cote_str = f"{s['cote']:.1f}" if s['cote'] > 0 else '-'
-                derive_color = s['derive']
-                print(f"{medal}{s['num']:>2} {s['nom'][:21]:<22} {cote_str:>5} {derive_color:>7} {s['valeur']:>4.0f} {s['musique_score']:>4} {s['score_norm']:>6}")
-
-            # Favori marché
-            by_cote = sorted([s for s in scored if s['cote'] > 1], key=lambda x: x['cote'])
-            if by_cote:
-                fav = by_cote[0]
-                notre1 = scored[0]
-                if fav['num'] != notre1['num']:
-                    print(f"\n⭐ Favori marché: #{fav['num']} {fav['nom'][:20]} (cote {fav['cote']:.1f})")
-                    print(f"🎯 Notre #1:      #{notre1['num']} {notre1['nom'][:20]} (cote {notre1['cote']:.1f})")
-                    print(f"   → DIVERGENCE = potentiel VALUE BET")
-                else:
-                    print(f"\n✅ Notre #1 = Favori marché: #{notre1['num']} {notre1['nom'][:20]}")
+    for item, scored in resultats:
+        afficher_course(item, scored)
 
     print(f"\n{'=' * 60}")
+    if args.timing:
+        nb_partants = sum(len(scored) for _, scored in resultats)
+        print(f"⏱️  Classements: {t_rankings * 1000:.0f} ms")
+        print(f"⏱️  Fetch:       {t_fetch * 1000:.0f} ms ({len(selection)} courses + programme)")
+        print(f"⏱️  Scoring:     {t_scoring * 1000:.1f} ms ({len(resultats)} courses, {nb_partants} partants)")
+        client.log_stats()
     print("Terminé.")
 
 
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Régression logistique NumPy par Newton / IRLS, partagée par les scripts
+de diagnostic (diagnostic_derive_cote, validation_out_of_sample).
+
+Les scripts ajustaient P(win) ~ log(1/cote) + derive par 2000 époques de
+descente de gradient en Python pur (une boucle par partant et par
+époque). Ici chaque itération de Newton est un produit matriciel :
+
+    β ← β + (Xᵀ W X)⁻¹ Xᵀ (y − p),   W = diag(p (1 − p))
+
+convergence en 5 à 8 itérations ; erreurs standard tirées de la
+Hessienne au point final (√diag((Xᵀ W X)⁻¹)). Nombre de features libre,
+poids de fréquence optionnels ; fit_logistique_lot ajuste d'un coup
+un lot de jeux de poids (tirages bootstrap, cf. bootstrap.py).
+
+Les 2000 époques (lr 0.05) des scripts s'arrêtaient avant l'optimum :
+sur Paris 2026 (4450 partants) elles donnaient a=+1.163 b=+0.029
+c=-2.753 quand le maximum de vraisemblance est a=+1.230 b=+0.054
+c=-2.817 (écart ≈ 1 erreur standard). La même descente prolongée
+(20000 époques) retombe sur Newton à 1e-8 près ; descente_gradient
+garde la version vectorisée de l'ancien ajustement pour ce contrôle :
+
+    python3 logreg.py verifier
+
+Logit conditionnel par course (fit_conditionnel) : P(i gagne | course) =
+exp(xᵢβ) / Σ exp(xⱼβ) sur les partants de la course ; l'intercept et
+tout effet propre à la course disparaissent. Courses contiguës, `starts`
+comme courses_dataset / feature_store.
+
+Usage:
+    from logreg import fit_logistique, fit_conditionnel, standardiser
+    Xs, moyennes, ecarts = standardiser(X)
+    res = fit_logistique(Xs, y)             # coef [a, b, ..., intercept]
+    res.coef, res.se, res.iterations
+    res = fit_conditionnel(Xs, y, starts)   # sans intercept
+"""
+
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+Ajustement = namedtuple("Ajustement", "coef se iterations converge loglik")
+
+MAX_ITER = 50
+TOLERANCE = 1e-10
+
+
+def standardiser(X):
+    """(X centré réduit, moyennes, écarts-types) ; écart-type population,
+    1 pour une colonne constante (comme mean_std des scripts)."""
+    X = np.asarray(X, dtype=np.float64)
+    moyennes = X.mean(axis=0)
+    ecarts = np.sqrt(((X - moyennes) ** 2).mean(axis=0))
+    ecarts = np.where(ecarts > 0, ecarts, 1.0)
+    return (X - moyennes) / ecarts, moyennes, ecarts
+
+
+def sigmoid(z):
+    """Sigmoïde stable (pas d'overflow de exp pour z très négatif)."""
+    z = np.asarray(z, dtype=np.float64)
+    ez = np.exp(-np.abs(z))
+    return np.where(z >= 0, 1.0 / (1.0 + ez), ez / (1.0 + ez))
+
+
+def _resoudre(H, g):
+    """Pas de Newton H⁻¹ g ; NaN pour une Hessienne singulière (en lot :
+    seules les lignes singulières, les autres sont résolues)."""
+    try:
+        return np.linalg.solve(H, g[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        if H.ndim == 2:
+            return np.full(g.shape, np.nan)
+    pas = np.full(g.shape, np.nan)
+    for j in range(len(H)):
+        try:
+            pas[j] = np.linalg.solve(H[j], g[j])
+        except np.linalg.LinAlgError:
+            pass
+    return pas
+
+
+def _echec(k, iterations):
+    """Ajustement non identifié (Hessienne singulière) : tout à NaN."""
+    return Ajustement(np.full(k, np.nan), np.full(k, np.nan), iterations, False, np.nan)
+
+
+def _newton(X, gradient_hessienne, loglik, max_iter, tol):
+    """Itérations de Newton avec demi-pas si la vraisemblance baisse.
+    Hessienne singulière (coefficient non identifié) → coef et se NaN."""
+    beta = np.zeros(X.shape[1])
+    ll = loglik(beta)
+    converge = False
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        g, H = gradient_hessienne(beta)
+        pas = _resoudre(H, g)
+        if not np.all(np.isfinite(pas)):
+            return _echec(X.shape[1], iterations)
+        t = 1.0
+        while True:
+            candidat = beta + t * pas
+            ll_candidat = loglik(candidat)
+            if ll_candidat >= ll - 1e-12 or t < 1e-6:
+                break
+            t /= 2
+        beta, ll = candidat, ll_candidat
+        if np.max(np.abs(t * pas)) < tol:
+            converge = True
+            break
+    _, H = gradient_hessienne(beta)
+    try:
+        se = np.sqrt(np.diag(np.linalg.inv(H)))
+    except np.linalg.LinAlgError:
+        se = np.full(X.shape[1], np.nan)
+    return Ajustement(beta, se, iterations, converge, float(ll))
+
+
+def fit_logistique(X, y, intercept=True, poids=None, max_iter=MAX_ITER, tol=TOLERANCE):
+    """Maximum de vraisemblance de P(y=1) = σ(Xβ [+ c]).
+
+    X [n, k], y [n] (0/1), poids [n] de fréquence optionnels. Avec
+    intercept, il est ajouté en dernière colonne (coef [..., c]).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[:, None]
+    if intercept:
+        X = np.column_stack([X, np.ones(len(X))])
+    y = np.asarray(y, dtype=np.float64)
+    w = np.ones(len(y)) if poids is None else np.asarray(poids, dtype=np.float64)
+
+    def loglik(beta):
+        z = X @ beta
+        # log σ(z) = -log(1 + e^-z), écrit sans overflow
+        return float(np.sum(w * (y * z - np.logaddexp(0.0, z))))
+
+    def gradient_hessienne(beta):
+        p = sigmoid(X @ beta)
+        g = X.T @ (w * (y - p))
+        H = (X * (w * p * (1 - p))[:, None]).T @ X
+        return g, H
+
+    return _newton(X, gradient_hessienne, loglik, max_iter, tol)
+
+
+def fit_logistique_lot(X, y, poids, depart=None, intercept=True, max_iter=MAX_ITER, tol=TOLERANCE):
+    """Coefficients [B, k] de B ajustements de même X, y et poids [B, n]
+    (un jeu de poids de fréquence par ligne : tirages bootstrap).
+
+    Newton en parallèle sur les B jeux (produits matriciels [B, n]),
+    départ commun `depart` (l'ajustement complet, en général), en pas
+    plein : pas de demi-pas en lot. Un jeu dont la vraisemblance baisse,
+    dont la Hessienne est singulière ou qui ne converge pas en max_iter
+    est repris seul par fit_logistique (demi-pas ; NaN si non identifié).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[:, None]
+    if intercept:
+        X = np.column_stack([X, np.ones(len(X))])
+    y = np.asarray(y, dtype=np.float64)
+    W = np.asarray(poids, dtype=np.float64)
+    B, k = len(W), X.shape[1]
+    XX = (X[:, :, None] * X[:, None, :]).reshape(len(X), k * k)
+    beta = np.zeros((B, k)) if depart is None else np.tile(np.asarray(depart, dtype=np.float64), (B, 1))
+
+    def loglik(b, w):
+        z = b @ X.T
+        return np.sum(w * (y * z - np.logaddexp(0.0, z)), axis=1)
+
+    actifs = np.arange(B)
+    repris = []
+    ll = loglik(beta, W)
+    for _ in range(max_iter):
+        w = W[actifs]
+        p = sigmoid(beta[actifs] @ X.T)
+        g = (w * (y - p)) @ X
+        H = ((w * p * (1 - p)) @ XX).reshape(-1, k, k)
+        pas = _resoudre(H, g)
+        candidat = beta[actifs] + pas
+        with np.errstate(invalid="ignore"):         # pas NaN (Hessienne singulière)
+            ll_candidat = loglik(candidat, w)
+        ok = np.isfinite(ll_candidat) & (ll_candidat >= ll[actifs] - 1e-12)
+        repris.extend(actifs[~ok].tolist())
+        beta[actifs[ok]] = candidat[ok]
+        ll[actifs[ok]] = ll_candidat[ok]
+        actifs = actifs[ok & (np.max(np.abs(pas), axis=1) >= tol)]
+        if not len(actifs):
+            break
+    for j in repris + actifs.tolist():
+        beta[j] = fit_logistique(X, y, intercept=False, poids=W[j], max_iter=max_iter, tol=tol).coef
+    return beta
+
+
+def fit_conditionnel(X, y, starts, poids=None, max_iter=MAX_ITER, tol=TOLERANCE):
+    """Logit conditionnel par course (softmax des partants de chaque course).
+
+    y [n] : 1 pour le(s) gagnant(s) ; une course sans gagnant ne compte
+    pas. poids [nb courses] : poids de fréquence par course optionnels.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[:, None]
+    y = np.asarray(y, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.int64)
+    tailles = np.diff(np.append(starts, len(y)))
+    gagnants = np.add.reduceat(y, starts)
+    w = gagnants if poids is None else gagnants * np.asarray(poids, dtype=np.float64)
+    wy = y if poids is None else y * np.repeat(np.asarray(poids, dtype=np.float64), tailles)
+
+    def softmax(beta):
+        z = X @ beta
+        z = z - np.repeat(np.maximum.reduceat(z, starts), tailles)
+        ez = np.exp(z)
+        somme = np.add.reduceat(ez, starts)
+        return z, ez / np.repeat(somme, tailles), np.log(somme)
+
+    def loglik(beta):
+        z, _, log_somme = softmax(beta)
+        return float(np.sum(wy * z) - np.sum(w * log_somme))
+
+    def gradient_hessienne(beta):
+        _, p, _ = softmax(beta)
+        moyenne = np.add.reduceat(p[:, None] * X, starts)          # E_p[x] par course
+        g = X.T @ wy - moyenne.T @ w
+        second = np.add.reduceat(p[:, None, None] * X[:, :, None] * X[:, None, :], starts)
+        H = np.einsum("g,gij->ij", w, second) - (moyenne * w[:, None]).T @ moyenne
+        return g, H
+
+    return _newton(X, gradient_hessienne, loglik, max_iter, tol)
+
+
+def descente_gradient(X, y, lr=0.05, n_iter=2000, depart=None):
+    """Ancien ajustement des scripts (descente de gradient à pas fixe,
+    intercept en dernière colonne), vectorisé. Référence de contrôle."""
+    X = np.column_stack([np.asarray(X, dtype=np.float64), np.ones(len(y))])
+    y = np.asarray(y, dtype=np.float64)
+    beta = np.zeros(X.shape[1]) if depart is None else np.array(depart, dtype=np.float64)
+    for _ in range(n_iter):
+        beta -= lr * (X.T @ (sigmoid(X @ beta) - y)) / len(y)
+    return beta
+
+
+def _donnees_paris():
+    """log(1/cote), derive et gagnant des partants Paris 2026."""
+    sys.path.insert(0, os.path.join(ROOT, "scripts"))
+    from diagnostic_derive_cote import collect_participants
+    rows = collect_participants()
+    X = np.array([[np.log(1.0 / r["cote"]), r["derive"]] for r in rows])
+    y = np.array([r["gagnant"] for r in rows], dtype=np.float64)
+    return X, y
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "verifier"
+    if cmd != "verifier":
+        print("Usage: python3 logreg.py verifier", file=sys.stderr)
+        sys.exit(1)
+    X, y = _donnees_paris()
+    Xs, _, _ = standardiser(X)
+    t0 = time.perf_counter()
+    res = fit_logistique(Xs, y)
+    t_newton = time.perf_counter() - t0
+    print(f"📊 {len(y)} partants, {int(y.sum())} gagnants")
+    print(f"   Newton     {res.iterations} itérations, {t_newton * 1000:.1f} ms : "
+          + " ".join(f"{v:+.4f}" for v in res.coef)
+          + "  (se " + " ".join(f"{v:.4f}" for v in res.se) + ")")
+    for n_iter in (2000, 20000):
+        t0 = time.perf_counter()
+        beta = descente_gradient(Xs, y, n_iter=n_iter)
+        ecart = np.max(np.abs(beta - res.coef))
+        print(f"   gradient   {n_iter} époques, {time.perf_counter() - t0:.2f} s : "
+              + " ".join(f"{v:+.4f}" for v in beta) + f"  (écart max {ecart:.1e})")
+    if ecart > 1e-6:
+        print(f"❌ Newton et descente convergée divergent ({ecart:.1e})")
+        sys.exit(1)
+    print("✅ Newton = optimum de la descente de gradient convergée")
+
+
+if __name__ == "__main__":
+    main()
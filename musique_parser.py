@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Parseur de musique PMU ("7p5p(25)2p2pDa0a") commun au live scoring et
+aux scripts.
+
+live-scoring.parse_musique et les score_musique des scripts relançaient
+re.sub / re.findall sur chaque chaîne à chaque appel, avec des règles
+différentes. Ici chaque musique est découpée une seule fois en
+enregistrement structuré :
+
+    places        1..n, 0 = non placé ("0"), None = incident
+    incidents     lettre de l'incident (D disqualifié, A arrêté, T tombé,
+                  R rétrogradé, J, Q...) ou "" pour une place
+    disciplines   a attelé, m monté, p plat, h haies, s steeple, c cross
+    annees        0 = saison en cours, sinon année du séparateur "(25)"
+    separateurs   (indice de la première course, année) de chaque "(aa)"
+
+Les places à plusieurs chiffres ("12a") sont lues en entier. Les deux
+scores historiques sont recalculés à partir de l'enregistrement, avec
+leurs règles propres rendues explicites :
+
+    score_live      (live-scoring) 5 premières entrées parmi places et
+                    incidents D/R/T ; 0 et D/R/T comptent comme place 12 ;
+                    autres incidents ignorés ; < 2 entrées → 50. Échelle 0-100.
+    score_baseline  (scripts) 5 premières places, incidents ignorés ;
+                    0 et au-delà de 7 → 0 pt. Échelle 0-10.
+
+Cache LRU en mémoire par chaîne brute, et store persistant optionnel des
+musiques déjà vues (data/musiques/, .npy relus en memory-map, non
+versionné) utilisé par l'API batch :
+
+    python3 musique_parser.py build        # musiques de data/dataset
+    python3 musique_parser.py info
+    python3 musique_parser.py "7p5p(25)2p2pDa0a"
+
+    from musique_parser import parse, score_live, tableau
+    parse("1aDa(25)3a").places             # (1, None, 3)
+    t = tableau(musiques, k=5)             # place [n, 5], score_live [n]...
+"""
+
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from json_io import read_json, write_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'data')
+STORE_DIR = os.path.join(DATA_DIR, 'musiques')
+
+VERSION = 1
+MAX_COURSES = 10       # le PMU affiche au plus 10 courses
+NON_PLACE = 0          # "0" : au-delà des places
+INCIDENT = -1          # place d'un incident dans les tableaux batch
+VIDE = -2              # pas de course (musique plus courte que k)
+
+# Séparateur d'année "(25)" ou entrée : place / incident + discipline
+_RE_ENTREE = re.compile(r'\((\d+)\)|(\d+|[A-Za-z])([a-z])')
+
+INCIDENTS_LIVE = "DRT"
+POINTS_LIVE = {1: 100, 2: 80, 3: 65}
+POINTS_BASELINE = {1: 10, 2: 7, 3: 5, 4: 3, 5: 2, 6: 1, 7: 1}
+POIDS_BASELINE = (5, 4, 3, 2, 1)
+
+Musique = namedtuple("Musique", "brut places incidents disciplines annees separateurs")
+VIDE_MUSIQUE = Musique("", (), (), (), (), ())
+
+COLONNES = ("brut", "place", "incident", "discipline", "annee", "nb",
+            "nb_disqualifications", "score_live", "score_baseline")
+
+
+@lru_cache(maxsize=1 << 17)
+def parse(brut):
+    """Enregistrement structuré d'une musique (mémoïsé par chaîne brute)."""
+    if not brut:
+        return VIDE_MUSIQUE
+    places, incidents, disciplines, annees, separateurs = [], [], [], [], []
+    annee = 0
+    for m in _RE_ENTREE.finditer(brut):
+        sep, code, discipline = m.groups()
+        if sep is not None:
+            annee = int(sep)
+            separateurs.append((len(places), annee))
+            continue
+        if code.isdigit():
+            places.append(int(code))
+            incidents.append("")
+        else:
+            places.append(None)
+            incidents.append(code.upper())
+        disciplines.append(discipline)
+        annees.append(annee)
+    return Musique(brut, tuple(places), tuple(incidents), tuple(disciplines),
+                   tuple(annees), tuple(separateurs))
+
+
+def nb_disqualifications(rec):
+    return sum(1 for i in rec.incidents if i == "D")
+
+
+@lru_cache(maxsize=1 << 17)
+def score_live(brut):
+    """Score 0-100 de live-scoring (50 si musique vide ou < 2 entrées)."""
+    if not brut:
+        return 50
+    rec = parse(brut)
+    entrees = [12 if p is None or p == 0 else p
+               for p, i in zip(rec.places, rec.incidents)
+               if p is not None or i in INCIDENTS_LIVE]
+    if len(entrees) < 2:
+        return 50
+    last5 = entrees[:5]
+    sc, w = 0, 0
+    for i, pos in enumerate(last5):
+        wt = (len(last5) - i) / len(last5)
+        ps = POINTS_LIVE.get(pos, 45 if pos <= 5 else (25 if pos <= 8 else 10))
+        sc += ps * wt
+        w += wt
+    return sc / w if w > 0 else 50
+
+
+@lru_cache(maxsize=1 << 17)
+def score_baseline(brut):
+    """Score 0-10 des scripts de backtest (0.0 si aucune place)."""
+    if not brut:
+        return 0.0
+    positions = [p for p in parse(brut).places if p is not None][:5]
+    if not positions:
+        return 0.0
+    total_w = sum(POIDS_BASELINE[:len(positions)])
+    s = sum(POINTS_BASELINE.get(p, 0) * w for p, w in zip(positions, POIDS_BASELINE))
+    return s / total_w if total_w > 0 else 0.0
+
+
+# ============================================================
+# Tableaux batch et store persistant
+# ============================================================
+
+def _colonnes(bruts):
+    """Colonnes (largeur MAX_COURSES) d'une liste de musiques distinctes."""
+    n = len(bruts)
+    place = np.full((n, MAX_COURSES), VIDE, dtype=np.int16)
+    incident = np.full((n, MAX_COURSES), "", dtype="U1")
+    discipline = np.full((n, MAX_COURSES), "", dtype="U1")
+    annee = np.zeros((n, MAX_COURSES), dtype=np.int16)
+    nb = np.zeros(n, dtype=np.int16)
+    nb_disq = np.zeros(n, dtype=np.int16)
+    for j, brut in enumerate(bruts):
+        rec = parse(brut)
+        m = min(len(rec.places), MAX_COURSES)
+        nb[j] = len(rec.places)
+        nb_disq[j] = nb_disqualifications(rec)
+        place[j, :m] = [INCIDENT if p is None else p for p in rec.places[:m]]
+        incident[j, :m] = rec.incidents[:m]
+        discipline[j, :m] = rec.disciplines[:m]
+        annee[j, :m] = rec.annees[:m]
+    return {
+        "brut": np.array(bruts, dtype=str),
+        "place": place,
+        "incident": incident,
+        "discipline": discipline,
+        "annee": annee,
+        "nb": nb,
+        "nb_disqualifications": nb_disq,
+        "score_live": np.array([score_live(b) for b in bruts], dtype=np.float64),
+        "score_baseline": np.array([score_baseline(b) for b in bruts], dtype=np.float64),
+    }
+
+
+class MusiqueStore:
+    """Musiques déjà parsées (brut trié, lignes alignées), en memory-map."""
+
+    def __init__(self, path=STORE_DIR, mmap=True):
+        self.path = path
+        self.meta = read_json(os.path.join(path, "meta.json"))
+        if self.meta.get("version") != VERSION:
+            raise ValueError(f"{path}: version {self.meta.get('version')} ≠ {VERSION}")
+        mode = "r" if mmap else None
+        self.cols = {name: np.load(os.path.join(path, f"{name}.npy"),
+                                   mmap_mode=mode, allow_pickle=False)
+                     for name in COLONNES}
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def lignes(self, bruts):
+        """Ligne de chaque musique (tableau str), -1 si absente du store."""
+        keys = self.cols["brut"]
+        idx = np.searchsorted(keys, bruts)
+        idx[idx >= len(keys)] = 0
+        return np.where(keys[idx] == bruts, idx, -1) if len(keys) else np.full(len(bruts), -1)
+
+
+def build_store(musiques=None, path=STORE_DIR):
+    """(Re)construit le store : musiques données + déjà stockées, ou celles
+    de data/dataset par défaut. Retourne le nombre de musiques."""
+    if musiques is None:
+        from courses_dataset import load_dataset
+        musiques = load_dataset().categories("musique").tolist()
+    bruts = set(m for m in musiques if m)
+    try:
+        bruts.update(MusiqueStore(path).cols["brut"].tolist())
+    except (OSError, ValueError):
+        pass
+    cols = _colonnes(sorted(bruts))
+    os.makedirs(path, exist_ok=True)
+    for name, values in cols.items():
+        tmp = os.path.join(path, f"{name}.tmp.npy")
+        np.save(tmp, values, allow_pickle=False)
+        os.replace(tmp, os.path.join(path, f"{name}.npy"))
+    write_json(os.path.join(path, "meta.json"), {
+        "version": VERSION,
+        "built_at": datetime.now().isoformat(timespec='seconds'),
+        "rows": len(bruts),
+        "max_courses": MAX_COURSES,
+    })
+    _stores.pop(path, None)
+    return len(bruts)
+
+
+_stores = {}
+
+
+def load_store(path=STORE_DIR):
+    """Store partagé (un chargement par processus), None s'il n'existe pas."""
+    if path not in _stores:
+        try:
+            _stores[path] = MusiqueStore(path)
+        except (OSError, ValueError):
+            _stores[path] = None
+    return _stores[path]
+
+
+def tableau(musiques, k=5, store=True):
+    """Colonnes NumPy d'une série de musiques (une ligne par élément).
+
+    place [n, k] (NON_PLACE, INCIDENT, VIDE), incident / discipline [n, k],
+    annee [n, k], nb, nb_disqualifications, score_live, score_baseline [n].
+    Chaque musique distincte n'est lue qu'une fois : depuis le store
+    persistant si elle y est, sinon parsée (cache LRU).
+    """
+    musiques = np.asarray(["" if m is None else m for m in musiques], dtype=str)
+    uniques, inverse = np.unique(musiques, return_inverse=True)
+    st = load_store() if store else None
+    lignes = st.lignes(uniques) if st is not None else np.full(len(uniques), -1)
+    manquantes = np.flatnonzero(lignes < 0)
+    cols = _colonnes(uniques[manquantes].tolist())
+    out = {}
+    for name in COLONNES[1:]:
+        valeurs = cols[name]
+        if st is not None and len(manquantes) < len(uniques):
+            connues = np.asarray(st.cols[name][lignes[lignes >= 0]])
+            complet = np.empty((len(uniques),) + valeurs.shape[1:], dtype=valeurs.dtype)
+            complet[lignes >= 0] = connues
+            complet[manquantes] = valeurs
+            valeurs = complet
+        valeurs = valeurs[inverse]
+        out[name] = valeurs[:, :k] if valeurs.ndim == 2 else valeurs
+    return out
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "info"
+    if cmd == "build":
+        t0 = time.perf_counter()
+        n = build_store()
+        print(f"✅ {STORE_DIR} — {n} musiques en {time.perf_counter() - t0:.2f}s")
+    elif cmd == "info":
+        st = load_store()
+        if st is None:
+            print(f"❌ {STORE_DIR} absent (python3 musique_parser.py build)")
+            sys.exit(1)
+        print(f"📦 {len(st)} musiques — build {st.meta['built_at']}")
+    else:
+        for brut in sys.argv[1:]:
+            rec = parse(brut)
+            entrees = " ".join(f"{i or p}{d}" + (f"/{a}" if a else "")
+                               for p, i, d, a in zip(rec.places, rec.incidents,
+                                                     rec.disciplines, rec.annees))
+            print(f"🎵 {brut}: {entrees}")
+            print(f"   live {score_live(brut):.1f}  baseline {score_baseline(brut):.2f}  "
+                  f"disqualifications {nb_disqualifications(rec)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Correspondance des noms PMU abrégés ("C. DEMURO", "MME S.LESAGE DE LA
+HAYE", "JUL .PHELIPPON") avec les noms des classements France Galop
+("CRISTIAN DEMURO", "MME S. LESAGE DE LA HAYE", "JUL. PHELIPPON").
+
+Remplace la boucle de live-scoring.match_initiale (endswith / sous-chaîne
+sur toutes les entrées à chaque appel) par un index construit une fois :
+
+    nom complet normalisé             → clé du classement
+    (nom de famille, initiale prénom) → clés candidates
+
+Les titres MME / MLLE et les suffixes entre parenthèses ("(S)", "(IRE)")
+sont ignorés des deux côtés ; la normalisation est celle de
+entity_ids.cle (accents, espaces autour des points). Chaque recherche est
+une ou deux lectures de dict. Quand plusieurs entités distinctes
+correspondent, le résultat est marqué ambigu au lieu de renvoyer la
+première trouvée.
+
+Usage:
+    python3 name_matcher.py jockeys "C. DEMURO" "M.Z .SAHEBJAN"
+    python3 name_matcher.py audit jockeys      # noms de data/courses vs classement
+
+    from name_matcher import InitialeMatcher
+    matcher = InitialeMatcher(rankings["jockeys"])      # dict clé → entrée
+    res = matcher.resoudre("C. DEMURO")
+    res.cle, res.methode, res.candidats                 # "exacte" | "initiale" | "ambigu" | None
+    matcher.match("C. DEMURO")                          # entrée ou None
+"""
+
+import os
+import re
+import sys
+from collections import Counter, namedtuple
+
+from entity_ids import cle
+from json_io import read_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'data')
+
+_RE_TITRE = re.compile(r'^(?:MME|MLLE)\b\.?\s*')
+_RE_PARENTHESES = re.compile(r'\s*\([^)]*\)')
+_RE_TOKEN = re.compile(r"[^ .]+\.?")
+_RE_PARTICULE = re.compile(r"^[DL]'(.{3,})$")
+
+MIN_FAMILLE = 3
+PARTICULES = {"DE", "DU", "DES", "LA", "LE", "LES", "DEL", "DOS", "DAS", "VAN", "VON", "DER", "DEN"}
+
+Resultat = namedtuple("Resultat", "cle methode candidats")
+AUCUN = Resultat(None, None, ())
+
+
+def _tokens(nom):
+    """Nom normalisé sans titre ni parenthèses → tokens ("M.", "Z.", "SAHEBJAN")."""
+    nom = _RE_PARENTHESES.sub("", cle(nom))
+    nom = _RE_TITRE.sub("", nom).strip()
+    return _RE_TOKEN.findall(nom)
+
+
+def _est_initiale(token):
+    return token.endswith(".") or len(token) == 1
+
+
+def _formes(prenom):
+    """Formes comparables d'un prénom : "FRANCOIS-HENRI" → {"FRANCOIS-HENRI", "FH"}."""
+    formes = {prenom}
+    if "-" in prenom:
+        formes.add("".join(p[:1] for p in prenom.split("-") if p))
+    return formes
+
+
+def _compatibles(a, b):
+    """Prénoms compatibles (même initiale garantie par l'index).
+
+    Une initiale ou abréviation pointée ("C", "JW.", "ECD.") est compatible
+    avec tout prénom ; deux prénoms complets doivent s'abréger l'un l'autre
+    ("CHARLIE" / "CHARLES" non, "JUL" / "JULIEN" oui).
+    """
+    if _est_initiale(a) or _est_initiale(b):
+        return True
+    return any(x.startswith(y) or y.startswith(x) for x in _formes(a) for y in _formes(b))
+
+
+def _familles(famille):
+    """Nom de famille + variante sans particule élidée ("D'ANDIGNE" → "ANDIGNE")."""
+    m = _RE_PARTICULE.match(famille)
+    return (famille, m.group(1)) if m else (famille,)
+
+
+def _partiels(famille):
+    """Composantes d'un nom composé ("LOPEZ SANCHEZ", "COSTA-AGUILAR"),
+    pour les noms PMU qui n'en gardent qu'une ("J. LOPEZ", "R. COSTA")."""
+    parts = [p for mot in famille.split(" ") for p in mot.split("-")]
+    if len(parts) < 2:
+        return ()
+    return tuple(p for p in dict.fromkeys(parts)
+                 if len(p) >= MIN_FAMILLE and p not in PARTICULES)
+
+
+def decouper(nom):
+    """(prénoms, nom de famille) d'un nom PMU ou classement.
+
+    Les initiales de tête ("M.Z.") forment le prénom ; sinon le premier
+    token est le prénom. Retourne None si rien d'exploitable.
+    """
+    tokens = _tokens(nom)
+    if len(tokens) < 2:
+        return None
+    n = 0
+    while n < len(tokens) - 1 and _est_initiale(tokens[n]):
+        n += 1
+    n = max(n, 1)
+    return tokens[:n], " ".join(t.rstrip(".") for t in tokens[n:])
+
+
+class InitialeMatcher:
+    """Index (nom de famille, initiale) sur les clés d'un classement.
+
+    index : nom de famille complet ; partiels : composantes des noms
+    composés, consultées seulement si le nom complet ne donne rien.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.exactes = {}
+        self.index = {}
+        self.partiels = {}
+        for key in data:
+            self.exactes.setdefault(cle(key), key)
+            tokens = _tokens(key)
+            if len(tokens) < 2:
+                continue
+            # Clé à initiales : un seul découpage ; nom complet : chaque
+            # suffixe peut être le nom de famille ("MOHAMMAD ZEESHAAN SAHEBJAN")
+            if _est_initiale(tokens[0]):
+                decoupes = [decouper(key)]
+            else:
+                decoupes = [(tokens[:s], " ".join(t.rstrip(".") for t in tokens[s:]))
+                            for s in range(1, len(tokens))]
+            for prenoms, famille in decoupes:
+                entry = (key, prenoms[0])
+                for variante in _familles(famille):
+                    self.index.setdefault((variante, prenoms[0][0]), []).append(entry)
+                for partiel in _partiels(famille):
+                    self.partiels.setdefault((partiel, prenoms[0][0]), []).append(entry)
+        # Sans doublons, ordre d'insertion conservé
+        for table in (self.index, self.partiels):
+            for k, entries in table.items():
+                table[k] = list(dict.fromkeys(entries))
+
+    def resoudre(self, nom):
+        if not nom or len(nom.strip()) < 3:
+            return AUCUN
+        exacte = self.exactes.get(cle(nom))
+        if exacte is not None:
+            return Resultat(exacte, "exacte", (exacte,))
+        parts = decouper(nom)
+        if parts is None:
+            return AUCUN
+        prenoms, famille = parts
+        if len(famille) < MIN_FAMILLE:
+            return AUCUN
+        for table in (self.index, self.partiels):
+            entries = table.get((famille, prenoms[0][0]), ())
+            candidats = tuple(dict.fromkeys(key for key, prenom in entries
+                                            if _compatibles(prenoms[0], prenom)))
+            if len(candidats) == 1:
+                return Resultat(candidats[0], "initiale", candidats)
+            if candidats:
+                return Resultat(None, "ambigu", candidats)
+        return AUCUN
+
+    def match(self, nom):
+        """Entrée du classement correspondant à nom, None si absente ou ambiguë."""
+        key = self.resoudre(nom).cle
+        return self.data[key] if key is not None else None
+
+
+def charger_classement(kind, data_dir=DATA_DIR):
+    """{NomPostal ou Nom: entrée} de data/{kind}_ponderated_latest.json (ou {kind}.json)."""
+    for name in (f"{kind}_ponderated_latest.json", f"{kind}.json"):
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            resultats = read_json(path).get("resultats", [])
+            return {(item.get("NomPostal") or item.get("Nom") or "").upper().strip(): item
+                    for item in resultats if item.get("NomPostal") or item.get("Nom")}
+    return {}
+
+
+def audit(kind):
+    """Répartition exacte / initiale / ambigu / absent des noms de data/courses."""
+    from courses_dataset import load_dataset
+    colonne = {"jockeys": "jockey", "entraineurs": "entraineur",
+               "proprietaires": "proprietaire", "eleveurs": "eleveur"}[kind]
+    matcher = InitialeMatcher(charger_classement(kind))
+    stats = Counter()
+    ambigus = {}
+    for nom in load_dataset().categories(colonne).tolist():
+        res = matcher.resoudre(nom)
+        stats[res.methode or "absent"] += 1
+        if res.methode == "ambigu":
+            ambigus[nom] = res.candidats
+    return stats, ambigus
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "audit":
+        stats, ambigus = audit(sys.argv[2])
+        total = sum(stats.values())
+        print(f"📊 {total} noms {sys.argv[2]} de data/courses")
+        for methode in ("exacte", "initiale", "ambigu", "absent"):
+            print(f"  {methode:<9} {stats[methode]:>6}  {stats[methode] / max(total, 1) * 100:5.1f}%")
+        for nom, candidats in sorted(ambigus.items())[:20]:
+            print(f"  ⚠️  {nom} → {' | '.join(candidats)}")
+    elif len(sys.argv) >= 3:
+        matcher = InitialeMatcher(charger_classement(sys.argv[1]))
+        for nom in sys.argv[2:]:
+            res = matcher.resoudre(nom)
+            if res.methode == "ambigu":
+                print(f"⚠️  {nom} → ambigu : {' | '.join(res.candidats)}")
+            elif res.cle:
+                print(f"✅ {nom} → {res.cle} ({res.methode})")
+            else:
+                print(f"❌ {nom} → aucun")
+    else:
+        print("Usage: python3 name_matcher.py <type> <nom>... | audit <type>", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
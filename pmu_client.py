@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Client HTTP partagé pour l'API PMU Turfinfo.
+
+Utilisé par scraper_courses_pmu.py, sscraper_courses_pmu.py,
+scraper_pre_course.py et live-scoring.py à la place des requests.get
+isolés (une poignée de main TCP+TLS par appel).
+
+- requests.Session avec pool keep-alive (connexions réutilisées)
+- gzip/deflate négociés via Accept-Encoding
+- une seule politique de retry : backoff exponentiel, Retry-After respecté
+  sur 429/503
+- timeouts par type d'endpoint (programme / course / participants)
+- concurrence par hôte + débit (token bucket) optionnels
+- compteurs et latences : python3 pmu_client.py 01042026 pour un aperçu
+- PMU_BASE_URL pour viser un autre serveur (rejeu local), PMU_RECORD_DIR
+  pour enregistrer les réponses (cf. pmu_fixtures.py)
+
+Usage:
+    from pmu_client import api_get, get_client
+    prog = api_get(f"programme/{date_pmu}?specialisation=INTERNET")
+    get_client().log_stats()
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://online.turfinfo.api.pmu.fr/rest/client/61"
+# Override (ex: serveur de rejeu pmu_fixtures.py) ; BASE_URL reste l'URL
+# canonique écrite dans les fichiers (url_source)
+API_BASE_URL = os.environ.get("PMU_BASE_URL") or BASE_URL
+# Si défini, chaque réponse 200 est enregistrée sur disque (cf. pmu_fixtures.py)
+RECORD_DIR = os.environ.get("PMU_RECORD_DIR") or None
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+    'Accept-Language': 'fr-FR,fr;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# (connect, read) en secondes, par type d'endpoint
+TIMEOUTS = {
+    "programme": (5, 30),
+    "course": (5, 15),
+    "participants": (5, 20),
+    "autre": (5, 30),
+}
+MAX_RETRIES = 3
+BACKOFF = 0.3             # secondes, doublé à chaque tentative
+MAX_RETRY_AFTER = 60      # plafond d'attente si le serveur demande plus
+POOL_SIZE = 16
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_RE_COURSE = re.compile(r'R\d+/C\d+$')
+
+
+class BudgetEpuise(Exception):
+    """Levée quand le budget global de requêtes du client est consommé."""
+
+
+def endpoint_kind(endpoint):
+    """Classe un endpoint: programme, course, participants ou autre."""
+    path = endpoint.split("?", 1)[0].rstrip("/")
+    if path.endswith("/participants"):
+        return "participants"
+    if _RE_COURSE.search(path):
+        return "course"
+    if path.startswith("programme/"):
+        return "programme"
+    return "autre"
+
+
+def parse_retry_after(value):
+    """Retry-After en secondes (entier ou date HTTP), None si illisible."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return max(0.0, (dt - datetime.now(timezone.utc)).total_seconds())
+
+
+# ============================================================
+# Limiteurs
+# ============================================================
+
+class TokenBucket:
+    """Limiteur de débit partagé entre threads (token bucket).
+
+    rate = jetons rechargés par seconde, burst = capacité max du seau.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostLimiter:
+    """Plafond de requêtes simultanées par hôte + débit global (token bucket)."""
+
+    def __init__(self, max_concurrency, rate):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.bucket = TokenBucket(rate, burst=self.max_concurrency) if rate else None
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_concurrency)
+            return self._semaphores[host]
+
+    def acquire_rate(self):
+        if self.bucket:
+            self.bucket.acquire()
+
+
+# ============================================================
+# Client
+# ============================================================
+
+class PMUClient:
+    """Session HTTP poolée vers l'API PMU, thread-safe."""
+
+    def __init__(self, base_url=None, max_retries=MAX_RETRIES, backoff=BACKOFF,
+                 max_concurrency=None, rate=None, pool_size=POOL_SIZE, timeouts=None,
+                 budget=None, record_dir=None):
+        self.base_url = (base_url or API_BASE_URL).rstrip("/")
+        self.record_dir = record_dir or RECORD_DIR
+        self.max_retries = max(1, max_retries)
+        self.backoff = backoff
+        self.timeouts = dict(TIMEOUTS, **(timeouts or {}))
+        self.max_concurrency = max_concurrency or pool_size
+        self.limiter = HostLimiter(self.max_concurrency, rate) if (max_concurrency or rate) else None
+        self.budget = budget        # nb max de requêtes HTTP (None = illimité)
+        self._issued = 0
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        # Retries gérés ici (Retry-After + stats), pas par urllib3
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(pool_size, self.max_concurrency),
+                              max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "errors": 0, "bytes": 0,
+                       "status": {}, "latency": {}}
+
+    # ---------- stats ----------
+
+    def _record(self, kind, status, elapsed, nbytes=0):
+        with self._lock:
+            s = self._stats
+            s["requests"] += 1
+            s["bytes"] += nbytes
+            key = str(status)
+            s["status"][key] = s["status"].get(key, 0) + 1
+            s["latency"].setdefault(kind, []).append(elapsed)
+
+    def connections_opened(self):
+        """Nombre de connexions TCP réellement ouvertes (= poignées de main)."""
+        total = 0
+        for adapter in self.session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                total += getattr(pools[key], "num_connections", 0)
+        return total
+
+    def stats(self):
+        with self._lock:
+            s = self._stats
+            latency = {}
+            for kind, values in s["latency"].items():
+                ordered = sorted(values)
+                n = len(ordered)
+                latency[kind] = {
+                    "n": n,
+                    "moy_ms": round(sum(ordered) / n * 1000, 1),
+                    "p50_ms": round(ordered[n // 2] * 1000, 1),
+                    "p95_ms": round(ordered[min(n - 1, int(n * 0.95))] * 1000, 1),
+                    "max_ms": round(ordered[-1] * 1000, 1),
+                }
+            result = {
+                "requests": s["requests"],
+                "retries": s["retries"],
+                "errors": s["errors"],
+                "bytes": s["bytes"],
+                "status": dict(s["status"]),
+                "latency": latency,
+            }
+        opened = self.connections_opened()
+        result["connections"] = opened
+        result["handshakes_evites"] = max(0, result["requests"] - opened)
+        return result
+
+    def log_stats(self, log=None):
+        log = log or logger
+        st = self.stats()
+        log.info(f"📡 API PMU: {st['requests']} requêtes, {st['connections']} connexions "
+                 f"({st['handshakes_evites']} handshakes évités), {st['retries']} retries, "
+                 f"{st['errors']} échecs, {st['bytes'] / 1024:.0f} KB")
+        for kind, lat in sorted(st["latency"].items()):
+            log.info(f"   {kind:<13} n={lat['n']:<4} moy={lat['moy_ms']}ms "
+                     f"p50={lat['p50_ms']}ms p95={lat['p95_ms']}ms max={lat['max_ms']}ms")
+
+    # ---------- requêtes ----------
+
+    def _wait_before_retry(self, attempt, retry_after=None):
+        delay = self.backoff * (2 ** attempt)
+        if retry_after is not None:
+            delay = min(max(delay, retry_after), MAX_RETRY_AFTER)
+        time.sleep(delay)
+
+    def _reserve(self):
+        with self._lock:
+            if self.budget is not None and self._issued >= self.budget:
+                raise BudgetEpuise(f"budget de {self.budget} requêtes atteint")
+            self._issued += 1
+
+    def _get_once(self, url, kind, timeout):
+        self._reserve()
+        t0 = time.monotonic()
+        try:
+            resp = self.session.get(url, timeout=timeout)
+        except requests.exceptions.RequestException:
+            self._record(kind, "exception", time.monotonic() - t0)
+            raise
+        self._record(kind, resp.status_code, time.monotonic() - t0, len(resp.content))
+        return resp
+
+    def get(self, endpoint, timeout=None):
+        """GET {base_url}/{endpoint} → JSON décodé, None si 404 ou échec.
+
+        Lève BudgetEpuise si le budget de requêtes est atteint.
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        kind = endpoint_kind(endpoint)
+        timeout = timeout or self.timeouts.get(kind, self.timeouts["autre"])
+
+        for attempt in range(self.max_retries):
+            retry_after = None
+            try:
+                if self.limiter:
+                    with self.limiter.semaphore(urlparse(url).netloc):
+                        self.limiter.acquire_rate()
+                        resp = self._get_once(url, kind, timeout)
+                else:
+                    resp = self._get_once(url, kind, timeout)
+
+                if resp.status_code == 200:
+                    data = resp.json()
+                    if self.record_dir:
+                        from pmu_fixtures import enregistrer
+                        enregistrer(endpoint, resp.content, self.record_dir)
+                    return data
+                if resp.status_code == 404:
+                    return None
+                if resp.status_code not in RETRY_STATUS:
+                    logger.warning(f"  ⚠️  HTTP {resp.status_code} pour {endpoint}")
+                    break
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                logger.warning(f"  ⚠️  HTTP {resp.status_code} (tentative {attempt+1}/{self.max_retries})")
+            except ValueError as e:
+                logger.warning(f"  ⚠️  JSON invalide pour {endpoint}: {e} (tentative {attempt+1})")
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"  ⚠️  Réseau: {e} (tentative {attempt+1}/{self.max_retries})")
+
+            if attempt < self.max_retries - 1:
+                with self._lock:
+                    self._stats["retries"] += 1
+                self._wait_before_retry(attempt, retry_after)
+
+        with self._lock:
+            self._stats["errors"] += 1
+        return None
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """Client partagé du process (créé à la première utilisation)."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = PMUClient()
+        return _default_client
+
+
+def api_get(endpoint):
+    """Raccourci: GET via le client partagé."""
+    return get_client().get(endpoint)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    date_pmu = sys.argv[1] if len(sys.argv) > 1 else datetime.now().strftime("%d%m%Y")
+    client = get_client()
+    prog = client.get(f"programme/{date_pmu}?specialisation=INTERNET")
+    reunions = (prog or {}).get("programme", {}).get("reunions", [])
+    for reunion in reunions[:2]:
+        for course in reunion.get("courses", [])[:3]:
+            client.get(f"programme/{date_pmu}/R{reunion.get('numOfficiel')}/C{course.get('numOrdre')}")
+    client.log_stats()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Enregistrement / rejeu local des réponses de l'API PMU Turfinfo.
+
+Permet de faire tourner scraper_courses_pmu, scraper_pre_course et
+live-scoring sans toucher online.turfinfo.api.pmu.fr : pour mesurer le
+débit, ou vérifier qu'un changement de concurrence ne modifie pas la sortie.
+
+1. Enregistrer une journée (programme + /R{n}/C{m} + /participants) :
+       python3 pmu_fixtures.py record 2026-04-12
+   ou, pour capturer ce que fait n'importe quel script :
+       PMU_RECORD_DIR=data/fixtures/pmu python3 scraper_courses_pmu.py 2026-04-12
+
+2. Rejouer avec latence, erreurs et 429 configurables :
+       python3 pmu_fixtures.py serve --latence 80 --jitter 30 --erreurs 0.02 --taux-429 0.05
+
+3. Pointer les scripts dessus (override de base URL lu par pmu_client) :
+       PMU_BASE_URL=http://127.0.0.1:8765/rest/client/61 python3 scraper_courses_pmu.py 2026-04-12
+
+Arborescence : {dir}/programme/12042026/R1/C3/participants@specialisation=INTERNET.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(ROOT, 'data', 'fixtures', 'pmu')
+DEFAULT_PORT = 8765
+API_PREFIX = "/rest/client/61/"
+
+logger = logging.getLogger(__name__)
+
+_RE_UNSAFE = re.compile(r'[^A-Za-z0-9_\-=.&@/]')
+
+
+def fixture_path(endpoint, fixtures_dir=FIXTURES_DIR):
+    """Chemin disque d'un endpoint ("programme/…/participants?x=y")."""
+    path, _, query = endpoint.lstrip("/").partition("?")
+    name = path.rstrip("/")
+    if query:
+        name += "@" + query
+    name = _RE_UNSAFE.sub("_", name).replace("..", "_")
+    return os.path.join(fixtures_dir, name + ".json")
+
+
+def enregistrer(endpoint, body, fixtures_dir=FIXTURES_DIR):
+    """Sauvegarde le corps brut (bytes) d'une réponse 200."""
+    path = fixture_path(endpoint, fixtures_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(body)
+    os.replace(tmp, path)
+
+
+def charger(endpoint, fixtures_dir=FIXTURES_DIR):
+    """Corps enregistré pour un endpoint (bytes), None si absent.
+
+    Si la variante avec query string n'existe pas, essaie sans.
+    """
+    for candidate in (endpoint, endpoint.partition("?")[0]):
+        path = fixture_path(candidate, fixtures_dir)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+    return None
+
+
+# ============================================================
+# Enregistrement d'une journée complète
+# ============================================================
+
+def record_day(date_obj, fixtures_dir=FIXTURES_DIR):
+    """Télécharge et enregistre programme + détail + participants d'une date."""
+    from pmu_client import PMUClient
+
+    client = PMUClient(max_concurrency=4, rate=8.0, record_dir=fixtures_dir)
+    date_pmu = date_obj.strftime("%d%m%Y")
+    programme = client.get(f"programme/{date_pmu}?specialisation=INTERNET")
+    if not programme:
+        logger.error(f"❌ Pas de programme pour {date_obj:%Y-%m-%d}")
+        return 0
+
+    endpoints = []
+    for reunion in programme.get("programme", {}).get("reunions", []):
+        r_num = reunion.get("numOfficiel", 0)
+        for course in reunion.get("courses", []):
+            base = f"programme/{date_pmu}/R{r_num}/C{course.get('numOrdre', 0)}"
+            endpoints += [base, f"{base}/participants?specialisation=INTERNET"]
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=client.max_concurrency) as pool:
+        list(pool.map(client.get, endpoints))
+
+    client.log_stats(logger)
+    return len(endpoints) + 1
+
+
+# ============================================================
+# Serveur de rejeu
+# ============================================================
+
+class ReplayConfig:
+    def __init__(self, fixtures_dir=FIXTURES_DIR, latence_ms=0.0, jitter_ms=0.0,
+                 taux_erreur=0.0, taux_429=0.0, retry_after=1, seed=None):
+        self.fixtures_dir = fixtures_dir
+        self.latence_ms = latence_ms
+        self.jitter_ms = jitter_ms
+        self.taux_erreur = taux_erreur
+        self.taux_429 = taux_429
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.compteurs = {"requests": 0, "200": 0, "404": 0, "429": 0, "500": 0}
+
+    def tirage(self):
+        with self.lock:
+            return self.random.random(), self.random.uniform(-1, 1)
+
+    def compter(self, status):
+        with self.lock:
+            self.compteurs["requests"] += 1
+            self.compteurs[str(status)] = self.compteurs.get(str(status), 0) + 1
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, comme l'API réelle
+    config = None                   # ReplayConfig, injecté par make_server
+
+    def _send(self, status, body=b"", headers=None):
+        self.config.compter(status)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        cfg = self.config
+        u, jitter = cfg.tirage()
+        delay = max(0.0, cfg.latence_ms + jitter * cfg.jitter_ms) / 1000
+        if delay:
+            time.sleep(delay)
+
+        if u < cfg.taux_429:
+            return self._send(429, headers={"Retry-After": str(cfg.retry_after)})
+        if u < cfg.taux_429 + cfg.taux_erreur:
+            return self._send(500, b'{"error":"replay"}')
+
+        idx = self.path.find(API_PREFIX)
+        endpoint = self.path[idx + len(API_PREFIX):] if idx >= 0 else self.path.lstrip("/")
+        body = charger(endpoint, cfg.fixtures_dir)
+        if body is None:
+            return self._send(404, b'{"error":"fixture absente"}')
+        return self._send(200, body)
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+
+def make_server(config, host="127.0.0.1", port=DEFAULT_PORT):
+    """Serveur de rejeu (port=0 → port libre, cf. server.server_port)."""
+    handler = type("BoundReplayHandler", (ReplayHandler,), {"config": config})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve_in_thread(config, host="127.0.0.1", port=0):
+    """Démarre le serveur en arrière-plan, retourne (server, base_url)."""
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}{API_PREFIX.rstrip('/')}"
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description="Enregistrement / rejeu de l'API PMU")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    rec = sub.add_parser("record", help="enregistre une journée complète")
+    rec.add_argument("date", help="YYYY-MM-DD")
+    rec.add_argument("--dir", default=FIXTURES_DIR)
+
+    srv = sub.add_parser("serve", help="rejoue les réponses enregistrées")
+    srv.add_argument("--dir", default=FIXTURES_DIR)
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=DEFAULT_PORT)
+    srv.add_argument("--latence", type=float, default=0.0, help="latence moyenne (ms)")
+    srv.add_argument("--jitter", type=float, default=0.0, help="± jitter uniforme (ms)")
+    srv.add_argument("--erreurs", type=float, default=0.0, help="proportion de réponses 500")
+    srv.add_argument("--taux-429", type=float, default=0.0, help="proportion de réponses 429")
+    srv.add_argument("--retry-after", type=int, default=1, help="Retry-After des 429 (s)")
+    srv.add_argument("--seed", type=int, default=None)
+
+    args = parser.parse_args()
+
+    if args.cmd == "record":
+        n = record_day(datetime.strptime(args.date, "%Y-%m-%d"), args.dir)
+        logger.info(f"✅ {n} endpoint(s) enregistré(s) dans {args.dir}")
+        sys.exit(0 if n else 1)
+
+    config = ReplayConfig(args.dir, args.latence, args.jitter, args.erreurs,
+                          args.taux_429, args.retry_after, args.seed)
+    server = make_server(config, args.host, args.port)
+    base_url = f"http://{args.host}:{server.server_port}{API_PREFIX.rstrip('/')}"
+    logger.info(f"🎞️  Rejeu {args.dir}")
+    logger.info(f"   export PMU_BASE_URL={base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(f"📊 {json.dumps(config.compteurs)}")
+
+
+if __name__ == "__main__":
+    main()
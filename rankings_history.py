@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Historique des classements France Galop en séries par entité.
+
+Ingère une fois tous les snapshots du store delta (rankings_store.py) en
+matrices NumPy entités × snapshots, mises en cache dans
+data/rankings/_history/{source}.npz (non versionné). Quand un nouveau
+snapshot arrive dans le store, seules ses lignes sont décodées et
+ajoutées (nouvelle colonne, nouvelles entités en bas) ; si le fichier du
+store n'a pas grossi, il n'est même pas relu.
+
+Matrices (0 = entité absente du snapshot) :
+    rang, courses (Courses ou Partants), victoires, places, allocation
+
+Chaque ligne porte aussi l'id d'entité de entity_ids.py (ids, int32) :
+trajectoire() accepte les variantes d'écriture connues du dictionnaire,
+et les jointures avec courses_dataset se font sur les colonnes *_id.
+
+Usage:
+    python3 rankings_history.py trajectoire jockeys "CRISTIAN DEMURO"
+    python3 rankings_history.py montees chevaux 2026-06-01 [--top 20] [--min-courses 3]
+    python3 rankings_history.py montees jockeys 2026-06-01 --critere taux
+
+    from rankings_history import load_history
+    h = load_history("jockeys.csv")
+    h.trajectoire("CRISTIAN DEMURO")
+    h.montees("2026-06-01", top=10)
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from entity_ids import kind_for_source, load_ids
+from rankings_store import RANKINGS_DIR, RankingStore
+
+HISTORY_DIR = os.path.join(RANKINGS_DIR, '_history')
+
+# Colonnes CSV → matrice (Courses pour chevaux, Partants pour les autres)
+COLONNES = {
+    "courses": ("Courses", "Partants"),
+    "victoires": ("Victoires",),
+    "places": ("Places",),
+    "allocation": ("Allocation tot.",),
+}
+MATRICES = ("rang", "courses", "victoires", "places", "allocation")
+
+
+def _nombre(value):
+    """'885670,00' → 885670.0 ; '' → 0."""
+    try:
+        return float(value.replace(" ", "").replace(" ", "").replace(",", "."))
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def _source(name):
+    return name if name.endswith(".csv") else f"{name}.csv"
+
+
+class RankingHistory:
+    """Matrices entités × snapshots d'une source (ex: "jockeys.csv")."""
+
+    def __init__(self, source, stamps=None, noms=None, data=None, store_size=-1, ids=None):
+        self.source = source
+        self.kind = kind_for_source(source)
+        # Taille du fichier du store lors de la dernière maj (store append-only)
+        self.store_size = store_size
+        self.stamps = list(stamps or [])
+        self.noms = list(noms or [])
+        self.index = {nom: i for i, nom in enumerate(self.noms)}
+        # id d'entité par ligne (-1 : source sans dictionnaire)
+        self.ids = list(ids) if ids is not None else []
+        self.par_id = {e: i for i, e in enumerate(self.ids) if e >= 0}
+        self.data = data or {
+            m: np.zeros((0, 0), dtype=np.int32 if m != "allocation" else np.float64)
+            for m in MATRICES
+        }
+
+    # ---------- construction ----------
+
+    def _ajouter_snapshot(self, stamp, header, rows, dico=None):
+        """Ajoute une colonne à partir des lignes brutes d'un snapshot."""
+        positions = {}
+        for champ, candidats in COLONNES.items():
+            positions[champ] = next((header.index(c) for c in candidats if c in header), None)
+
+        nouveaux = [key for key, _ in rows if key not in self.index]
+        for key in nouveaux:
+            self.index[key] = len(self.noms)
+            self.noms.append(key)
+            # homonymes (#2, #3) : entités distinctes, pas d'id partagé
+            entity = dico.id(key) if dico is not None and "#" not in key else -1
+            if entity >= 0:
+                self.par_id.setdefault(entity, len(self.ids))
+            self.ids.append(entity)
+        n_ent, n_snap = len(self.noms), len(self.stamps) + 1
+        for m in MATRICES:
+            old = self.data[m]
+            grown = np.zeros((n_ent, n_snap), dtype=old.dtype)
+            grown[:old.shape[0], :old.shape[1]] = old
+            self.data[m] = grown
+        self.stamps.append(stamp)
+
+        col = n_snap - 1
+        for rang, (key, line) in enumerate(rows, 1):
+            i = self.index[key]
+            fields = line.split("\t")
+            self.data["rang"][i, col] = rang
+            for champ, pos in positions.items():
+                if pos is not None and pos < len(fields):
+                    self.data[champ][i, col] = _nombre(fields[pos])
+
+    def _trier_stamps(self):
+        order = np.argsort(self.stamps, kind="stable")
+        if (order == np.arange(len(order))).all():
+            return
+        self.stamps = [self.stamps[i] for i in order]
+        for m in MATRICES:
+            self.data[m] = self.data[m][:, order]
+
+    def maj(self, store, entity_ids=None):
+        """Ajoute les snapshots du store absents des matrices. Retourne leur nombre."""
+        size = store.size(self.source)
+        if size == self.store_size:
+            return 0
+        dico = None
+        if self.kind is not None:
+            entity_ids = entity_ids or load_ids()
+            dico = entity_ids[self.kind]
+        connus = set(self.stamps)
+        ajoutes = 0
+        for stamp, state in store.iter_states(self.source):
+            if stamp in connus:
+                continue
+            header = state["header"].split("\t") if state["header"] else []
+            self._ajouter_snapshot(stamp, header, state["rows"], dico)
+            ajoutes += 1
+        if ajoutes:
+            self._trier_stamps()
+            if dico is not None:
+                entity_ids.save()
+        self.store_size = size
+        return ajoutes
+
+    # ---------- cache ----------
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, stamps=np.array(self.stamps, dtype=str), noms=np.array(self.noms, dtype=str),
+                 store_size=np.array(self.store_size), ids=np.array(self.ids, dtype=np.int32),
+                 **self.data)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, source, path):
+        with np.load(path) as z:
+            data = {m: z[m] for m in MATRICES}
+            return cls(source, z["stamps"].tolist(), z["noms"].tolist(), data, int(z["store_size"]),
+                       z["ids"].tolist())
+
+    # ---------- requêtes ----------
+
+    def ligne(self, nom):
+        """Indice de ligne d'une entité : clé CSV exacte, sinon via son id."""
+        i = self.index.get(nom.upper().strip())
+        if i is None and self.kind is not None:
+            i = self.par_id.get(load_ids()[self.kind].get(nom))
+        return i
+
+    def taux_victoire(self):
+        courses = self.data["courses"].astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(courses > 0, self.data["victoires"] / courses, np.nan)
+
+    def trajectoire(self, nom):
+        """[{stamp, rang, courses, victoires, places, allocation, taux_victoire}]
+        pour chaque snapshot où l'entité est classée."""
+        i = self.ligne(nom)
+        if i is None:
+            return []
+        taux = self.taux_victoire()[i]
+        points = []
+        for j, stamp in enumerate(self.stamps):
+            rang = int(self.data["rang"][i, j])
+            if not rang:
+                continue
+            points.append({
+                "stamp": stamp,
+                "rang": rang,
+                "courses": int(self.data["courses"][i, j]),
+                "victoires": int(self.data["victoires"][i, j]),
+                "places": int(self.data["places"][i, j]),
+                "allocation": float(self.data["allocation"][i, j]),
+                "taux_victoire": None if np.isnan(taux[j]) else round(float(taux[j]), 4),
+            })
+        return points
+
+    def colonne(self, date):
+        """Indice du dernier snapshot pris au plus tard à `date` (YYYY-MM-DD ou stamp)."""
+        j = int(np.searchsorted(np.array(self.stamps), date, side="right")) - 1
+        if not date[10:] and j + 1 < len(self.stamps) and self.stamps[j + 1][:10] == date:
+            j += 1      # date seule : snapshot du jour inclus
+        return max(j, 0)
+
+    def montees(self, depuis, top=20, critere="rang", min_courses=0):
+        """Plus fortes progressions entre le snapshot à `depuis` et le dernier.
+
+        critere="rang" : places gagnées au classement ;
+        critere="taux" : hausse du taux de victoire.
+        Les entités absentes d'un des deux snapshots sont ignorées.
+        """
+        if not self.stamps:
+            return []
+        j0, j1 = self.colonne(depuis), len(self.stamps) - 1
+        r0, r1 = self.data["rang"][:, j0], self.data["rang"][:, j1]
+        ok = (r0 > 0) & (r1 > 0) & (self.data["courses"][:, j1] >= min_courses)
+        if critere == "taux":
+            taux = self.taux_victoire()
+            gain = taux[:, j1] - taux[:, j0]
+            ok &= ~np.isnan(gain)
+        else:
+            gain = (r0 - r1).astype(np.float64)
+        idx = np.flatnonzero(ok)
+        idx = idx[np.argsort(-gain[idx], kind="stable")][:top]
+        taux = self.taux_victoire()
+        return [{
+            "nom": self.noms[i],
+            "depuis": self.stamps[j0],
+            "jusqu_a": self.stamps[j1],
+            "rang_avant": int(r0[i]),
+            "rang_apres": int(r1[i]),
+            "taux_avant": round(float(taux[i, j0]), 4) if not np.isnan(taux[i, j0]) else None,
+            "taux_apres": round(float(taux[i, j1]), 4) if not np.isnan(taux[i, j1]) else None,
+            "gain": round(float(gain[i]), 4),
+        } for i in idx]
+
+
+def load_history(source, store=None, history_dir=HISTORY_DIR):
+    """Historique d'une source, depuis le cache puis complété par le store."""
+    source = _source(source)
+    store = store or RankingStore()
+    path = os.path.join(history_dir, f"{source}.npz")
+    history = None
+    if os.path.exists(path):
+        try:
+            history = RankingHistory.load(source, path)
+        except (OSError, ValueError, KeyError):
+            history = None
+    if history is None:
+        history = RankingHistory(source)
+    size_avant = history.store_size
+    history.maj(store)
+    if history.store_size != size_avant or not os.path.exists(path):
+        history.save(path)
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Historique des classements France Galop")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    t = sub.add_parser("trajectoire", help="rang / taux de victoire d'une entité")
+    t.add_argument("source", help="chevaux, jockeys, entraineurs, ... (ou chevaux_2025)")
+    t.add_argument("nom")
+    m = sub.add_parser("montees", help="plus fortes progressions depuis une date")
+    m.add_argument("source")
+    m.add_argument("depuis", help="YYYY-MM-DD ou stamp")
+    m.add_argument("--top", type=int, default=20)
+    m.add_argument("--critere", choices=("rang", "taux"), default="rang")
+    m.add_argument("--min-courses", type=int, default=0)
+    args = parser.parse_args()
+
+    history = load_history(args.source)
+    if args.cmd == "trajectoire":
+        points = history.trajectoire(args.nom)
+        if not points:
+            print(f"❌ {args.nom} absent de {history.source}")
+            sys.exit(1)
+        print(f"📈 {args.nom.upper()} — {history.source}")
+        for p in points:
+            taux = f"{p['taux_victoire'] * 100:5.1f}%" if p["taux_victoire"] is not None else "    -"
+            print(f"  {p['stamp']}  #{p['rang']:<5} {p['victoires']:>4} V / {p['courses']:<5} {taux}  "
+                  f"{p['allocation']:>12,.0f} €")
+    else:
+        rows = history.montees(args.depuis, args.top, args.critere, args.min_courses)
+        if rows:
+            print(f"🚀 {history.source} : {rows[0]['depuis']} → {rows[0]['jusqu_a']} ({args.critere})")
+        for r in rows:
+            taux = (f"{(r['taux_avant'] or 0) * 100:5.1f}% → {(r['taux_apres'] or 0) * 100:5.1f}%")
+            print(f"  {r['nom'][:30]:30} #{r['rang_avant']:<5} → #{r['rang_apres']:<5} {taux}  (+{r['gain']:g})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Classements multi-années fusionnés et précompilés pour le live scoring.
+
+live-scoring rechargeait à chaque lancement chevaux_2025 et chevaux
+(*_ponderated_latest.json, ~3,4 MB de JSON), reconstruisait l'index de
+résolution des noms puis recalculait par partant
+max(TauxVictoire 2025, TauxVictoire 2026). Ici les deux années sont
+fusionnées une fois par cheval (clé compacte de horse_resolver, donc
+"AZANIYA IRE" 2025 et "AZANIYA" 2026 sur la même ligne) dans un
+répertoire de .npy relus en memory-map (aucun pickle) :
+
+    data/rankings/_merged/chevaux/      (non versionné)
+        meta.json           sources (mtime, taille), années, nb lignes
+        nom.npy             nom affiché (année la plus récente)
+        cle.npy             clé exacte (entity_ids.cle)
+        compacte.npy        clé compacte (horse_resolver.compacte)
+        taux.npy            float32 [n, années], NaN = absent de l'année
+        taux_v.npy          float32, TauxVictoire combiné (max des années)
+        voisins.npy         suppressions triées (index approx précompilé)
+        voisins_cible.npy   int32, ligne de chaque suppression
+
+Le store est reconstruit automatiquement si un JSON source a changé
+(mtime ou taille).
+
+Usage:
+    python3 rankings_merged.py build [chevaux jockeys]
+    python3 rankings_merged.py info chevaux
+
+    from rankings_merged import load_merged
+    chevaux = load_merged("chevaux")
+    chevaux.taux_victoire("AZANIYA")        # float ou None
+    chevaux.resolver().resoudre("AZANIYA")
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from entity_ids import cle
+from horse_resolver import MIN_APPROX, ChevalResolver, compacte, suppressions
+from json_io import read_json, write_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'data')
+MERGED_DIR = os.path.join(DATA_DIR, 'rankings', '_merged')
+
+VERSION = 1
+# Années fusionnées, de la plus ancienne à la plus récente → suffixe de fichier
+ANNEES = (("2025", "_2025"), ("2026", ""))
+# Champ nom utilisé par live-scoring.load_rankings
+CHAMP_NOM = {"chevaux": "Nom"}
+COLONNES = ("nom", "cle", "compacte", "taux", "taux_v", "voisins", "voisins_cible")
+
+
+def _sources(kind, data_dir=DATA_DIR):
+    return [(annee, os.path.join(data_dir, f"{kind}{suffixe}_ponderated_latest.json"))
+            for annee, suffixe in ANNEES]
+
+
+def _signature(kind, data_dir=DATA_DIR):
+    sig = {}
+    for annee, path in _sources(kind, data_dir):
+        try:
+            st = os.stat(path)
+            sig[annee] = [st.st_mtime, st.st_size]
+        except OSError:
+            sig[annee] = None
+    return sig
+
+
+def _taux(item):
+    """TauxVictoire d'une entrée ("24.1" ; absent → 0 comme live-scoring)."""
+    try:
+        return float(item.get("TauxVictoire", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_merged(kind="chevaux", data_dir=DATA_DIR, out_dir=MERGED_DIR):
+    """(Re)construit le store fusionné d'un type. Retourne le nombre de lignes."""
+    champ = CHAMP_NOM.get(kind, "NomPostal")
+    lignes = {}          # clé de fusion → indice
+    noms, cles, compactes, taux = [], [], [], []
+    for j, (annee, path) in enumerate(_sources(kind, data_dir)):
+        try:
+            resultats = read_json(path).get("resultats", [])
+        except (OSError, ValueError):
+            resultats = []
+        for item in resultats:
+            nom = (item.get(champ) or "").upper().strip()
+            if not nom:
+                continue
+            k = cle(nom, kind)
+            c = compacte(nom) if kind == "chevaux" else k
+            i = lignes.get(c or k)
+            if i is None:
+                i = lignes[c or k] = len(noms)
+                noms.append(nom)
+                cles.append(k)
+                compactes.append(c)
+                taux.append([np.nan] * len(ANNEES))
+            # Année la plus récente pour le nom ; doublon dans une même année :
+            # la dernière entrée l'emporte (comme le dict de load_rankings)
+            noms[i] = nom
+            cles[i] = k
+            taux[i][j] = _taux(item)
+
+    taux = np.array(taux, dtype=np.float32).reshape(-1, len(ANNEES))
+    taux_v = np.nanmax(np.where(np.isnan(taux), -np.inf, taux), axis=1).astype(np.float32) \
+        if len(taux) else np.zeros(0, dtype=np.float32)
+
+    # Index de voisinage par suppression (cf. horse_resolver), trié pour searchsorted
+    paires = sorted((d, i) for i, c in enumerate(compactes) if len(c) >= MIN_APPROX
+                    for d in suppressions(c))
+    colonnes = {
+        "nom": np.array(noms, dtype=str),
+        "cle": np.array(cles, dtype=str),
+        "compacte": np.array(compactes, dtype=str),
+        "taux": taux,
+        "taux_v": taux_v,
+        "voisins": np.array([d for d, _ in paires], dtype=str),
+        "voisins_cible": np.array([i for _, i in paires], dtype=np.int32),
+    }
+
+    path = os.path.join(out_dir, kind)
+    os.makedirs(path, exist_ok=True)
+    for name, values in colonnes.items():
+        if values.dtype.kind == "U" and not len(values):
+            values = values.astype("U1")
+        tmp = os.path.join(path, f"{name}.tmp.npy")
+        np.save(tmp, values, allow_pickle=False)
+        os.replace(tmp, os.path.join(path, f"{name}.npy"))
+    write_json(os.path.join(path, "meta.json"), {
+        "version": VERSION,
+        "kind": kind,
+        "built_at": datetime.now().isoformat(timespec='seconds'),
+        "rows": len(noms),
+        "annees": [annee for annee, _ in ANNEES],
+        "par_annee": {annee: int(np.isfinite(taux[:, j]).sum()) for j, (annee, _) in enumerate(ANNEES)},
+        "sources": _signature(kind, data_dir),
+    })
+    return len(noms)
+
+
+class _Voisins:
+    """Lecture de l'index de suppressions précompilé (interface dict.get)."""
+
+    def __init__(self, voisins, cibles, compactes):
+        self.voisins = voisins
+        self.cibles = cibles
+        self.compactes = compactes
+
+    def get(self, d, default=None):
+        lo = int(np.searchsorted(self.voisins, d, side="left"))
+        hi = int(np.searchsorted(self.voisins, d, side="right"))
+        if lo == hi:
+            return default if default is not None else set()
+        return {self.compactes[i] for i in self.cibles[lo:hi].tolist()}
+
+
+class MergedRankings:
+    """Store fusionné d'un type (memory-map)."""
+
+    def __init__(self, kind="chevaux", path=MERGED_DIR, mmap=True):
+        self.kind = kind
+        self.path = os.path.join(path, kind)
+        self.meta = read_json(os.path.join(self.path, "meta.json"))
+        if self.meta.get("version") != VERSION:
+            raise ValueError(f"{self.path}: version {self.meta.get('version')} ≠ {VERSION}")
+        mode = "r" if mmap else None
+        self.cols = {name: np.load(os.path.join(self.path, f"{name}.npy"),
+                                   mmap_mode=mode, allow_pickle=False)
+                     for name in COLONNES}
+        self._resolver = None
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def __getitem__(self, name):
+        return self.cols[name]
+
+    def nb(self, annee):
+        """Nombre d'entités classées une année donnée ("2025")."""
+        return self.meta["par_annee"].get(annee, 0)
+
+    def resolver(self):
+        """ChevalResolver sur les noms fusionnés, sans recalcul des clés."""
+        if self._resolver is None:
+            noms = self.cols["nom"].tolist()
+            compactes = self.cols["compacte"].tolist()
+            cles = zip(self.cols["cle"].tolist(), compactes)
+            voisins = _Voisins(self.cols["voisins"], self.cols["voisins_cible"], compactes)
+            self._resolver = ChevalResolver(dict(zip(noms, range(len(noms)))),
+                                            cles=cles, voisins=voisins)
+        return self._resolver
+
+    def ligne(self, nom):
+        """Indice de ligne d'un cheval (nom PMU), None si absent ou ambigu."""
+        return self.resolver().match(nom)
+
+    def taux_victoire(self, nom):
+        """TauxVictoire combiné (max des années où il est classé), None si absent."""
+        i = self.ligne(nom)
+        return None if i is None else float(self.cols["taux_v"][i])
+
+
+def load_merged(kind="chevaux", path=MERGED_DIR, data_dir=DATA_DIR):
+    """Store fusionné, reconstruit d'abord si un JSON source a changé."""
+    meta_path = os.path.join(path, kind, "meta.json")
+    try:
+        meta = read_json(meta_path)
+    except (OSError, ValueError):
+        meta = {}
+    if meta.get("version") != VERSION or meta.get("sources") != _signature(kind, data_dir):
+        build_merged(kind, data_dir, path)
+    return MergedRankings(kind, path)
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "build"
+    kinds = sys.argv[2:] or ["chevaux"]
+    if cmd == "build":
+        for kind in kinds:
+            t0 = time.perf_counter()
+            n = build_merged(kind)
+            print(f"✅ {os.path.join(MERGED_DIR, kind)} — {n} entités en {time.perf_counter() - t0:.2f}s")
+    elif cmd == "info":
+        for kind in kinds:
+            t0 = time.perf_counter()
+            store = load_merged(kind)
+            t_load = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            store.resolver()
+            t_resolver = time.perf_counter() - t0
+            annees = ", ".join(f"{a}: {store.nb(a)}" for a in store.meta["annees"])
+            print(f"📦 {kind}: {len(store)} entités ({annees}) — build {store.meta['built_at']}")
+            print(f"   chargement {t_load * 1000:.1f} ms, index de résolution {t_resolver * 1000:.0f} ms")
+    else:
+        print("Usage: python3 rankings_merged.py build|info [type...]", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
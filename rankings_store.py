@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Store delta des snapshots de classements France Galop (data/rankings/_store/).
+
+scripts/snapshot_brut.py copiait les 12 CSV de data/raw_csv/ dans un
+nouveau dossier data/rankings/STAMP/ à chaque passage, alors que la
+plupart des lignes ne bougent pas d'un snapshot à l'autre (les CSV 2025
+sont même identiques). Ici chaque CSV source a un fichier JSON Lines :
+
+    data/rankings/_store/chevaux.csv.jsonl
+      {"stamp": "2026-04-16_08h00", "full": {...}}     # base complète
+      {"stamp": "2026-04-19_08h00", "delta": {...}}    # lignes modifiées
+      ...
+
+Une ligne CSV = une entité, clé = Nom (1re colonne, "#2", "#3"… pour les
+homonymes), rang = position dans le fichier. Un delta contient :
+  - "order" : le nouvel ordre, en plages [début, longueur] de lignes
+    inchangées du snapshot précédent, ou la clé d'une ligne nouvelle/modifiée
+  - "rows"  : {clé: ligne brute} des lignes nouvelles ou modifiées
+  - "header", "nl", "final_nl" : seulement s'ils changent
+
+Les lignes sont gardées brutes (texte exact) : chaque snapshot est
+reconstruit octet pour octet (vérifié à l'écriture, sinon base complète).
+
+Usage:
+    python3 rankings_store.py import                 # ingère data/rankings/STAMP/
+    python3 rankings_store.py verify                 # reconstruit et compare
+    python3 rankings_store.py materialize STAMP [dossier]
+    python3 rankings_store.py history chevaux.csv "DIAMOND NECKLACE"
+
+    from rankings_store import RankingStore
+    store = RankingStore()
+    raw = store.snapshot_bytes("jockeys.csv", "2026-05-03_08h38")
+    for stamp, rang, champs in store.entity_history("jockeys.csv", "CRISTIAN DEMURO"):
+        ...
+"""
+
+import json
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RANKINGS_DIR = os.path.join(ROOT, 'data', 'rankings')
+STORE_DIR = os.path.join(RANKINGS_DIR, '_store')
+
+STAMP_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}_\d{2}h\d{2}$')
+# Base complète réécrite si la chaîne de deltas devient trop longue
+MAX_CHAIN = 30
+
+
+# ============================================================
+# Découpage / reconstruction d'un CSV
+# ============================================================
+
+def split_csv(raw):
+    """bytes → {"header", "rows": [(clé, ligne)], "nl", "final_nl"}, None si
+    le fichier ne se prête pas à un découpage exact (fins de ligne mixtes)."""
+    text = raw.decode('utf-8', errors='surrogateescape')
+    nl = "\r\n" if "\r\n" in text else "\n"
+    final_nl = text.endswith(nl)
+    body = text[:-len(nl)] if final_nl else text
+    lines = body.split(nl) if body else []
+    if nl == "\n" and any("\r" in line for line in lines):
+        return None
+    if not lines:
+        return {"header": None, "rows": [], "nl": nl, "final_nl": final_nl}
+
+    return {"header": lines[0], "rows": _keyed(lines[1:]), "nl": nl, "final_nl": final_nl}
+
+
+def _keyed(lines):
+    """[(clé, ligne)] : clé = Nom, suffixée #2, #3… pour les homonymes."""
+    seen = {}
+    rows = []
+    for line in lines:
+        name = line.split("\t", 1)[0].strip()
+        seen[name] = seen.get(name, 0) + 1
+        rows.append((name if seen[name] == 1 else f"{name}#{seen[name]}", line))
+    return rows
+
+
+def join_csv(state):
+    """Inverse exact de split_csv."""
+    if state["header"] is None:
+        text = state["nl"] if state["final_nl"] and not state["rows"] else ""
+        return text.encode('utf-8', errors='surrogateescape')
+    lines = [state["header"]] + [line for _, line in state["rows"]]
+    text = state["nl"].join(lines)
+    if state["final_nl"]:
+        text += state["nl"]
+    return text.encode('utf-8', errors='surrogateescape')
+
+
+def make_delta(prev, cur):
+    """Delta entre deux états split_csv."""
+    prev_index = {key: i for i, (key, _) in enumerate(prev["rows"])}
+    order, rows = [], {}
+    run_start = run_len = None
+    for key, line in cur["rows"]:
+        i = prev_index.get(key)
+        if i is not None and prev["rows"][i][1] == line:
+            if run_start is not None and run_start + run_len == i:
+                run_len += 1
+                continue
+            if run_start is not None:
+                order.append([run_start, run_len])
+            run_start, run_len = i, 1
+            continue
+        if run_start is not None:
+            order.append([run_start, run_len])
+            run_start = None
+        order.append(key)
+        rows[key] = line
+    if run_start is not None:
+        order.append([run_start, run_len])
+
+    delta = {"order": order, "rows": rows}
+    for field in ("header", "nl", "final_nl"):
+        if cur[field] != prev[field]:
+            delta[field] = cur[field]
+    return delta
+
+
+def apply_delta(prev, delta):
+    lines = []
+    for item in delta["order"]:
+        if isinstance(item, list):
+            start, length = item
+            lines.extend(line for _, line in prev["rows"][start:start + length])
+        else:
+            lines.append(delta["rows"][item])
+    return {
+        "header": delta.get("header", prev["header"]),
+        "rows": _keyed(lines),
+        "nl": delta.get("nl", prev["nl"]),
+        "final_nl": delta.get("final_nl", prev["final_nl"]),
+    }
+
+
+def _full_record(state):
+    return {"header": state["header"], "rows": [line for _, line in state["rows"]],
+            "nl": state["nl"], "final_nl": state["final_nl"]}
+
+
+def _state_from_full(full):
+    return {"header": full["header"], "rows": _keyed(full["rows"]),
+            "nl": full["nl"], "final_nl": full["final_nl"]}
+
+
+# ============================================================
+# Store
+# ============================================================
+
+class RankingStore:
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+
+    def _path(self, source):
+        return os.path.join(self.store_dir, f"{source}.jsonl")
+
+    def sources(self):
+        if not os.path.isdir(self.store_dir):
+            return []
+        return sorted(n[:-len(".jsonl")] for n in os.listdir(self.store_dir) if n.endswith(".jsonl"))
+
+    def size(self, source):
+        """Taille du fichier d'une source (le store est append-only)."""
+        path = self._path(source)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def records(self, source):
+        """Enregistrements bruts d'une source, dans l'ordre (générateur)."""
+        path = self._path(source)
+        if not os.path.exists(path):
+            return
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def stamps(self, source=None):
+        """Stamps disponibles (pour une source, ou union de toutes)."""
+        sources = [source] if source else self.sources()
+        found = set()
+        for src in sources:
+            found.update(rec["stamp"] for rec in self.records(src))
+        return sorted(found)
+
+    def iter_states(self, source):
+        """(stamp, état split_csv) pour chaque snapshot, en rejouant les deltas."""
+        state = None
+        for rec in self.records(source):
+            if "full" in rec:
+                state = _state_from_full(rec["full"])
+            else:
+                state = apply_delta(state, rec["delta"])
+            yield rec["stamp"], state
+
+    def state(self, source, stamp):
+        for s, state in self.iter_states(source):
+            if s == stamp:
+                return state
+        return None
+
+    def snapshot_bytes(self, source, stamp):
+        """Contenu exact du CSV `source` au snapshot `stamp` (None si absent)."""
+        state = self.state(source, stamp)
+        return join_csv(state) if state is not None else None
+
+    def snapshot_rows(self, source, stamp):
+        """[(rang, clé, champs)] d'un snapshot, rang à partir de 1."""
+        state = self.state(source, stamp)
+        if state is None:
+            return []
+        return [(rang, key, line.split("\t")) for rang, (key, line) in enumerate(state["rows"], 1)]
+
+    def header(self, source, stamp=None):
+        last = None
+        for s, state in self.iter_states(source):
+            last = state
+            if s == stamp:
+                break
+        return last["header"].split("\t") if last and last["header"] else []
+
+    def entity_history(self, source, name):
+        """(stamp, rang, champs) pour chaque snapshot où l'entité apparaît.
+
+        Rang = position dans le CSV (Rang officiel France Galop).
+        """
+        for stamp, state in self.iter_states(source):
+            for rang, (key, line) in enumerate(state["rows"], 1):
+                if key == name:
+                    yield stamp, rang, line.split("\t")
+                    break
+
+    def append(self, source, stamp, raw, verify=True):
+        """Ajoute un snapshot (contenu brut). Retourne "full", "delta" ou None
+        si le stamp est déjà présent."""
+        cur = split_csv(raw)
+        prev, chain = None, 0
+        for s, state in self.iter_states(source):
+            if s == stamp:
+                return None
+            prev = state
+        for rec in self.records(source):
+            chain = 0 if "full" in rec else chain + 1
+
+        if cur is None:
+            raise ValueError(f"{source}: fins de ligne mixtes, non stockable")
+
+        kind = "full"
+        if prev is not None and chain < MAX_CHAIN:
+            delta = make_delta(prev, cur)
+            if not verify or join_csv(apply_delta(prev, delta)) == raw:
+                kind = "delta"
+                record = {"stamp": stamp, "delta": delta}
+        if kind == "full":
+            if verify and join_csv(_state_from_full(_full_record(cur))) != raw:
+                raise ValueError(f"{source}@{stamp}: reconstruction inexacte")
+            record = {"stamp": stamp, "full": _full_record(cur)}
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(self._path(source), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+        return kind
+
+    def append_file(self, source, stamp, path):
+        with open(path, 'rb') as f:
+            return self.append(source, stamp, f.read())
+
+    def materialize(self, stamp, out_dir, sources=None):
+        """Réécrit les CSV d'un snapshot à l'identique dans out_dir."""
+        os.makedirs(out_dir, exist_ok=True)
+        written = []
+        for source in sources or self.sources():
+            raw = self.snapshot_bytes(source, stamp)
+            if raw is None:
+                continue
+            with open(os.path.join(out_dir, source), 'wb') as f:
+                f.write(raw)
+            written.append(source)
+        return written
+
+
+# ============================================================
+# Import / vérification des dossiers existants
+# ============================================================
+
+def snapshot_dirs(rankings_dir=RANKINGS_DIR):
+    if not os.path.isdir(rankings_dir):
+        return []
+    return sorted(n for n in os.listdir(rankings_dir)
+                  if STAMP_PATTERN.match(n) and os.path.isdir(os.path.join(rankings_dir, n)))
+
+
+def importer(store, rankings_dir=RANKINGS_DIR):
+    """Ingère les dossiers STAMP/ existants (CSV seulement), dans l'ordre."""
+    stats = {"full": 0, "delta": 0, "deja": 0}
+    for stamp in snapshot_dirs(rankings_dir):
+        folder = os.path.join(rankings_dir, stamp)
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith(".csv"):
+                continue
+            kind = store.append_file(name, stamp, os.path.join(folder, name))
+            stats[kind or "deja"] += 1
+    return stats
+
+
+def verifier(store, rankings_dir=RANKINGS_DIR):
+    """Compare chaque CSV présent dans data/rankings/STAMP/ avec sa reconstruction."""
+    ok, ko = 0, []
+    for stamp in snapshot_dirs(rankings_dir):
+        folder = os.path.join(rankings_dir, stamp)
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith(".csv"):
+                continue
+            with open(os.path.join(folder, name), 'rb') as f:
+                expected = f.read()
+            if store.snapshot_bytes(name, stamp) == expected:
+                ok += 1
+            else:
+                ko.append(f"{stamp}/{name}")
+    return ok, ko
+
+
+def _taille(path):
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+    return total
+
+
+def main():
+    store = RankingStore()
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    if cmd == "import":
+        stats = importer(store)
+        print(f"✅ {stats['full']} base(s), {stats['delta']} delta(s), {stats['deja']} déjà présent(s) "
+              f"— store {_taille(store.store_dir) / 1e6:.1f} MB")
+    elif cmd == "verify":
+        ok, ko = verifier(store)
+        print(f"{'✅' if not ko else '❌'} {ok} CSV reconstruits à l'identique, {len(ko)} différent(s)")
+        for name in ko:
+            print(f"   ❌ {name}")
+        sys.exit(1 if ko else 0)
+    elif cmd == "materialize" and len(sys.argv) >= 3:
+        stamp = sys.argv[2]
+        out_dir = sys.argv[3] if len(sys.argv) > 3 else os.path.join(RANKINGS_DIR, stamp)
+        written = store.materialize(stamp, out_dir)
+        print(f"✅ {len(written)} CSV écrits dans {out_dir}")
+    elif cmd == "history" and len(sys.argv) >= 4:
+        source = sys.argv[2] if sys.argv[2].endswith(".csv") else sys.argv[2] + ".csv"
+        header = store.header(source)
+        for stamp, rang, champs in store.entity_history(source, sys.argv[3].upper()):
+            resume = "  ".join(f"{h}={v}" for h, v in zip(header[1:], champs[1:]))
+            print(f"  {stamp}  #{rang:<5} {resume}")
+    else:
+        print("Usage: python3 rankings_store.py import | verify | materialize STAMP [dossier] "
+              "| history SOURCE NOM", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
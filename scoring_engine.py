@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Moteur de scoring vectorisé : toutes les courses d'une journée ou de
+l'historique en un seul passage NumPy.
+
+Les formules restent celles des fonctions par partant, qui servent de
+référence :
+  - modèle live        live-scoring.score_participant (+ normaliser)
+  - modèle baseline    scripts/integre_derive_ab_test.score_baseline
+                       scripts/backtest_segmente_paris.score_participant
+
+Entrées en colonnes (un élément par partant, partants d'une même course
+contigus) et `starts`, indice du premier partant de chaque course (comme
+courses_dataset.course_start ; pas de course vide). Les formules sprint /
+mile / middle / staying sont évaluées sur tout le tableau puis
+sélectionnées par masque de segment (np.select), dans le même ordre
+d'opérations que les fonctions par partant : les scores sont identiques
+au bit près. Min / max / classement par course passent par des
+réductions segmentées (np.minimum.reduceat, tri lexicographique).
+
+Usage:
+    python3 scoring_engine.py verifier    # historique complet vs fonctions par partant
+    python3 scoring_engine.py bench
+
+    from scoring_engine import BORNES_BASELINE, rangs, score_baseline, segments
+    s = score_baseline(cote, valeur, musique, segments(distance, BORNES_BASELINE))
+    r = rangs(s, starts)                  # 0 = top1 de sa course
+"""
+
+import importlib.util
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SEGMENTS = ("sprint", "mile", "middle", "staying")
+SPRINT, MILE, MIDDLE, STAYING = range(4)
+# Bornes hautes (exclues) des segments sprint / mile / middle
+BORNES_LIVE = (1400, 1700, 2200)
+BORNES_BASELINE = (1400, 1700, 2100)
+
+PETIT_CHAMP = 9        # nb_partants < 9 : bonus valeur
+GRAND_CHAMP = 14       # nb_partants >= 14 : bonus taux de victoire
+TAUX_DEFAUT = 8        # taux de victoire d'un cheval non classé
+
+
+def segments(distance, bornes=BORNES_LIVE):
+    """Code de segment (SPRINT..STAYING) de chaque distance."""
+    return np.searchsorted(np.asarray(bornes), np.asarray(distance), side="right").astype(np.int8)
+
+
+def arrondi(x, decimales=1):
+    """round(x, decimales) de Python, vectorisé.
+
+    np.round passe par x * 10 et peut différer de round() (arrondi de la
+    valeur binaire exacte) sur les quasi-égalités à ,x5 : ces éléments-là
+    sont arrondis un par un par round().
+    """
+    x = np.asarray(x, dtype=np.float64)
+    facteur = 10.0 ** decimales
+    out = np.round(x, decimales)
+    frac = np.abs(x * facteur) % 1.0
+    for i in np.flatnonzero(np.abs(frac - 0.5) < 1e-6).tolist():
+        out[i] = round(float(x[i]), decimales)
+    return out
+
+
+# ============================================================
+# Réductions par course
+# ============================================================
+
+def tailles(starts, n):
+    """Nombre de partants de chaque course (n = nombre total de partants)."""
+    return np.diff(np.append(np.asarray(starts, dtype=np.int64), n))
+
+
+def diffuser(valeurs, starts, n):
+    """Valeur par course → valeur par partant."""
+    return np.repeat(np.asarray(valeurs), tailles(starts, n))
+
+
+def min_max(scores, starts):
+    """(min, max) de chaque course."""
+    scores = np.asarray(scores)
+    return np.minimum.reduceat(scores, starts), np.maximum.reduceat(scores, starts)
+
+
+def rangs(scores, starts, croissant=False):
+    """Rang de chaque partant dans sa course (0 = meilleur).
+
+    Score décroissant par défaut (croissant=True : cote la plus basse
+    d'abord) ; à égalité, ordre d'origine conservé comme sorted().
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    course = diffuser(np.arange(len(starts)), starts, n)
+    order = np.lexsort((scores if croissant else -scores, course))
+    out = np.empty(n, dtype=np.int32)
+    out[order] = np.arange(n) - np.asarray(starts)[course[order]]
+    return out
+
+
+def premiers(scores, starts, croissant=False):
+    """Indice du premier partant de chaque course (argmax, stable)."""
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    course = diffuser(np.arange(len(starts)), starts, n)
+    order = np.lexsort((scores if croissant else -scores, course))
+    return order[np.asarray(starts)]
+
+
+def dans_top(masque, rang, k, starts):
+    """Par course : un partant du masque (ex: le gagnant) est-il dans les k premiers ?"""
+    return np.logical_or.reduceat(np.asarray(masque) & (np.asarray(rang) < k), starts)
+
+
+# ============================================================
+# Modèles
+# ============================================================
+
+def score_baseline(cote, valeur, musique, segment):
+    """Modèle baseline des scripts (musique 0-10, cote déjà défaut 99)."""
+    cote = np.asarray(cote, dtype=np.float64)
+    valeur = np.asarray(valeur, dtype=np.float64)
+    musique = np.asarray(musique, dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        p_marche = np.where(cote > 0, 1.0 / cote, 0.0)
+    marche = p_marche * 10
+    val = valeur / 10
+    return np.select(
+        [segment == SPRINT, segment == MILE, segment == MIDDLE],
+        [0.40 * musique + 0.40 * marche + 0.20 * val,
+         0.20 * musique + 0.30 * marche + 0.50 * val,
+         0.20 * musique + 0.50 * marche + 0.30 * val],
+        0.30 * musique + 0.40 * marche + 0.30 * val)
+
+
+def penalite_derive(cote, ref, seuil=0.3, poids=0.5):
+    """Pénalité de dérive de cote (hausse uniquement, cf.
+    integre_derive_ab_test.penalite_derive) ; cote / ref ≤ 0 → 0."""
+    cote = np.asarray(cote, dtype=np.float64)
+    ref = np.asarray(ref, dtype=np.float64)
+    valide = (cote > 0) & (ref > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        derive = np.log(np.where(valide, cote / np.where(valide, ref, 1.0), 1.0))
+    return np.where(valide & (derive > seuil), poids * np.minimum(derive - seuil, 1.5), 0.0)
+
+
+def score_live(cote, valeur, musique, nb_courses, nb_victoires, segment, nb_partants,
+               taux_v=TAUX_DEFAUT):
+    """Modèle live-scoring (musique 0-100, valeur = handicapPoids / 10).
+
+    Retourne le score arrondi à 0,1 comme le champ 'score' de
+    score_participant.
+    """
+    cote = np.asarray(cote, dtype=np.float64)
+    valeur = np.asarray(valeur, dtype=np.float64)
+    musique = np.asarray(musique, dtype=np.float64)
+    nb_courses = np.asarray(nb_courses, dtype=np.float64)
+    nb_victoires = np.asarray(nb_victoires, dtype=np.float64)
+    nb_partants = np.asarray(nb_partants)
+    taux_v = np.broadcast_to(np.asarray(taux_v, dtype=np.float64), cote.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score_cote = np.where(cote > 1, (1 / cote) * 100, 50.0)
+        indiv_v = np.where(nb_courses >= 2, nb_victoires / nb_courses * 100, 8.0)
+    score = np.select(
+        [segment == SPRINT, segment == MILE, segment == MIDDLE],
+        [musique * 0.4 + score_cote * 0.4 + valeur * 0.2,
+         valeur * 0.5 + score_cote * 0.3 + musique * 0.2,
+         score_cote * 0.5 + valeur * 0.3 + indiv_v * 0.2],
+        score_cote * 0.4 + valeur * 0.3 + musique * 0.3)
+    # Ajustement peloton ; les partants sans ajustement ne sont pas touchés
+    score = np.where(nb_partants < PETIT_CHAMP, score + valeur * 0.15,
+                     np.where(nb_partants >= GRAND_CHAMP, score + taux_v * 0.3, score))
+    return arrondi(score)
+
+
+def normaliser(scores, starts):
+    """Normalisation 10-90 par course de live-scoring.normaliser."""
+    scores = np.asarray(scores, dtype=np.float64)
+    mins, maxs = min_max(scores, starts)
+    rng = maxs - mins
+    rng[rng == 0] = 1
+    n = len(scores)
+    return arrondi((scores - diffuser(mins, starts, n)) / diffuser(rng, starts, n) * 80 + 10)
+
+
+# ============================================================
+# Vérification contre les fonctions par partant
+# ============================================================
+
+def _module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _colonnes_historique():
+    from courses_dataset import load_dataset
+    ds = load_dataset()
+    cols = {name: np.asarray(ds[name]) for name in
+            ("cote", "valeur", "distance", "nb_partants", "nb_courses", "nb_victoires")}
+    cols["starts"] = np.asarray(ds["course_start"])
+    cols["musique_codes"] = np.asarray(ds["musique"])
+    cols["musique_cat"] = np.append(ds.categories("musique").tolist(), "")
+    # Nom PMU (sans le libellé "H.PU. 4 a." du scraper)
+    from entity_ids import cle
+    cheval_cat = [cle(nom, "chevaux") for nom in ds.categories("cheval").tolist()]
+    cols["cheval"] = np.append(cheval_cat, "")[np.asarray(ds["cheval"])]
+    return cols
+
+
+def verifier():
+    """Compare le moteur aux trois fonctions par partant sur tout l'historique."""
+    from musique_parser import tableau
+    cols = _colonnes_historique()
+    n = len(cols["cote"])
+    musiques = cols["musique_cat"][cols["musique_codes"]].tolist()
+    ok = True
+
+    # --- baseline (deux scripts) ---
+    ab = _module(os.path.join(ROOT, "scripts", "integre_derive_ab_test.py"), "integre_derive_ab_test")
+    seg = segments(cols["distance"], BORNES_BASELINE)
+    mus = tableau(musiques)["score_baseline"]
+    cote = np.where(np.isfinite(cols["cote"]), cols["cote"], 99.0)
+    valeur = np.where(np.isfinite(cols["valeur"]), cols["valeur"], 0.0)
+    vect = score_baseline(cote, valeur, mus, seg)
+    ref = np.array([ab.score_baseline({"cote": c, "valeur": v, "musique": m}, SEGMENTS[s])
+                    for c, v, m, s in zip(cote.tolist(), valeur.tolist(), musiques, seg.tolist())])
+    ok &= _rapport("integre_derive_ab_test.score_baseline", vect, ref)
+
+    bt = _module(os.path.join(ROOT, "scripts", "backtest_segmente_paris.py"), "backtest_segmente_paris")
+    ref = np.array([bt.score_participant({"cote": c, "valeur": v, "musique": m}, SEGMENTS[s])
+                    for c, v, m, s in zip(cote.tolist(), valeur.tolist(), musiques, seg.tolist())])
+    ok &= _rapport("backtest_segmente_paris.score_participant", vect, ref)
+
+    # --- live ---
+    ls = _module(os.path.join(ROOT, "live-scoring.py"), "live_scoring")
+    rankings = ls.load_rankings()
+    seg = segments(cols["distance"], BORNES_LIVE)
+    mus = tableau(musiques)["score_live"]
+    handicap = np.where(np.isfinite(cols["valeur"]), cols["valeur"] * 10, 0.0)
+    cote = np.where(np.isfinite(cols["cote"]), cols["cote"], 0.0)
+    chevaux = sorted(set(cols["cheval"].tolist()))
+    taux_cheval = {nom: ls.taux_victoire_cheval(rankings, nom) for nom in chevaux}
+    taux_v = np.array([taux_cheval[nom] for nom in cols["cheval"].tolist()])
+    vect = score_live(cote, handicap / 10, mus, cols["nb_courses"], cols["nb_victoires"],
+                      seg, cols["nb_partants"], taux_v)
+    ref = np.array([
+        ls.score_participant({"nom": nom, "handicapPoids": h or None,
+                              "dernierRapportDirect": {"rapport": c}, "musique": m,
+                              "nombreCourses": nc, "nombreVictoires": nv}, d, rankings, np_)["score"]
+        for nom, h, c, m, nc, nv, d, np_ in zip(
+            cols["cheval"].tolist(), handicap.tolist(), cote.tolist(), musiques,
+            cols["nb_courses"].tolist(), cols["nb_victoires"].tolist(),
+            cols["distance"].tolist(), cols["nb_partants"].tolist())])
+    ok &= _rapport("live-scoring.score_participant", vect, ref)
+
+    norm = normaliser(vect, cols["starts"])
+    ref_norm = np.empty(n)
+    bornes = np.append(cols["starts"], n)
+    for a, b in zip(bornes[:-1].tolist(), bornes[1:].tolist()):
+        scored = ls.normaliser([{"i": i, "score": float(ref[i])} for i in range(a, b)])
+        for s in scored:
+            ref_norm[s["i"]] = s["score_norm"]
+    ok &= _rapport("live-scoring.normaliser", norm, ref_norm)
+    return ok
+
+
+def _rapport(nom, vect, ref):
+    diff = np.flatnonzero(vect != ref)
+    if len(diff):
+        print(f"❌ {nom}: {len(diff)}/{len(ref)} écarts (ex: indice {diff[0]} "
+              f"{vect[diff[0]]!r} ≠ {ref[diff[0]]!r})")
+        return False
+    print(f"✅ {nom}: {len(ref)} partants identiques")
+    return True
+
+
+def bench():
+    cols = _colonnes_historique()
+    n, starts = len(cols["cote"]), cols["starts"]
+    mus = np.zeros(n)
+    cote = np.where(np.isfinite(cols["cote"]), cols["cote"], 99.0)
+    valeur = np.where(np.isfinite(cols["valeur"]), cols["valeur"], 0.0)
+    t0 = time.perf_counter()
+    s = score_baseline(cote, valeur, mus, segments(cols["distance"], BORNES_BASELINE))
+    r = rangs(s, starts)
+    t_base = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    s = score_live(cote, valeur, mus, cols["nb_courses"], cols["nb_victoires"],
+                   segments(cols["distance"]), cols["nb_partants"])
+    normaliser(s, starts)
+    t_live = time.perf_counter() - t0
+    print(f"⚡ {n} partants, {len(starts)} courses — baseline + rangs {t_base * 1000:.1f} ms, "
+          f"live + normalisation {t_live * 1000:.1f} ms ({int((r == 0).sum())} top1)")
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "verifier"
+    if cmd == "verifier":
+        sys.exit(0 if verifier() else 1)
+    elif cmd == "bench":
+        bench()
+    else:
+        print("Usage: python3 scoring_engine.py verifier|bench", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,12 +8,13 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 import time
-import json
 import os
 import traceback
 import re
 from datetime import datetime, timedelta
 
+from json_io import read_json, write_json
+
 class ScraperCoursesFG:
     def __init__(self):
         self.base_url = "https://www.france-galop.com"
@@ -751,8 +752,7 @@ class ScraperCoursesFG:
     def save_json(self, data, filename):
         """Sauvegarde les données au format JSON"""
         filepath = os.path.join(self.output_dir, filename)
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_json(filepath, data)
         print(f"💾 Données sauvegardées dans {filepath}")
     
     def enrich_existing_json_files(self):
@@ -763,8 +763,7 @@ class ScraperCoursesFG:
         
         for filename in files:
             filepath = os.path.join(self.output_dir, filename)
-            with open(filepath, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = read_json(filepath)
 
             url = data.get("url_source")
             hippodrome = data.get("hippodrome", filename.replace(".json", ""))
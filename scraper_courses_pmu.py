@@ -12,44 +12,30 @@ Champs API PMU identifiés par debug:
 - Spécialité = dans chaque course (discipline/specialite), pas au niveau réunion
 """
 
-import requests
+import argparse
 import json
 import os
 import sys
 import time
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
+from courses_catalog import hook as catalog_hook, upsert_reunion_file
+from data_index import hook as index_hook, update_courses_index
+from json_io import read_json, write_json
+from pmu_client import PMUClient, BudgetEpuise, BASE_URL
+
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
-BASE_URL = "https://online.turfinfo.api.pmu.fr/rest/client/61"
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    'Accept': 'application/json',
-    'Accept-Language': 'fr-FR,fr;q=0.9',
-}
 OUTPUT_DIR = "data/courses"
-REQUEST_DELAY = 0.3
-
-
-def api_get(endpoint, max_retries=3):
-    url = f"{BASE_URL}/{endpoint}"
-    for attempt in range(max_retries):
-        try:
-            resp = requests.get(url, headers=HEADERS, timeout=30)
-            if resp.status_code == 200:
-                return resp.json()
-            elif resp.status_code == 404:
-                return None
-            else:
-                logger.warning(f"  ⚠️  HTTP {resp.status_code} (tentative {attempt+1})")
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"  ⚠️  Réseau: {e} (tentative {attempt+1})")
-        if attempt < max_retries - 1:
-            time.sleep(REQUEST_DELAY * (attempt + 1))
-    return None
+MAX_CONCURRENCY = 4      # requêtes simultanées max vers l'API PMU
+RATE_LIMIT = 8.0         # requêtes/seconde (token bucket)
+BACKFILL_DAYS = 3        # dates traitées en parallèle en mode backfill
+BACKFILL_MANIFEST = os.path.join(OUTPUT_DIR, "_backfill_manifest.json")
 
 
 def format_heure(ts):
@@ -244,42 +230,242 @@ def map_participant(p):
     return result
 
 
+# ============================================================
+# Fetch concurrent
+# ============================================================
+
+def fetch_courses_detail(client, date_pmu, keys):
+    """Télécharge détail + participants de chaque (reunion, course) en parallèle.
+
+    Retourne ({(reunion, course): (course_detail, participants_raw)}, budget_epuise).
+    Les deux requêtes d'une course partent en même temps ; le nombre de
+    requêtes en vol est borné par le limiteur du client. Si le budget du
+    client est atteint, les courses incomplètes sont absentes du résultat.
+    """
+    endpoints = {}
+    for reunion_num, course_num in keys:
+        base = f"programme/{date_pmu}/R{reunion_num}/C{course_num}"
+        endpoints[(reunion_num, course_num, "detail")] = base
+        endpoints[(reunion_num, course_num, "participants")] = \
+            f"{base}/participants?specialisation=INTERNET"
+
+    results = {}
+    epuise = False
+    with ThreadPoolExecutor(max_workers=client.max_concurrency) as pool:
+        futures = {pool.submit(client.get, ep): k for k, ep in endpoints.items()}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except BudgetEpuise:
+                epuise = True
+
+    details = {
+        (r, c): (results[(r, c, "detail")], results[(r, c, "participants")])
+        for r, c in keys
+        if (r, c, "detail") in results and (r, c, "participants") in results
+    }
+    return details, epuise
+
+
 # ============================================================
 # Pipeline
 # ============================================================
 
-def scrape_courses(date_obj=None):
-    if date_obj is None:
-        date_obj = datetime.now()
+def build_course(course_raw, reunion_type, course_detail, participants_raw):
+    """Construit le dict course au format courses-loader.js (None si vide)."""
+    course_num = course_raw.get("numOrdre", 0)
+    course_nom = safe_str(course_raw.get("libelle", "")).upper()
+    course_horaire = format_heure(course_raw.get("heureDepart"))
+    course_spec = (course_raw.get("discipline")
+                  or course_raw.get("specialite") or "")
+    course_type = map_specialite(course_spec) if course_spec else reunion_type
+    distance = course_raw.get("distance")
+    distance_str = f"{distance}m" if distance else ""
+
+    logger.info(f"  🏁 C{course_num}: {course_nom} ({course_horaire}) - {distance_str}")
+
+    course_mapped = {
+        "nom": course_nom,
+        "horaire": course_horaire,
+        "numero": safe_str(course_num),
+        "type": course_type,
+        "distance": distance_str,
+        "url": "",
+        "participants": []
+    }
 
+    # Extraire terrain + type de piste
+    if course_detail:
+        type_piste = safe_str(course_detail.get("typePiste", ""))
+        if type_piste:
+            course_mapped["typePiste"] = type_piste
+
+        penetro = course_detail.get("penetrometre")
+        if penetro and isinstance(penetro, dict):
+            course_mapped["terrain"] = safe_str(penetro.get("intitule", ""))
+            course_mapped["penetrometre"] = safe_str(penetro.get("valeurMesure", ""))
+
+        corde_course = safe_str(course_detail.get("corde", ""))
+        if corde_course:
+            course_mapped["cordeCourse"] = corde_course
+
+    # Extraire l'ordre d'arrivée si disponible
+    ordre_arrivee = {}
+    if course_detail and course_detail.get("ordreArrivee"):
+        for place, nums in enumerate(course_detail["ordreArrivee"], 1):
+            if isinstance(nums, list):
+                for num in nums:
+                    ordre_arrivee[num] = place
+            else:
+                ordre_arrivee[nums] = place
+        if ordre_arrivee:
+            course_mapped["arrivee_definitive"] = course_detail.get("arriveeDefinitive", False)
+
+    if not participants_raw:
+        logger.info(f"    ⚠️  Pas de données participants")
+        return None
+
+    participants_list = participants_raw.get("participants", [])
+    mapped = []
+    for p in participants_list:
+        try:
+            if p.get("estNonPartant", False):
+                continue
+            if safe_str(p.get("statut", "")).upper() == "NON_PARTANT":
+                continue
+            mp = map_participant(p)
+            if mp.get("cheval") or mp.get("jockey"):
+                # Ajouter la place d'arrivée si disponible
+                num_pmu = int(p.get("numPmu", 0))
+                if num_pmu in ordre_arrivee:
+                    mp["arrivee"] = ordre_arrivee[num_pmu]
+                mapped.append(mp)
+        except Exception as e:
+            logger.warning(f"    ⚠️  Erreur mapping: {e}")
+            continue
+
+    if not mapped:
+        logger.info(f"    ⚠️  Aucun participant valide")
+        return None
+
+    # Trier par arrivée si disponible
+    if ordre_arrivee:
+        mapped.sort(key=lambda x: x.get("arrivee", 999))
+    course_mapped["participants"] = mapped
+    logger.info(f"    👤 {len(mapped)} participants")
+    return course_mapped
+
+
+def reunion_filename(date_iso, hippodrome_nom):
+    safe_name = hippodrome_nom.lower()
+    safe_name = safe_name.replace(" ", "_").replace("/", "-").replace("\\", "-")
+    safe_name = safe_name.replace(":", "-").replace("'", "").replace(".", "")
+    safe_name = re.sub(r'[^a-z0-9_\-]', '', safe_name)
+    safe_name = re.sub(r'_+', '_', safe_name).strip('_')
+    return f"{date_iso}_{safe_name}.json"
+
+
+def reunion_hippodrome(reunion_raw):
+    hippodrome_data = reunion_raw.get("hippodrome", {})
+    if isinstance(hippodrome_data, str):
+        return hippodrome_data.upper()
+    return safe_str(hippodrome_data.get("libelleCourt", "INCONNU")).upper()
+
+
+def load_existing_courses(filepath):
+    """Courses déjà écrites dans un fichier réunion, indexées par numero."""
+    if not os.path.exists(filepath):
+        return {}
+    try:
+        data = read_json(filepath)
+    except (OSError, ValueError) as e:
+        logger.warning(f"  ⚠️  {filepath} illisible ({e}), réécriture complète")
+        return {}
+    return {c.get("numero"): c for c in data.get("courses", [])}
+
+
+def course_terminee(course):
+    """Course figée: arrivée définitive ET cotes présentes → rien à retélécharger."""
+    if not course.get("arrivee_definitive"):
+        return False
+    return any(p.get("cote") for p in course.get("participants", []))
+
+
+def scrape_day(date_obj, client, skip=None, on_saved=None, incremental=False):
+    """Scrape une journée et écrit un fichier par réunion.
+
+    skip     : ensemble de (reunion, course) à ne pas retélécharger ; leur
+               contenu est repris tel quel du fichier existant.
+    on_saved : callback(date_iso, [(reunion, course), ...]) appelé après
+               chaque fichier écrit, avec les courses effectivement obtenues.
+    incremental : relit les fichiers data/courses/{date}_{hippo}.json déjà
+               écrits et ne retélécharge que les courses non terminées
+               (cf. course_terminee), fusionnées en place.
+
+    Retourne {"programme": bool, "courses": [...], "faites": set, "fichiers": n}.
+    Lève BudgetEpuise (après avoir écrit ce qui a pu l'être) si le budget
+    du client est atteint en cours de journée.
+    """
+    skip = skip or set()
     date_pmu = date_obj.strftime("%d%m%Y")
     date_iso = date_obj.strftime("%Y-%m-%d")
+    summary = {"programme": False, "courses": [], "faites": set(skip), "fichiers": 0}
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     logger.info(f"🏇 Extraction des courses du {date_iso}")
     logger.info(f"🔗 API PMU - Date: {date_pmu}")
 
-    programme = api_get(f"programme/{date_pmu}?specialisation=INTERNET")
+    programme = client.get(f"programme/{date_pmu}?specialisation=INTERNET")
     if not programme:
         logger.error(f"❌ Impossible de récupérer le programme pour {date_iso}")
-        return False
+        return summary
+    summary["programme"] = True
 
     reunions_data = programme.get("programme", {}).get("reunions", [])
     if not reunions_data:
         logger.warning(f"⚠️  Aucune réunion trouvée pour {date_iso}")
-        return False
+        return summary
 
     logger.info(f"✅ {len(reunions_data)} réunion(s) trouvée(s)")
-    files_saved = 0
+
+    existing_by_file = {}
+
+    def existing_courses(filepath):
+        if filepath not in existing_by_file:
+            existing_by_file[filepath] = load_existing_courses(filepath)
+        return existing_by_file[filepath]
+
+    if incremental:
+        skip = set(skip)
+        for reunion_raw in reunions_data:
+            reunion_num = reunion_raw.get("numOfficiel", 0)
+            filepath = os.path.join(OUTPUT_DIR, reunion_filename(date_iso, reunion_hippodrome(reunion_raw)))
+            existing = existing_courses(filepath)
+            for course_raw in reunion_raw.get("courses", []):
+                course_num = course_raw.get("numOrdre", 0)
+                previous = existing.get(safe_str(course_num))
+                if previous and course_terminee(previous):
+                    skip.add((reunion_num, course_num))
+        summary["faites"].update(skip)
+
+    # Toutes les courses du jour sont téléchargées d'un coup (en parallèle),
+    # puis les fichiers sont construits dans l'ordre du programme.
+    keys = [(reunion_raw.get("numOfficiel", 0), course_raw.get("numOrdre", 0))
+            for reunion_raw in reunions_data
+            for course_raw in reunion_raw.get("courses", [])]
+    summary["courses"] = keys
+    to_fetch = [k for k in keys if k not in skip]
+    if skip:
+        logger.info(f"⏭️  {len(keys) - len(to_fetch)} course(s) déjà faite(s), {len(to_fetch)} à télécharger")
+    t0 = time.monotonic()
+    details, epuise = fetch_courses_detail(client, date_pmu, to_fetch)
+    logger.info(f"⚡ {len(to_fetch)} courses téléchargées en {time.monotonic() - t0:.1f}s "
+                f"(concurrence {client.max_concurrency})")
 
     for reunion_raw in reunions_data:
         reunion_num = reunion_raw.get("numOfficiel", 0)
-        hippodrome_data = reunion_raw.get("hippodrome", {})
-        if isinstance(hippodrome_data, str):
-            hippodrome_nom = hippodrome_data.upper()
-        else:
-            hippodrome_nom = safe_str(hippodrome_data.get("libelleCourt", "INCONNU")).upper()
+        hippodrome_nom = reunion_hippodrome(reunion_raw)
 
         # Spécialité: pas au niveau réunion, prendre depuis la première course
         courses_data = reunion_raw.get("courses", [])
@@ -289,6 +475,10 @@ def scrape_courses(date_obj=None):
                          or courses_data[0].get("specialite") or "")
             reunion_type = map_specialite(first_spec)
 
+        reunion_keys = [(reunion_num, c.get("numOrdre", 0)) for c in courses_data]
+        if reunion_keys and all(k in skip for k in reunion_keys):
+            continue
+
         logger.info(f"\n🏟️  R{reunion_num} - {hippodrome_nom} ({reunion_type})")
 
         reunion_output = {
@@ -299,139 +489,229 @@ def scrape_courses(date_obj=None):
             "courses": []
         }
 
+        filename = reunion_filename(date_iso, hippodrome_nom)
+        filepath = os.path.join(OUTPUT_DIR, filename)
+        partial = any(k not in details for k in reunion_keys)
+        existing = existing_courses(filepath) if partial or incremental else {}
+
+        # obtained = courses dont la réponse participants a bien été reçue
+        # (même vide) : inutile de les retélécharger lors d'une reprise
+        obtained = []
         for course_raw in courses_data:
             course_num = course_raw.get("numOrdre", 0)
-            course_nom = safe_str(course_raw.get("libelle", "")).upper()
-            course_horaire = format_heure(course_raw.get("heureDepart"))
-            course_spec = (course_raw.get("discipline")
-                          or course_raw.get("specialite") or "")
-            course_type = map_specialite(course_spec) if course_spec else reunion_type
-            distance = course_raw.get("distance")
-            distance_str = f"{distance}m" if distance else ""
-
-            logger.info(f"  🏁 C{course_num}: {course_nom} ({course_horaire}) - {distance_str}")
-
-            course_mapped = {
-                "nom": course_nom,
-                "horaire": course_horaire,
-                "numero": safe_str(course_num),
-                "type": course_type,
-                "distance": distance_str,
-                "url": "",
-                "participants": []
-            }
-
-            # Récupérer les détails de la course (arrivée + participants)
-            time.sleep(REQUEST_DELAY)
-            course_detail = api_get(
-                f"programme/{date_pmu}/R{reunion_num}/C{course_num}"
-            )
-
-            # Extraire terrain + type de piste
-            if course_detail:
-                type_piste = safe_str(course_detail.get("typePiste", ""))
-                if type_piste:
-                    course_mapped["typePiste"] = type_piste
-
-                penetro = course_detail.get("penetrometre")
-                if penetro and isinstance(penetro, dict):
-                    course_mapped["terrain"] = safe_str(penetro.get("intitule", ""))
-                    course_mapped["penetrometre"] = safe_str(penetro.get("valeurMesure", ""))
-
-                corde_course = safe_str(course_detail.get("corde", ""))
-                if corde_course:
-                    course_mapped["cordeCourse"] = corde_course
-
-            # Extraire l'ordre d'arrivée si disponible
-            ordre_arrivee = {}
-            if course_detail and course_detail.get("ordreArrivee"):
-                for place, nums in enumerate(course_detail["ordreArrivee"], 1):
-                    if isinstance(nums, list):
-                        for num in nums:
-                            ordre_arrivee[num] = place
-                    else:
-                        ordre_arrivee[nums] = place
-                if ordre_arrivee:
-                    course_mapped["arrivee_definitive"] = course_detail.get("arriveeDefinitive", False)
-
-            time.sleep(REQUEST_DELAY)
-            participants_raw = api_get(
-                f"programme/{date_pmu}/R{reunion_num}/C{course_num}/participants?specialisation=INTERNET"
-            )
-
-            if participants_raw:
-                participants_list = participants_raw.get("participants", [])
-                mapped = []
-                for p in participants_list:
-                    try:
-                        if p.get("estNonPartant", False):
-                            continue
-                        if safe_str(p.get("statut", "")).upper() == "NON_PARTANT":
-                            continue
-                        mp = map_participant(p)
-                        if mp.get("cheval") or mp.get("jockey"):
-                            # Ajouter la place d'arrivée si disponible
-                            num_pmu = int(p.get("numPmu", 0))
-                            if num_pmu in ordre_arrivee:
-                                mp["arrivee"] = ordre_arrivee[num_pmu]
-                            mapped.append(mp)
-                    except Exception as e:
-                        logger.warning(f"    ⚠️  Erreur mapping: {e}")
-                        continue
-
-                if mapped:
-                    # Trier par arrivée si disponible
-                    if ordre_arrivee:
-                        mapped.sort(key=lambda x: x.get("arrivee", 999))
-                    course_mapped["participants"] = mapped
-                    reunion_output["courses"].append(course_mapped)
-                    logger.info(f"    👤 {len(mapped)} participants")
-                else:
-                    logger.info(f"    ⚠️  Aucun participant valide")
-            else:
-                logger.info(f"    ⚠️  Pas de données participants")
+            key = (reunion_num, course_num)
+            if key not in details:
+                # Déjà faite ou non téléchargée (budget) : garder l'existant
+                previous = existing.get(safe_str(course_num))
+                if previous:
+                    reunion_output["courses"].append(previous)
+                continue
+            course_detail, participants_raw = details[key]
+            if participants_raw is None:
+                # Échec du (re)téléchargement : ne pas effacer la version sauvegardée
+                previous = existing_courses(filepath).get(safe_str(course_num))
+                if previous:
+                    reunion_output["courses"].append(previous)
+                    continue
+            course_mapped = build_course(course_raw, reunion_type, course_detail, participants_raw)
+            if course_mapped:
+                reunion_output["courses"].append(course_mapped)
+            if participants_raw is not None:
+                obtained.append(key)
 
         if reunion_output["courses"]:
-            safe_name = hippodrome_nom.lower()
-            safe_name = safe_name.replace(" ", "_").replace("/", "-").replace("\\", "-")
-            safe_name = safe_name.replace(":", "-").replace("'", "").replace(".", "")
-            safe_name = re.sub(r'[^a-z0-9_\-]', '', safe_name)
-            safe_name = re.sub(r'_+', '_', safe_name).strip('_')
-
-            filename = f"{date_iso}_{safe_name}.json"
-            filepath = os.path.join(OUTPUT_DIR, filename)
-
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(reunion_output, f, ensure_ascii=False, indent=2)
+            write_json(filepath, reunion_output)
+            catalog_hook(upsert_reunion_file, filepath)
+            index_hook(update_courses_index, [filepath])
 
             logger.info(f"  💾 {filepath} ({len(reunion_output['courses'])} courses)")
-            files_saved += 1
+            summary["fichiers"] += 1
+
+        summary["faites"].update(obtained)
+        if on_saved and obtained:
+            on_saved(date_iso, obtained)
 
     logger.info(f"\n{'='*60}")
     logger.info(f"📊 RÉSUMÉ - {date_iso}")
-    logger.info(f"  Réunions: {len(reunions_data)} | Fichiers: {files_saved}")
+    logger.info(f"  Réunions: {len(reunions_data)} | Fichiers: {summary['fichiers']}")
+    if epuise:
+        raise BudgetEpuise(f"{date_iso}: budget atteint, {len(to_fetch) - len(details)} course(s) à reprendre")
+    return summary
+
+
+def scrape_courses(date_obj=None, max_concurrency=MAX_CONCURRENCY, rate=RATE_LIMIT,
+                   incremental=False):
+    if date_obj is None:
+        date_obj = datetime.now()
+
+    client = PMUClient(max_concurrency=max_concurrency, rate=rate)
+    summary = scrape_day(date_obj, client, incremental=incremental)
+    client.log_stats(logger)
     logger.info(f"✅ Extraction terminée!")
-    return files_saved > 0
+    if incremental:
+        # Rien à rafraîchir n'est pas un échec
+        return summary["programme"]
+    return summary["fichiers"] > 0
 
 
-if __name__ == "__main__":
-    date_obj = datetime.now()
-    for arg in sys.argv[1:]:
-        if arg == "today":
-            date_obj = datetime.now()
-        elif arg == "tomorrow":
-            date_obj = datetime.now() + timedelta(days=1)
-        elif arg == "yesterday":
-            date_obj = datetime.now() - timedelta(days=1)
-        else:
+# ============================================================
+# Backfill historique (reprise sur checkpoint)
+# ============================================================
+
+class BackfillManifest:
+    """Checkpoint des (date, réunion, course) déjà écrits dans data/courses.
+
+    Format: {"updated_at", "dates_completes": [...], "courses": {date: ["R1C1", ...]}}
+    Sauvegardé de façon atomique après chaque fichier réunion écrit.
+    """
+
+    def __init__(self, path=BACKFILL_MANIFEST):
+        self.path = path
+        self.lock = threading.Lock()
+        self.courses = {}
+        self.dates_completes = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.courses = {d: set(v) for d, v in data.get("courses", {}).items()}
+            self.dates_completes = set(data.get("dates_completes", []))
+
+    @staticmethod
+    def _key(reunion, course):
+        return f"R{reunion}C{course}"
+
+    def faites(self, date_iso):
+        with self.lock:
+            done = self.courses.get(date_iso, set())
+            result = set()
+            for k in done:
+                m = re.match(r'^R(\d+)C(\d+)$', k)
+                if m:
+                    result.add((int(m.group(1)), int(m.group(2))))
+            return result
+
+    def marquer(self, date_iso, keys):
+        with self.lock:
+            self.courses.setdefault(date_iso, set()).update(self._key(r, c) for r, c in keys)
+            self._save()
+
+    def terminer(self, date_iso):
+        with self.lock:
+            self.dates_completes.add(date_iso)
+            self._save()
+
+    def _save(self):
+        payload = {
+            "updated_at": datetime.now().isoformat(timespec='seconds'),
+            "dates_completes": sorted(self.dates_completes),
+            "courses": {d: sorted(v) for d, v in sorted(self.courses.items())},
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+
+def backfill(date_from, date_to, jours_paralleles=BACKFILL_DAYS, max_concurrency=MAX_CONCURRENCY,
+             rate=RATE_LIMIT, budget=None, manifest_path=BACKFILL_MANIFEST):
+    """Scrape toutes les dates de [date_from, date_to] en parallèle.
+
+    Un seul client (donc une seule limite de débit/concurrence et un seul
+    budget de requêtes) est partagé par toutes les dates. Relancer la même
+    commande après un crash ou un budget épuisé reprend là où elle s'était
+    arrêtée grâce au manifest.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    manifest = BackfillManifest(manifest_path)
+    client = PMUClient(max_concurrency=max_concurrency, rate=rate, budget=budget)
+
+    dates = []
+    d = date_from
+    while d <= date_to:
+        if d.strftime("%Y-%m-%d") not in manifest.dates_completes:
+            dates.append(d)
+        d += timedelta(days=1)
+
+    total = (date_to - date_from).days + 1
+    logger.info(f"📚 Backfill {date_from:%Y-%m-%d} → {date_to:%Y-%m-%d}: "
+                f"{len(dates)}/{total} date(s) à traiter, {jours_paralleles} en parallèle"
+                + (f", budget {budget} requêtes" if budget else ""))
+
+    def run(date_obj):
+        date_iso = date_obj.strftime("%Y-%m-%d")
+        summary = scrape_day(date_obj, client, skip=manifest.faites(date_iso), on_saved=manifest.marquer)
+        if summary["programme"] and all(k in summary["faites"] for k in summary["courses"]):
+            manifest.terminer(date_iso)
+            return True
+        return False
+
+    completes, epuise = 0, False
+    with ThreadPoolExecutor(max_workers=max(1, jours_paralleles)) as pool:
+        futures = {pool.submit(run, d): d for d in dates}
+        for future in as_completed(futures):
             try:
-                date_obj = datetime.strptime(arg, "%Y-%m-%d")
-            except ValueError:
-                logger.error(f"❌ Format invalide: {arg}")
-                sys.exit(1)
+                if future.result():
+                    completes += 1
+            except BudgetEpuise:
+                epuise = True
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"📚 Backfill: {completes}/{len(dates)} date(s) complète(s) — manifest {manifest_path}")
+    if epuise:
+        logger.warning(f"⚠️  Budget de {budget} requêtes atteint: relancer la même commande pour reprendre")
+    client.log_stats(logger)
+    return completes == len(dates)
+
+
+def parse_date_arg(arg):
+    if arg == "today":
+        return datetime.now()
+    if arg == "tomorrow":
+        return datetime.now() + timedelta(days=1)
+    if arg == "yesterday":
+        return datetime.now() - timedelta(days=1)
+    try:
+        return datetime.strptime(arg, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Format invalide: {arg}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraper Courses Hippiques - API PMU")
+    parser.add_argument("date", nargs="?", type=parse_date_arg, default=datetime.now(),
+                        help="YYYY-MM-DD, today, tomorrow ou yesterday (défaut: today)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="ne retélécharge que les courses sans arrivée définitive ou sans cotes")
+    parser.add_argument("--from", dest="date_from", type=parse_date_arg,
+                        help="backfill: première date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=parse_date_arg,
+                        help="backfill: dernière date incluse (défaut: hier)")
+    parser.add_argument("--jours-paralleles", type=int, default=BACKFILL_DAYS,
+                        help=f"backfill: dates traitées en parallèle (défaut: {BACKFILL_DAYS})")
+    parser.add_argument("--budget", type=int, default=None,
+                        help="backfill: nombre max de requêtes HTTP pour ce run")
+    parser.add_argument("--manifest", default=BACKFILL_MANIFEST,
+                        help=f"backfill: fichier checkpoint (défaut: {BACKFILL_MANIFEST})")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY,
+                        help=f"requêtes simultanées max par hôte (défaut: {MAX_CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT,
+                        help=f"débit max en requêtes/seconde (défaut: {RATE_LIMIT:g})")
+    args = parser.parse_args()
 
     logger.info("🚀 Scraper Courses Hippiques - API PMU v2")
+
+    if args.date_from:
+        date_to = args.date_to or (datetime.now() - timedelta(days=1))
+        if date_to < args.date_from:
+            parser.error("--to doit être postérieur à --from")
+        success = backfill(args.date_from, date_to, jours_paralleles=args.jours_paralleles,
+                           max_concurrency=args.concurrency, rate=args.rate,
+                           budget=args.budget, manifest_path=args.manifest)
+        sys.exit(0 if success else 1)
+
+    date_obj = args.date
     logger.info(f"📅 Date: {date_obj.strftime('%Y-%m-%d')}")
     logger.info("")
-    success = scrape_courses(date_obj)
+    success = scrape_courses(date_obj, max_concurrency=args.concurrency, rate=args.rate,
+                             incremental=args.incremental)
     sys.exit(0 if success else 1)
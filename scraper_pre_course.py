@@ -3,29 +3,43 @@
 Scraper pré-course : capture les cotes 10 min avant le départ
 pour les hippodromes majeurs (Saint-Cloud, Longchamp, Chantilly, etc.)
 
-Tourne toutes les 15 minutes entre 11h et 17h UTC (13h-19h France).
-Vérifie si une course démarre dans les 15 prochaines minutes.
-Si oui, scrape les cotes et les stocke dans data/cotes_live/
+Mode ponctuel (historique) : vérifie si une course démarre dans les
+15 prochaines minutes. Si oui, scrape les cotes et les stocke dans
+data/cotes_live/
+
+Mode démon (--daemon) : charge le programme une fois, garde une file de
+priorité des départs et se réveille exactement à T-10, T-5 et T-1 de
+chaque course cible. Le process dort entre deux captures.
+
+Chaque capture (même quand le fichier *_live.json existe déjà) est aussi
+ajoutée à la série temporelle data/cotes_live/series/ (cf. cotes_store.py)
+et au catalogue SQLite (cf. courses_catalog.py).
 
 Usage : python3 scraper_pre_course.py
+        python3 scraper_pre_course.py --daemon [--duree-max 350] [--hook "cmd"]
 """
 
-import requests
-import json
+import argparse
+import fcntl
+import heapq
 import os
-import time
 import logging
+import subprocess
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
+from cotes_store import append_snapshot
+from courses_catalog import hook as catalog_hook, upsert_capture
+from data_index import hook as index_hook, update_cotes_live_index
+from json_io import write_json
+from pmu_client import api_get, get_client
+
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
-BASE_URL = "https://online.turfinfo.api.pmu.fr/rest/client/61"
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0',
-    'Accept': 'application/json',
-}
 OUTPUT_DIR = "data/cotes_live"
+LOCK_PATH = os.path.join(OUTPUT_DIR, ".lock")
 
 # Hippodromes cibles (grandes courses françaises)
 HIPPODROMES_CIBLES = [
@@ -39,18 +53,11 @@ HIPPODROMES_CIBLES = [
 # Fenêtre de capture : on scrape si la course démarre dans les 15 prochaines minutes
 FENETRE_MINUTES = 15
 
-
-def api_get(endpoint, max_retries=2):
-    url = f"{BASE_URL}/{endpoint}"
-    for attempt in range(max_retries):
-        try:
-            resp = requests.get(url, headers=HEADERS, timeout=15)
-            if resp.status_code == 200:
-                return resp.json()
-        except Exception as e:
-            logger.warning(f"  ⚠️ Erreur: {e}")
-        time.sleep(0.3)
-    return None
+# Mode démon : captures exactes à T-10, T-5 et T-1 avant le départ
+OFFSETS_MINUTES = (10, 5, 1)
+HOOK_TIMEOUT = 300
+HOOK_MARGE = 90       # secondes libres avant la prochaine capture pour lancer le hook
+HOOK_POLL = 5
 
 
 def get_programme_jour():
@@ -122,6 +129,30 @@ def scrape_cotes_course(date_pmu, reunion_num, course_num, course_info):
     }
 
 
+def capture_filepath(date_iso, hippo_nom, reunion_num, course_num):
+    safe_hippo = hippo_nom.lower().replace(" ", "_").replace("/", "-")
+    filename = f"{date_iso}_{safe_hippo}_R{reunion_num}C{course_num}_live.json"
+    return os.path.join(OUTPUT_DIR, filename)
+
+
+def sauvegarder_capture(result, filepath, ecraser=False):
+    """Écrit la capture. Sans ecraser, la 1ère capture d'une course est conservée."""
+    if not ecraser and os.path.exists(filepath):
+        logger.info(f"   ⏭️  Déjà capté, skip")
+        return False
+
+    write_json(filepath, result)
+    index_hook(update_cotes_live_index, [filepath])
+    return True
+
+
+def log_cotes(result):
+    logger.info(f"   📊 {len(result['participants'])} participants avec cotes live")
+    sorted_p = sorted(result['participants'], key=lambda x: x.get('cote_live') or 999)
+    for p in sorted_p[:5]:
+        logger.info(f"      #{p['numPmu']} {p['nom'][:20]:20} cote:{p['cote_live']} ref:{p['cote_reference']} {p['tendance']}")
+
+
 def main():
     logger.info("🏇 Scraper pré-course — cotes live")
     logger.info(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M')}")
@@ -168,27 +199,16 @@ def main():
 
                 if result:
                     result["hippodrome"] = hippo_nom.upper()
+                    append_snapshot(date_iso, result)
+                    catalog_hook(upsert_capture, date_iso, result)
 
                     # Sauvegarder — NE PAS écraser si déjà capté (1ère capture = la bonne)
-                    safe_hippo = hippo_nom.lower().replace(" ", "_").replace("/", "-")
-                    filename = f"{date_iso}_{safe_hippo}_R{reunion_num}C{course_num}_live.json"
-                    filepath = os.path.join(OUTPUT_DIR, filename)
-
-                    if os.path.exists(filepath):
-                        logger.info(f"   ⏭️  Déjà capté, skip")
+                    filepath = capture_filepath(date_iso, hippo_nom, reunion_num, course_num)
+                    if not sauvegarder_capture(result, filepath):
                         continue
 
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        json.dump(result, f, ensure_ascii=False, indent=2)
-
                     logger.info(f"   💾 {filepath}")
-                    logger.info(f"   📊 {len(result['participants'])} participants avec cotes live")
-
-                    # Afficher les cotes
-                    sorted_p = sorted(result['participants'], key=lambda x: x.get('cote_live') or 999)
-                    for p in sorted_p[:5]:
-                        logger.info(f"      #{p['numPmu']} {p['nom'][:20]:20} cote:{p['cote_live']} ref:{p['cote_reference']} {p['tendance']}")
-
+                    log_cotes(result)
                     courses_scrapees += 1
 
             elif minutes_avant <= 0 and minutes_avant > -5:
@@ -199,18 +219,203 @@ def main():
                 result = scrape_cotes_course(date_pmu, reunion_num, course_num, course)
                 if result:
                     result["hippodrome"] = hippo_nom.upper()
-                    safe_hippo = hippo_nom.lower().replace(" ", "_").replace("/", "-")
-                    filename = f"{date_iso}_{safe_hippo}_R{reunion_num}C{course_num}_live.json"
-                    filepath = os.path.join(OUTPUT_DIR, filename)
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        json.dump(result, f, ensure_ascii=False, indent=2)
+                    append_snapshot(date_iso, result)
+                    catalog_hook(upsert_capture, date_iso, result)
+                    filepath = capture_filepath(date_iso, hippo_nom, reunion_num, course_num)
+                    sauvegarder_capture(result, filepath, ecraser=True)
                     courses_scrapees += 1
 
     if courses_scrapees == 0:
         logger.info("\n📭 Aucune course cible dans les 15 prochaines minutes")
     else:
         logger.info(f"\n✅ {courses_scrapees} courses scrapées (cotes live)")
+    get_client().log_stats(logger)
+
+
+# ============================================================
+# Mode démon : une capture précise à T-10, T-5 et T-1
+# ============================================================
+
+def planifier_captures(reunions, offsets=OFFSETS_MINUTES, now_ts=None, fin_ts=None):
+    """Construit le tas (heapq) des captures à venir pour les hippodromes cibles.
+
+    Chaque entrée = (ts_capture, reunion_num, course_num, offset, hippo_nom, course).
+    Une course dont tous les offsets sont déjà passés mais qui n'est pas
+    encore partie reçoit une capture immédiate (démon lancé en retard).
+    """
+    now_ts = now_ts if now_ts is not None else time.time()
+    heap = []
+    for reunion in reunions:
+        hippo = reunion.get("hippodrome", {})
+        if not est_hippodrome_cible(hippo):
+            continue
+        hippo_nom = hippo.get("libelleCourt", "INCONNU") if isinstance(hippo, dict) else str(hippo)
+        reunion_num = reunion.get("numOfficiel", 0)
+
+        for course in reunion.get("courses", []):
+            heure_depart = course.get("heureDepart")
+            if not heure_depart:
+                continue
+            depart_ts = heure_depart / 1000
+            if depart_ts <= now_ts:
+                continue
+            course_num = course.get("numOrdre", 0)
+            futurs = [o for o in offsets if depart_ts - o * 60 > now_ts]
+            if len(futurs) < len(offsets):
+                futurs = [None] + futurs   # rattrapage immédiat
+            for offset in futurs:
+                ts = now_ts if offset is None else depart_ts - offset * 60
+                if fin_ts is not None and ts > fin_ts:
+                    continue
+                heapq.heappush(heap, (ts, reunion_num, course_num, offset if offset is not None else -1,
+                                      hippo_nom, course))
+    return heap
+
+
+@contextmanager
+def verrou_ecriture():
+    """Verrou exclusif (flock) sur data/cotes_live/.lock, partagé avec
+    scripts/commit_cotes_live.sh : le hook le tient pendant commit + pull,
+    le démon pendant ses écritures. Une capture déjà téléchargée attend
+    donc la fin du pull au lieu d'écrire dans un arbre en cours de rebase."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with open(LOCK_PATH, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class HookAsync:
+    """Commande hook (commit + push) lancée sans bloquer les captures.
+
+    Au plus un processus à la fois ; une capture écrite pendant qu'il
+    tourne le remet en attente (un seul relancement pour toutes). Un hook
+    n'est lancé que si la prochaine capture est à plus de HOOK_MARGE
+    secondes ; s'il déborde, la capture est téléchargée à l'heure et son
+    écriture attend le verrou (cf. verrou_ecriture).
+    """
+
+    def __init__(self, commande):
+        self.commande = commande
+        self.proc = None
+        self.debut = 0.0
+        self.en_attente = False
+
+    def declencher(self):
+        self.en_attente = bool(self.commande)
+
+    def actif(self):
+        if self.proc is not None and self.proc.poll() is not None:
+            self.proc = None
+        if self.proc is not None and time.time() - self.debut > HOOK_TIMEOUT:
+            logger.warning(f"   ⚠️  hook interrompu après {HOOK_TIMEOUT}s")
+            self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+        return self.proc is not None
+
+    def tick(self, prochaine_ts=None):
+        """Lance le hook en attente si rien ne tourne et qu'on a le temps."""
+        if not self.en_attente or self.actif():
+            return
+        if prochaine_ts is not None and prochaine_ts - time.time() < HOOK_MARGE:
+            return
+        logger.info(f"   🔗 hook: {self.commande}")
+        self.proc = subprocess.Popen(self.commande, shell=True)
+        self.debut = time.time()
+        self.en_attente = False
+
+    def terminer(self):
+        """Fin du démon : attend le hook en cours puis lance le dernier."""
+        while self.actif():
+            time.sleep(1)
+        self.tick()
+        while self.actif():
+            time.sleep(1)
+
+
+def daemon(offsets=OFFSETS_MINUTES, duree_max=None, hook=None):
+    """Charge le programme une fois puis dort jusqu'à chaque capture planifiée.
+
+    duree_max : minutes avant arrêt (les captures au-delà ne sont pas planifiées).
+    hook      : commande shell lancée après chaque snapshot écrit (ex: commit+push),
+                en arrière-plan entre deux captures (cf. HookAsync).
+    """
+    logger.info("🏇 Scraper pré-course — mode démon")
+    logger.info(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M')} — captures à T-{', T-'.join(map(str, offsets))}")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    reunions, date_pmu = get_programme_jour()
+    if not reunions:
+        logger.info("❌ Pas de programme aujourd'hui")
+        return
+
+    date_iso = datetime.now().strftime("%Y-%m-%d")
+    debut = time.time()
+    fin_ts = debut + duree_max * 60 if duree_max else None
+    heap = planifier_captures(reunions, offsets, now_ts=debut, fin_ts=fin_ts)
+    nb_courses = len({(e[1], e[2]) for e in heap})
+    logger.info(f"🗓️  {len(heap)} captures planifiées sur {nb_courses} courses cibles")
+
+    captures = 0
+    hook = HookAsync(hook)
+    while heap:
+        ts, reunion_num, course_num, offset, hippo_nom, course = heapq.heappop(heap)
+        attente = ts - time.time()
+        while attente > 0:
+            hook.tick(ts)
+            time.sleep(min(attente, HOOK_POLL))
+            attente = ts - time.time()
+
+        depart_ts = course["heureDepart"] / 1000
+        minutes_avant = (depart_ts - time.time()) / 60
+        label = f"T-{offset}" if offset >= 0 else "rattrapage"
+        logger.info(f"\n⏰ {hippo_nom} R{reunion_num} C{course_num} — {course.get('libelle', '')} "
+                    f"[{label}, départ dans {minutes_avant:.1f} min]")
+
+        course["_minutes_avant"] = round(minutes_avant)
+        result = scrape_cotes_course(date_pmu, reunion_num, course_num, course)
+        if not result:
+            logger.info("   ⚠️  Pas de cotes")
+            continue
+        result["hippodrome"] = hippo_nom.upper()
+        # NE PAS écraser si déjà capté (1ère capture = la bonne)
+        filepath = capture_filepath(date_iso, hippo_nom, reunion_num, course_num)
+        with verrou_ecriture():
+            append_snapshot(date_iso, result)
+            nouveau = sauvegarder_capture(result, filepath)
+        catalog_hook(upsert_capture, date_iso, result)
+        log_cotes(result)
+        # Chaque snapshot (T-10, T-5, T-1) est poussé, pas seulement la 1ère capture
+        hook.declencher()
+        if nouveau:
+            logger.info(f"   💾 {filepath}")
+            captures += 1
+
+    hook.terminer()
+
+    logger.info(f"\n✅ Démon terminé: {captures} course(s) captée(s) en "
+                f"{(time.time() - debut) / 60:.0f} min")
+    get_client().log_stats(logger)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Scraper pré-course — cotes live")
+    parser.add_argument("--daemon", action="store_true",
+                        help="charge le programme une fois et capture à T-10, T-5, T-1")
+    parser.add_argument("--offsets", default=",".join(map(str, OFFSETS_MINUTES)),
+                        help="minutes avant départ, séparées par des virgules (défaut: 10,5,1)")
+    parser.add_argument("--duree-max", type=float, default=None,
+                        help="démon: durée max en minutes avant arrêt")
+    parser.add_argument("--hook", default=None,
+                        help="démon: commande shell lancée (en arrière-plan) après chaque snapshot écrit")
+    args = parser.parse_args()
+
+    if args.daemon:
+        offsets = tuple(sorted({int(o) for o in args.offsets.split(",") if o.strip()}, reverse=True))
+        daemon(offsets=offsets, duree_max=args.duree_max, hook=args.hook)
+    else:
+        main()
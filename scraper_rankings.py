@@ -14,7 +14,6 @@ Usage:
 
 import requests
 from bs4 import BeautifulSoup
-import json
 import os
 import sys
 import time
@@ -24,6 +23,8 @@ import random
 import argparse
 from datetime import datetime
 
+from json_io import write_json
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -331,8 +332,7 @@ def save_json(data, category):
     os.makedirs(DATA_DIR, exist_ok=True)
     filepath = os.path.join(DATA_DIR, f"{category}.json")
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json(filepath, data)
     
     logger.info(f"💾 Sauvegardé: {filepath}")
     return True
@@ -18,6 +18,10 @@ Hypothèses / limites honnêtes:
       infos disponibles avant la course (cote, cote_reference, valeur, musique,
       nb_courses/victoires historiques, terrain).
     - Le favori marché est le cheval avec cote minimale.
+    - Features lues dans le feature store (feature_store.py) ; scores et
+      classements calculés pour toutes les courses en un passage NumPy
+      (scoring_engine). backtester_course / segmenter_course restent la
+      référence par course.
 
 Sortie:
     data/backtest/segmente_paris_YYYY-MM-DD.json
@@ -25,7 +29,7 @@ Sortie:
 """
 
 import json
-import glob
+import math
 import os
 import sys
 import re
@@ -33,6 +37,15 @@ from collections import defaultdict
 from math import sqrt
 from datetime import datetime
 
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import musique_parser
+import scoring_engine
+from feature_store import TERRAINS, load_features
+
 # ============ CONFIG ============
 HIPPODROMES_PARIS = {
     "SAINT-CLOUD": "saint-cloud",
@@ -41,7 +54,6 @@ HIPPODROMES_PARIS = {
     "PARISLONGCHAMP": "parislongchamp",
     "LONGCHAMP": "longchamp",
 }
-DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "courses")
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "backtest")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -73,17 +85,9 @@ def verdict(k_mod, k_fav, n, baseline_hasard):
 # ============ PARSING MUSIQUE ============
 def score_musique(musique_str):
     """Score musique : moyenne pondérée des 5 dernières perfs (plus récent = plus fort).
-    1=10pts, 2=7, 3=5, 4=3, 5=2, reste=0. Retourne 0-10."""
-    if not musique_str:
-        return 0.0
-    positions = re.findall(r'(\d)[a-zA-Z]', musique_str)[:5]
-    if not positions:
-        return 0.0
-    pts = {'1': 10, '2': 7, '3': 5, '4': 3, '5': 2, '6': 1, '7': 1, '8': 0, '9': 0, '0': 0}
-    weights = [5, 4, 3, 2, 1]
-    total_w = sum(weights[:len(positions)])
-    score = sum(pts.get(p, 0) * w for p, w in zip(positions, weights))
-    return score / total_w if total_w > 0 else 0.0
+    1=10pts, 2=7, 3=5, 4=3, 5=2, reste=0. Retourne 0-10.
+    Voir musique_parser.score_baseline (mémoïsé)."""
+    return musique_parser.score_baseline(musique_str)
 
 # ============ SCORE PREDICTIF ============
 def score_participant(p, type_course_seg):
@@ -121,49 +125,72 @@ def seg_distance(d):
 
 # ============ SEGMENTATION ============
 def segmenter_course(course):
-    tags = []
     partants = course.get("participants", [])
-    n = len(partants)
-
+    cotes = []
+    for p in partants:
+        try:
+            c = float(p.get("cote", 0))
+            if c > 0: cotes.append(c)
+        except (ValueError, TypeError):
+            pass
+    terrain = (course.get("terrain") or "").lower()
+    if any(x in terrain for x in ["lourd", "tres souple", "tr\u00e8s souple", "collant"]):
+        terrain = "lourd"
+    elif "souple" in terrain:
+        terrain = "souple"
+    elif "bon" in terrain:
+        terrain = "bon"
+    else:
+        terrain = ""
+    return tags_course(len(partants), parse_distance(course.get("distance", "0")), terrain,
+                       course.get("nom"), course.get("type"),
+                       min(cotes) if cotes else None, max(cotes) if cotes else None)
+
+def tags_course(n, d, terrain, nom, typ, cote_min, cote_max):
+    """Tags d'une course (terrain: "lourd" / "souple" / "bon" / "",
+    cote_min / cote_max des cotes > 0, None si aucune)."""
+    tags = []
     if n >= 14: tags.append("grand_peloton_14+")
     elif n <= 8: tags.append("petit_peloton_<=8")
     else: tags.append("peloton_moyen_9-13")
 
-    d = parse_distance(course.get("distance", "0"))
     tags.append(f"dist_{seg_distance(d)}")
 
-    terrain = (course.get("terrain") or "").lower()
-    if any(x in terrain for x in ["lourd", "tres souple", "tr\u00e8s souple", "collant"]):
-        tags.append("terrain_lourd")
-    elif "souple" in terrain:
-        tags.append("terrain_souple")
-    elif "bon" in terrain:
-        tags.append("terrain_bon")
+    if terrain:
+        tags.append(f"terrain_{terrain}")
 
-    nom = (course.get("nom") or "").lower()
-    typ = (course.get("type") or "").lower()
+    nom = (nom or "").lower()
+    typ = (typ or "").lower()
     if "handicap" in nom or "handicap" in typ: tags.append("handicap")
     if "groupe" in nom or "listed" in nom: tags.append("groupe_ou_listed_probable")
     if "reclamer" in nom or "r\u00e9clamer" in nom: tags.append("reclamer")
     if "2 ans" in nom or "maiden" in nom: tags.append("maiden_ou_2ans")
 
-    cotes = []
-    for p in partants:
-        try:
-            c = float(p.get("cote", 0))
-            if c > 0: cotes.append(c)
-        except (ValueError, TypeError):
-            pass
-    if cotes:
-        cote_min = min(cotes)
+    if cote_min is not None:
         if cote_min <= 2.5: tags.append("favori_massif_cote<=2.5")
         elif cote_min <= 4.0: tags.append("favori_net_2.5-4")
         else: tags.append("course_ouverte_favori>4")
-        if max(cotes) / cote_min > 30: tags.append("forte_dispersion_cotes")
+        if cote_max / cote_min > 30: tags.append("forte_dispersion_cotes")
 
     tags.append("GLOBAL")
     return tags
 
+def segmenter_store(fs, courses):
+    """Tags des courses (indices) du feature store."""
+    cote = np.asarray(fs["cote"])
+    positive = np.where(cote > 0, cote, np.nan)
+    with np.errstate(invalid="ignore"):
+        cote_min = np.fmin.reduceat(positive, fs.starts)[courses].tolist()
+        cote_max = np.fmax.reduceat(positive, fs.starts)[courses].tolist()
+    colonnes = [np.asarray(fs.course(name))[courses].tolist()
+                for name in ("nb_partants", "distance", "terrain", "nom", "type")]
+    return [tags_course(n, d, TERRAINS[t], nom, typ,
+                        None if math.isnan(lo) else lo, None if math.isnan(hi) else hi)
+            for n, d, t, nom, typ, lo, hi in zip(*colonnes, cote_min, cote_max)]
+
+def est_paris_2026(fichier):
+    return fichier.startswith("2026-") and any(h in fichier.lower() for h in HIPPODROMES_PARIS.values())
+
 # ============ BACKTEST ============
 def backtester_course(course):
     partants = course.get("participants", [])
@@ -205,22 +232,42 @@ def backtester_course(course):
         "nb_partants": len(partants),
     }
 
+def backtester_store(fs, courses):
+    """backtester_course sur les courses (masque) du feature store, en un
+    passage NumPy. Retourne (indices des courses backtestees, resultats)."""
+    gagnant = np.asarray(fs["gagnant"])
+    courses = courses & (fs.course("nb_partants") >= 4) & np.logical_or.reduceat(gagnant, fs.starts)
+    idx, starts = fs.selection(courses)
+    # float(cote) or 99 / float(valeur) or 0 : absent, illisible ou nul
+    cote, valeur = fs["cote"][idx], fs["valeur"][idx]
+    cote = np.where(np.isnan(cote) | (cote == 0), 99.0, cote)
+    valeur = np.where(np.isnan(valeur), 0.0, valeur)
+    scores = scoring_engine.score_baseline(cote, valeur, fs["musique_baseline"][idx],
+                                           fs.partant("segment")[idx])
+    est_gagnant = gagnant[idx]
+    rang_model = scoring_engine.rangs(scores, starts)
+    rang_fav = scoring_engine.rangs(cote, starts, croissant=True)
+    ok = [scoring_engine.dans_top(est_gagnant, rang, k, starts).tolist()
+          for rang in (rang_model, rang_fav) for k in (1, 2)]
+    tailles = scoring_engine.tailles(starts, len(idx)).tolist()
+    resultats = [{
+        "model_top1_ok": ok[0][j],
+        "model_top2_ok": ok[1][j],
+        "fav_top1_ok": ok[2][j],
+        "fav_top2_ok": ok[3][j],
+        "nb_partants": tailles[j],
+    } for j in range(len(tailles))]
+    return np.flatnonzero(courses), resultats
+
 # ============ MAIN ============
 def main():
     print("=" * 70)
     print("BACKTEST SEGMENTE - Hippodromes parisiens 2026")
     print("=" * 70)
 
-    files = glob.glob(os.path.join(DATA_DIR, "2026-*.json"))
-    files_paris = []
-    for f in files:
-        name = os.path.basename(f).lower()
-        for h in HIPPODROMES_PARIS.values():
-            if h in name:
-                files_paris.append(f)
-                break
-
-    print(f"\n{len(files_paris)} fichiers Paris 2026 trouves")
+    fs = load_features()
+    paris = [est_paris_2026(f) for f in fs.fichiers]
+    print(f"\n{sum(paris)} fichiers Paris 2026 trouves")
 
     segments = defaultdict(lambda: {
         "n": 0, "model_top1": 0, "fav_top1": 0,
@@ -228,30 +275,20 @@ def main():
         "baseline_hasard_top1": []
     })
 
+    courses, resultats = backtester_store(fs, fs.masque_fichiers(est_paris_2026))
+    hippos = np.asarray(fs.course("hippodrome"))[courses].tolist()
     total_courses = 0
-    for fp in sorted(files_paris):
-        try:
-            with open(fp, encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            print(f"  skip {fp}: {e}")
-            continue
-
-        hippo = data.get("hippodrome", "?")
-        for course in data.get("courses", []):
-            result = backtester_course(course)
-            if result is None: continue
-            total_courses += 1
-            tags = segmenter_course(course)
-            tags.append(f"hippo_{hippo}")
-
-            for tag in tags:
-                segments[tag]["n"] += 1
-                if result["model_top1_ok"]: segments[tag]["model_top1"] += 1
-                if result["fav_top1_ok"]: segments[tag]["fav_top1"] += 1
-                if result["model_top2_ok"]: segments[tag]["model_top2"] += 1
-                if result["fav_top2_ok"]: segments[tag]["fav_top2"] += 1
-                segments[tag]["baseline_hasard_top1"].append(1.0 / result["nb_partants"])
+    for hippo, tags, result in zip(hippos, segmenter_store(fs, courses), resultats):
+        total_courses += 1
+        tags.append(f"hippo_{hippo or '?'}")
+
+        for tag in tags:
+            segments[tag]["n"] += 1
+            if result["model_top1_ok"]: segments[tag]["model_top1"] += 1
+            if result["fav_top1_ok"]: segments[tag]["fav_top1"] += 1
+            if result["model_top2_ok"]: segments[tag]["model_top2"] += 1
+            if result["fav_top2_ok"]: segments[tag]["fav_top2"] += 1
+            segments[tag]["baseline_hasard_top1"].append(1.0 / result["nb_partants"])
 
     print(f"\n{total_courses} courses backtestees au total\n")
     print(f"{'SEGMENT':<35} {'N':>4} {'Mod%':>6} {'Fav%':>6} {'Ecart':>6}  VERDICT")
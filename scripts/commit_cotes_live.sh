@@ -0,0 +1,36 @@
+#!/usr/bin/env bash
+# Commit + push des nouvelles cotes live (data/cotes_live/).
+# Appelé par scrape-pre-course.yml, et par scraper_pre_course.py --daemon
+# (--hook, en arrière-plan) après chaque snapshot pour que le frontend les
+# voie sans attendre la fin du démon.
+#
+# Pas de git stash : le démon écrit pendant que ce script tourne. On
+# commite d'abord, puis pull --rebase, le tout sous le verrou
+# data/cotes_live/.lock (cf. verrou_ecriture) pour que le démon n'écrive
+# pas dans l'arbre pendant le rebase. Le push se fait hors verrou.
+set -u
+
+mkdir -p data/cotes_live
+exec 9>data/cotes_live/.lock
+flock 9
+
+# Régénère l'index AVANT le check git diff pour qu'il soit inclus dans le commit
+python3 scripts/update_cotes_live_index.py
+git add data/cotes_live/ 2>/dev/null || true
+
+if git diff --cached --quiet; then
+  echo "Pas de nouvelles cotes"
+else
+  git commit -m "⏱️ Cotes live pré-course $(date +'%Y-%m-%d %H:%M')"
+fi
+
+# Rebase des commits locaux (celui-ci et ceux d'un push échoué) sur main
+if [ "$(git rev-list --count origin/main..HEAD 2>/dev/null || echo 1)" -gt 0 ]; then
+  if ! git pull origin main --rebase; then
+    git rebase --abort 2>/dev/null || true
+    echo "⚠️ pull échoué, commit gardé localement, nouvel essai à la prochaine capture"
+    exit 0
+  fi
+  flock -u 9
+  git push || echo "⚠️ push échoué, nouvel essai à la prochaine capture"
+fi
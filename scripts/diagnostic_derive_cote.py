@@ -20,20 +20,29 @@ Methodo:
 
 Sortie: tableau par bin + regression simple de calibration.
 
-Usage: python3 scripts/diagnostic_derive_cote.py
+Les participants sont lus dans le feature store (feature_store.py :
+cote, cote_reference, derive, arrivee precalculees par fichier).
+
+Usage: python3 scripts/diagnostic_derive_cote.py [--boot 2000] [--workers 4]
 """
 
-import json
-import glob
+import argparse
 import os
-import re
-import math
+import sys
 from collections import defaultdict
 from math import sqrt, log
 
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bootstrap import N_BOOT, bootstrap_courses, statistique_logit
+from feature_store import load_features
+from logreg import fit_conditionnel, fit_logistique, standardiser
+
 HIPPODROMES_PARIS = ["saint-cloud", "chantilly", "fontainebleau",
                      "parislongchamp", "longchamp"]
-DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "courses")
 
 
 def wilson_ic(k, n, z=1.96):
@@ -46,43 +55,32 @@ def wilson_ic(k, n, z=1.96):
     return (max(0.0, c - m), min(1.0, c + m))
 
 
+def est_paris_2026(fichier):
+    return fichier.startswith("2026-") and any(h in fichier.lower() for h in HIPPODROMES_PARIS)
+
+
 def collect_participants():
     """Extrait chaque participant des courses Paris 2026 avec:
     - cote_finale, cote_reference, arrivee (1 si gagnant sinon 0)
+    - course : indice de la course dans le store (partants contigus)
     """
+    fs = load_features()
+    courses = fs.masque_fichiers(est_paris_2026) & fs.course("arrivee_definitive")
+    cote, ref = fs["cote"], fs["cote_reference"]
+    # Ne prendre que les courses avec arrivee definitive, cotes > 0 et arrivee connue
+    idx = np.flatnonzero(fs.partant(courses) & (cote > 0) & (ref > 0) & fs["arrivee_connue"])
+    course = np.searchsorted(fs.starts, idx, side="right") - 1
     rows = []
-    files = sorted(glob.glob(os.path.join(DATA_DIR, "2026-*.json")))
-    files_paris = [f for f in files
-                   if any(h in os.path.basename(f).lower() for h in HIPPODROMES_PARIS)]
-
-    for fp in files_paris:
-        try:
-            with open(fp, encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            continue
-        for course in data.get("courses", []):
-            # Ne prendre que les courses avec arrivee definitive
-            if not course.get("arrivee_definitive"):
-                continue
-            for p in course.get("participants", []):
-                try:
-                    cote = float(p.get("cote", 0))
-                    ref = float(p.get("cote_reference", 0))
-                except (ValueError, TypeError):
-                    continue
-                if cote <= 0 or ref <= 0:
-                    continue
-                arr = p.get("arrivee")
-                if arr is None:
-                    continue
-                rows.append({
-                    "cote": cote,
-                    "cote_ref": ref,
-                    "derive": log(cote / ref),  # negative = baisse = money in
-                    "gagnant": 1 if arr == 1 else 0,
-                    "place_top3": 1 if isinstance(arr, int) and arr <= 3 else 0,
-                })
+    for c, r, d, arr, k in zip(cote[idx].tolist(), ref[idx].tolist(), fs["derive"][idx].tolist(),
+                               fs["arrivee"][idx].tolist(), course.tolist()):
+        rows.append({
+            "cote": c,
+            "cote_ref": r,
+            "derive": d,  # negative = baisse = money in
+            "gagnant": 1 if arr == 1 else 0,
+            "place_top3": 1 if arr <= 3 else 0,
+            "course": k,
+        })
     return rows
 
 
@@ -132,90 +130,55 @@ def analyse_par_bin(rows, n_bins=4):
     print("  Si Lifts ~= 1.0 partout -> le marche a deja digere l'info, pas d'edge.")
 
 
-def regression_logistique_simple(rows):
+def regression_logistique_simple(rows, n_boot=N_BOOT, workers=1):
     """Regression logistique: P(win) = logit(a*log(1/cote) + b*derive + c).
     On veut savoir si b est significatif APRES avoir controle pour la cote.
 
-    Implementation simple via gradient descent (pas de scipy requis).
+    Ajustement Newton / IRLS (logreg.py, pas de scipy requis) : erreurs
+    standard par la Hessienne, IC bootstrap par course (percentile et
+    BCa, bootstrap.py), et logit conditionnel par course (softmax des
+    partants) en controle.
     """
     if not rows:
         return
 
     # Features
-    X1 = [log(1.0 / r["cote"]) for r in rows]  # log-odds implicite marche
-    X2 = [r["derive"] for r in rows]
-    y = [r["gagnant"] for r in rows]
+    X = np.array([[log(1.0 / r["cote"]), r["derive"]] for r in rows])  # log-odds implicite marche
+    y = np.array([r["gagnant"] for r in rows], dtype=np.float64)
     n = len(rows)
 
     # Standardiser X1 et X2 pour stabilite
-    def mean_std(xs):
-        m = sum(xs) / len(xs)
-        v = sum((x - m) ** 2 for x in xs) / len(xs)
-        return m, math.sqrt(v) if v > 0 else 1.0
-
-    m1, s1 = mean_std(X1)
-    m2, s2 = mean_std(X2)
-    X1s = [(x - m1) / s1 for x in X1]
-    X2s = [(x - m2) / s2 for x in X2]
-
-    # Gradient descent basique, 2000 iter, lr=0.05
-    a, b, c = 0.0, 0.0, 0.0
-    lr = 0.05
-    for _ in range(2000):
-        ga = gb = gc = 0.0
-        for i in range(n):
-            z = a * X1s[i] + b * X2s[i] + c
-            # sigmoid stable
-            if z >= 0:
-                ez = math.exp(-z)
-                p = 1.0 / (1.0 + ez)
-            else:
-                ez = math.exp(z)
-                p = ez / (1.0 + ez)
-            err = p - y[i]
-            ga += err * X1s[i]
-            gb += err * X2s[i]
-            gc += err
-        a -= lr * ga / n
-        b -= lr * gb / n
-        c -= lr * gc / n
-
-    # Estimation erreur standard par bootstrap (simple, 200 samples)
-    import random
-    random.seed(42)
-    bs_b = []
-    for _ in range(200):
-        sample_idx = [random.randrange(n) for _ in range(n)]
-        a2, b2, c2 = a, b, c  # warm start
-        for _ in range(300):
-            ga = gb = gc = 0.0
-            for i in sample_idx:
-                z = a2 * X1s[i] + b2 * X2s[i] + c2
-                if z >= 0:
-                    p = 1.0 / (1.0 + math.exp(-z))
-                else:
-                    ez = math.exp(z)
-                    p = ez / (1.0 + ez)
-                err = p - y[i]
-                ga += err * X1s[i]
-                gb += err * X2s[i]
-                gc += err
-            a2 -= lr * ga / n
-            b2 -= lr * gb / n
-            c2 -= lr * gc / n
-        bs_b.append(b2)
-    bs_b.sort()
-    b_lo = bs_b[int(0.025 * len(bs_b))]
-    b_hi = bs_b[int(0.975 * len(bs_b))]
+    Xs, _, _ = standardiser(X)
+    res = fit_logistique(Xs, y)
+    a, b, c = res.coef.tolist()
+    se_b = float(res.se[1])
+
+    # IC bootstrap : courses entieres tirees avec remise (bootstrap.py),
+    # intervalles percentile et BCa
+    course = np.array([r["course"] for r in rows])
+    starts = np.flatnonzero(np.r_[True, course[1:] != course[:-1]])
+    indice_course = np.cumsum(np.r_[False, course[1:] != course[:-1]])
+    bs = bootstrap_courses(statistique_logit(Xs, y, indice_course), len(starts),
+                           n_boot=n_boot, seed=42, workers=workers)
+    b_lo, b_hi = bs.percentile[1].tolist()
+    bca_lo, bca_hi = bs.bca[1].tolist()
+
+    # Logit conditionnel par course : compare les partants d'une meme course
+    cond = fit_conditionnel(Xs, y, starts)
 
     print(f"\n{'='*80}")
     print("REGRESSION LOGISTIQUE: P(win) ~ log(1/cote) + derive")
     print(f"{'='*80}")
     print(f"N = {n} participants")
     print(f"Coefficient cote      (log(1/cote) standardise) : {a:+.3f}")
-    print(f"Coefficient DERIVE    (derive standardisee)     : {b:+.3f}")
-    print(f"  IC 95% bootstrap sur DERIVE : [{b_lo:+.3f}, {b_hi:+.3f}]")
+    print(f"Coefficient DERIVE    (derive standardisee)     : {b:+.3f}  (se {se_b:.3f})")
+    print(f"  IC 95% Wald sur DERIVE      : [{b - 1.96 * se_b:+.3f}, {b + 1.96 * se_b:+.3f}]")
+    print(f"  IC 95% bootstrap sur DERIVE : [{b_lo:+.3f}, {b_hi:+.3f}]  "
+          f"({n_boot} tirages de {len(starts)} courses, se {bs.se[1]:.3f})")
+    print(f"  IC 95% BCa sur DERIVE       : [{bca_lo:+.3f}, {bca_hi:+.3f}]")
     print(f"  Intercept : {c:+.3f}")
+    print(f"  Logit conditionnel ({len(starts)} courses) : cote {cond.coef[0]:+.3f}  "
+          f"derive {cond.coef[1]:+.3f} (se {cond.se[1]:.3f})")
     print()
     if b_lo > 0:
         print(">>> DERIVE a un effet POSITIF significatif. Mais signe attendu = NEGATIF")
@@ -257,6 +220,11 @@ def analyse_derives_extremes(rows, threshold=0.3):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Diagnostic derive de cote - Paris 2026")
+    parser.add_argument("--boot", type=int, default=N_BOOT, help="tirages bootstrap (courses)")
+    parser.add_argument("--workers", type=int, default=1, help="processus pour le bootstrap")
+    args = parser.parse_args()
+
     print("=" * 80)
     print("DIAGNOSTIC DERIVE DE COTE - Paris 2026")
     print("=" * 80)
@@ -274,7 +242,7 @@ def main():
     analyse_derives_extremes(rows, threshold=0.3)
 
     # 3. Regression logistique
-    regression_logistique_simple(rows)
+    regression_logistique_simple(rows, n_boot=args.boot, workers=args.workers)
 
     print(f"\n{'='*80}")
     print("VERDICT")
@@ -20,20 +20,29 @@ Contraintes d'integration (basees sur validation out-of-sample):
   - Seuil: derive > +0.3 (hausse forte uniquement)
   - Poids calibre sur coeff -0.258 mais en version soft
 
+Les variantes sont evaluees par le moteur vectorise (scoring_engine) sur
+les colonnes du feature store (feature_store.py), un passage NumPy par
+config. score_baseline / penalite_derive ci-dessous restent la reference
+par partant (comparee au moteur par scoring_engine.py verifier).
+
 Usage: python3 scripts/integre_derive_ab_test.py
 """
 
-import json
-import glob
 import os
-import re
-import math
+import sys
 from math import log, sqrt
-from collections import defaultdict
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import musique_parser
+import scoring_engine
+from feature_store import load_features
 
 HIPPODROMES_PARIS = ["saint-cloud", "chantilly", "fontainebleau",
                      "parislongchamp", "longchamp"]
-DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "courses")
 
 
 # ============ STATS ============
@@ -67,28 +76,8 @@ def test_mcnemar(a_only, b_only):
 
 # ============ PARSING ============
 def score_musique(musique_str):
-    if not musique_str:
-        return 0.0
-    positions = re.findall(r'(\d)[a-zA-Z]', musique_str)[:5]
-    if not positions:
-        return 0.0
-    pts = {'1': 10, '2': 7, '3': 5, '4': 3, '5': 2, '6': 1, '7': 1, '8': 0, '9': 0, '0': 0}
-    weights = [5, 4, 3, 2, 1]
-    total_w = sum(weights[:len(positions)])
-    s = sum(pts.get(p, 0) * w for p, w in zip(positions, weights))
-    return s / total_w if total_w > 0 else 0.0
-
-
-def parse_distance(dist_str):
-    m = re.search(r'(\d+)', str(dist_str))
-    return int(m.group(1)) if m else 0
-
-
-def seg_distance(d):
-    if d < 1400: return "sprint"
-    if d < 1700: return "mile"
-    if d < 2100: return "middle"
-    return "staying"
+    """Score 0-10 (musique_parser.score_baseline, memoise)."""
+    return musique_parser.score_baseline(musique_str)
 
 
 def safe_float(v, default=0):
@@ -136,68 +125,46 @@ def penalite_derive(p, seuil=0.3, poids=0.5):
     return poids * excess
 
 
-def score_avec_derive(p, seg_d, seuil=0.3, poids=0.5):
-    return score_baseline(p, seg_d) - penalite_derive(p, seuil, poids)
-
-
-# ============ LOAD COURSES ============
-def load_courses():
-    courses_list = []
-    files = sorted(glob.glob(os.path.join(DATA_DIR, "2026-*.json")))
-    files_paris = [f for f in files
-                   if any(h in os.path.basename(f).lower() for h in HIPPODROMES_PARIS)]
-    for fp in files_paris:
-        try:
-            with open(fp, encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            continue
-        for course in data.get("courses", []):
-            if not course.get("arrivee_definitive"):
-                continue
-            # Verifier qu'il y a bien un gagnant et au moins 4 partants
-            partants = course.get("participants", [])
-            if len(partants) < 4:
-                continue
-            gagnant = next((p.get("n\u00b0") for p in partants if p.get("arrivee") == 1), None)
-            if gagnant is None:
-                continue
-            courses_list.append({
-                "hippo": data.get("hippodrome", "?"),
-                "course": course,
-                "gagnant": gagnant,
-            })
-    return courses_list
-
-
 # ============ BACKTEST ============
-def backtest_model(courses_list, scoring_fn, name=""):
-    """Applique scoring_fn a chaque course, retourne stats."""
-    top1 = 0
-    top2 = 0
-    top3 = 0
-    n = 0
-    decisions = []  # pour McNemar: [(course_id, top1_correct)]
-
-    for item in courses_list:
-        course = item["course"]
-        gagnant = item["gagnant"]
-        seg_d = seg_distance(parse_distance(course.get("distance", "0")))
-        scored = []
-        for p in course.get("participants", []):
-            s = scoring_fn(p, seg_d)
-            scored.append((p.get("n\u00b0"), s))
-        scored.sort(key=lambda x: -x[1])
-        t1 = scored[0][0]
-        t2 = {scored[i][0] for i in range(min(2, len(scored)))}
-        t3 = {scored[i][0] for i in range(min(3, len(scored)))}
-        top1_ok = (t1 == gagnant)
-        if top1_ok: top1 += 1
-        if gagnant in t2: top2 += 1
-        if gagnant in t3: top3 += 1
-        n += 1
-        decisions.append(top1_ok)
+def est_paris_2026(fichier):
+    return fichier.startswith("2026-") and any(h in fichier.lower() for h in HIPPODROMES_PARIS)
+
+
+def colonnes():
+    """Colonnes NumPy des partants des courses Paris 2026 a arrivee
+    definitive, 4 partants ou plus et un gagnant (contigus par course),
+    lues dans le feature store."""
+    fs = load_features()
+    gagnant = np.asarray(fs["gagnant"])
+    courses = (fs.masque_fichiers(est_paris_2026) & fs.course("arrivee_definitive")
+               & (fs.course("nb_partants") >= 4) & np.logical_or.reduceat(gagnant, fs.starts))
+    idx, starts = fs.selection(courses)
+    cote, ref, valeur = fs["cote"][idx], fs["cote_reference"][idx], fs["valeur"][idx]
+    # Defauts de safe_float (valeur <= 0 ou illisible)
+    return {
+        "starts": starts,
+        "cote": np.where(cote > 0, cote, 0.0),
+        "cote_baseline": np.where(cote > 0, cote, 99.0),
+        "cote_reference": np.where(ref > 0, ref, 0.0),
+        "valeur": np.where(valeur > 0, valeur, 0.0),
+        "musique": fs["musique_baseline"][idx],
+        "gagnant": gagnant[idx],
+        "segment": fs.partant("segment")[idx],
+    }
+
 
+def backtest_vectorise(cols, name="", seuil=None, poids=None):
+    """Top1/2/3 du modele baseline, penalise par la derive si seuil est donne."""
+    scores = scoring_engine.score_baseline(cols["cote_baseline"], cols["valeur"],
+                                           cols["musique"], cols["segment"])
+    if seuil is not None:
+        scores = scores - scoring_engine.penalite_derive(cols["cote"], cols["cote_reference"],
+                                                         seuil, poids)
+    starts = cols["starts"]
+    rang = scoring_engine.rangs(scores, starts)
+    ok = {k: scoring_engine.dans_top(cols["gagnant"], rang, k, starts) for k in (1, 2, 3)}
+    n = len(starts)
+    top1, top2, top3 = (int(ok[k].sum()) for k in (1, 2, 3))
     return {
         "name": name,
         "n": n,
@@ -206,7 +173,7 @@ def backtest_model(courses_list, scoring_fn, name=""):
         "top3": top3, "top3_pct": top3 / n if n else 0,
         "top1_ci": wilson_ic(top1, n),
         "top2_ci": wilson_ic(top2, n),
-        "decisions": decisions,
+        "decisions": ok[1].tolist(),
     }
 
 
@@ -216,14 +183,14 @@ def main():
     print("A/B TEST - Baseline vs Baseline + Penalite Derive")
     print("=" * 80)
 
-    courses = load_courses()
-    print(f"\n{len(courses)} courses Paris 2026 chargees")
-    if len(courses) < 30:
+    cols = colonnes()
+    print(f"\n{len(cols['starts'])} courses Paris 2026 chargees")
+    if len(cols["starts"]) < 30:
         print("Trop peu de courses, abandon.")
         return
 
     # Modele BASELINE
-    baseline = backtest_model(courses, score_baseline, "BASELINE")
+    baseline = backtest_vectorise(cols, "BASELINE")
 
     # Modeles AVEC DERIVE - tester plusieurs configs
     configs = [
@@ -236,9 +203,7 @@ def main():
 
     results = [baseline]
     for name, seuil, poids in configs:
-        scoring = lambda p, s, seuil=seuil, poids=poids: score_avec_derive(p, s, seuil, poids)
-        res = backtest_model(courses, scoring, name)
-        results.append(res)
+        results.append(backtest_vectorise(cols, name, seuil, poids))
 
     # Affichage
     print(f"\n{'Modele':<35} {'Top1%':>8} {'IC95':>18} {'Top2%':>8} {'Top3%':>8}")
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
-Snapshot brut — copie pure des CSV France Galop (data/raw_csv/) vers
-data/rankings/YYYY-MM-DD_HHhMM/, **sans aucune transformation**.
+Snapshot brut — CSV France Galop (data/raw_csv/) horodatés,
+**sans aucune transformation**.
 
 Le snapshot contient les CSV exactement tels que téléchargés depuis
 France Galop, avec le Rang officiel et les colonnes brutes
@@ -9,8 +9,16 @@ France Galop, avec le Rang officiel et les colonnes brutes
 Aucun ratio calculé, aucun ScoreMixte inventé. Charge au consommateur
 de faire son analyse.
 
-Usage : python3 scripts/snapshot_brut.py [stamp]
+Stockage : chaque CSV est ajouté au store delta data/rankings/_store/
+(cf. rankings_store.py : une base + les lignes modifiées par snapshot).
+Seuls les CSV lus par stats.html (FRONTEND_SOURCES) sont encore copiés en
+clair dans data/rankings/YYYY-MM-DD_HHhMM/ ; les autres se reconstruisent
+à l'octet près :
+        python3 rankings_store.py materialize YYYY-MM-DD_HHhMM
+
+Usage : python3 scripts/snapshot_brut.py [stamp] [--complet]
         stamp défaut = date UTC actuelle (YYYY-MM-DD_HHhMM)
+        --complet : copie aussi les 12 CSV en clair (ancien comportement)
 """
 import os
 import shutil
@@ -18,6 +26,10 @@ import sys
 from datetime import datetime, timezone
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rankings_store import RankingStore  # noqa: E402
+
 RAW = os.path.join(ROOT, 'data', 'raw_csv')
 OUT_BASE = os.path.join(ROOT, 'data', 'rankings')
 
@@ -29,27 +41,42 @@ SOURCES = [
     'eleveurs.csv', 'eleveurs_2025.csv',
     'proprietaires.csv', 'proprietaires_2025.csv',
 ]
+# Fichiers que stats.html va chercher dans data/rankings/STAMP/
+FRONTEND_SOURCES = {'chevaux.csv', 'jockeys.csv', 'cravache_or.csv'}
 
 
 def main():
-    stamp = sys.argv[1] if len(sys.argv) > 1 else datetime.now(timezone.utc).strftime('%Y-%m-%d_%Hh%M')
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    complet = '--complet' in sys.argv[1:]
+    stamp = args[0] if args else datetime.now(timezone.utc).strftime('%Y-%m-%d_%Hh%M')
     out_dir = os.path.join(OUT_BASE, stamp)
     os.makedirs(out_dir, exist_ok=True)
+    store = RankingStore()
 
-    print(f'📸 Snapshot CSV brut → {out_dir}')
-    copied = 0
+    print(f'📸 Snapshot CSV brut → {out_dir} (+ store delta)')
+    stored = copied = 0
     for fn in SOURCES:
         src = os.path.join(RAW, fn)
         if not os.path.exists(src):
             print(f'  ⚠️  {fn} absent, skip')
             continue
-        dst = os.path.join(out_dir, fn)
-        shutil.copy2(src, dst)
-        copied += 1
-        size_kb = os.path.getsize(dst) / 1024
-        print(f'  ✅ {fn} ({size_kb:.1f} KB)')
+        size_kb = os.path.getsize(src) / 1024
+        copie = complet or fn in FRONTEND_SOURCES
+        try:
+            kind = store.append_file(fn, stamp, src)
+            stored += 1
+            label = {'full': 'base', 'delta': 'delta', None: 'déjà dans le store'}[kind]
+        except ValueError as e:
+            # Non découpable à l'identique : on garde la copie en clair
+            label = f'hors store ({e})'
+            copie = True
+        if copie:
+            shutil.copy2(src, os.path.join(out_dir, fn))
+            copied += 1
+            label += ', copié'
+        print(f'  ✅ {fn} ({size_kb:.1f} KB) {label}')
 
-    print(f'\n{copied} fichiers copiés.')
+    print(f'\n{stored} CSV dans le store, {copied} copiés en clair.')
 
 
 if __name__ == '__main__':
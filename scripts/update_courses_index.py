@@ -7,15 +7,24 @@ permettre le listing côté frontend SANS taper api.github.com (rate limit
 Le frontend fetch ensuite ce fichier via raw.githubusercontent.com avec
 cache-buster → aucun rate limit, données fraîches.
 
-Usage : python3 scripts/update_courses_index.py
+Écrit aussi un shard par mois (data/courses/_index/YYYY-MM.json) avec un
+résumé par fichier : nb courses, nb partants, disciplines, arrivées
+définitives, premier/dernier départ.
+
+Incrémental : seuls les fichiers nouveaux ou modifiés (mtime/taille) sont
+pris en compte, cf. data_index.py. scraper_courses_pmu.py met déjà l'index
+à jour après chaque fichier écrit.
+
+Usage : python3 scripts/update_courses_index.py [fichier.json ...]
 """
-import json
 import os
 import sys
-from datetime import datetime, timezone
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-COURSES_DIR = os.path.join(ROOT, 'data', 'courses')
+sys.path.insert(0, ROOT)
+
+from data_index import COURSES_DIR, update_courses_index  # noqa: E402
+
 INDEX_PATH = os.path.join(COURSES_DIR, '_index.json')
 
 
@@ -24,27 +33,11 @@ def main():
         print(f'❌ {COURSES_DIR} introuvable', file=sys.stderr)
         sys.exit(1)
 
-    files = []
-    for name in sorted(os.listdir(COURSES_DIR)):
-        if not name.endswith('.json') or name.startswith('_'):
-            continue
-        path = os.path.join(COURSES_DIR, name)
-        files.append({
-            'name': name,
-            'size': os.path.getsize(path),
-        })
-
-    payload = {
-        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
-        'count': len(files),
-        'files': files,
-    }
-
-    with open(INDEX_PATH, 'w', encoding='utf-8') as f:
-        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    result = update_courses_index(sys.argv[1:] or None)
 
     size_kb = os.path.getsize(INDEX_PATH) / 1024
-    print(f'✅ {INDEX_PATH} — {len(files)} fichiers ({size_kb:.1f} KB)')
+    print(f'✅ {INDEX_PATH} — {result["count"]} fichiers ({size_kb:.1f} KB), '
+          f'{result["recalcules"]} mis à jour')
 
 
 if __name__ == '__main__':
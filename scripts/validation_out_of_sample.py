@@ -21,20 +21,28 @@ Tests supplementaires:
   on regarde la distribution des coefficients. Le vrai coeff
   doit etre a >2 ecarts-types du placebo.
 
+Les participants sont lus dans le feature store (feature_store.py).
+
 Usage: python3 scripts/validation_out_of_sample.py
 """
 
-import json
-import glob
 import os
+import sys
 import math
 import random
 from math import log, sqrt, exp
 from collections import defaultdict
 
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from feature_store import load_features
+from logreg import fit_logistique, standardiser
+
 HIPPODROMES_PARIS = ["saint-cloud", "chantilly", "fontainebleau",
                      "parislongchamp", "longchamp"]
-DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "courses")
 
 
 def wilson_ic(k, n, z=1.96):
@@ -47,54 +55,32 @@ def wilson_ic(k, n, z=1.96):
     return (max(0.0, c - m), min(1.0, c + m))
 
 
+def hippodrome_paris(fichier):
+    """Hippodrome parisien d'un fichier 2026 (None si hors Paris / 2026)."""
+    if not fichier.startswith("2026-"):
+        return None
+    return next((h for h in HIPPODROMES_PARIS if h in fichier.lower()), None)
+
+
 def collect_participants():
     """Extrait chaque participant AVEC la date de la course pour pouvoir splitter."""
+    fs = load_features()
+    hippos = [hippodrome_paris(f) for f in fs.fichiers]
+    courses = fs.masque_fichiers(hippodrome_paris) & fs.course("arrivee_definitive")
+    cote, ref = fs["cote"], fs["cote_reference"]
+    idx = np.flatnonzero(fs.partant(courses) & (cote > 0) & (ref > 0) & fs["arrivee_connue"])
+    fichiers = fs.partant("fichier")[idx].tolist()
     rows = []
-    files = sorted(glob.glob(os.path.join(DATA_DIR, "2026-*.json")))
-    files_paris = [f for f in files
-                   if any(h in os.path.basename(f).lower() for h in HIPPODROMES_PARIS)]
-
-    for fp in files_paris:
-        fname = os.path.basename(fp)
-        # Extraire date + hippodrome du nom de fichier
-        try:
-            date_str = fname[:10]  # "2026-01-21"
-        except Exception:
-            continue
-        hippo = None
-        for h in HIPPODROMES_PARIS:
-            if h in fname.lower():
-                hippo = h
-                break
-
-        try:
-            with open(fp, encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            continue
-
-        for course in data.get("courses", []):
-            if not course.get("arrivee_definitive"):
-                continue
-            for p in course.get("participants", []):
-                try:
-                    cote = float(p.get("cote", 0))
-                    ref = float(p.get("cote_reference", 0))
-                except (ValueError, TypeError):
-                    continue
-                if cote <= 0 or ref <= 0:
-                    continue
-                arr = p.get("arrivee")
-                if arr is None:
-                    continue
-                rows.append({
-                    "date": date_str,
-                    "hippo": hippo,
-                    "cote": cote,
-                    "cote_ref": ref,
-                    "derive": log(cote / ref),
-                    "gagnant": 1 if arr == 1 else 0,
-                })
+    for f, c, r, d, arr in zip(fichiers, cote[idx].tolist(), ref[idx].tolist(),
+                               fs["derive"][idx].tolist(), fs["arrivee"][idx].tolist()):
+        rows.append({
+            "date": fs.fichiers[f][:10],  # "2026-01-21"
+            "hippo": hippos[f],
+            "cote": c,
+            "cote_ref": r,
+            "derive": d,
+            "gagnant": 1 if arr == 1 else 0,
+        })
     return rows
 
 
@@ -105,30 +91,11 @@ def sigmoid(z):
     return ez / (1.0 + ez)
 
 
-def fit_logreg(X1, X2, y, lr=0.05, n_iter=2000):
-    """Regression logistique 2 features + intercept. Gradient descent."""
-    # Standardiser
-    def mean_std(xs):
-        m = sum(xs) / len(xs)
-        v = sum((x - m) ** 2 for x in xs) / len(xs)
-        return m, math.sqrt(v) if v > 0 else 1.0
-    m1, s1 = mean_std(X1)
-    m2, s2 = mean_std(X2)
-    X1s = [(x - m1) / s1 for x in X1]
-    X2s = [(x - m2) / s2 for x in X2]
-    n = len(y)
-    a, b, c = 0.0, 0.0, 0.0
-    for _ in range(n_iter):
-        ga = gb = gc = 0.0
-        for i in range(n):
-            p = sigmoid(a * X1s[i] + b * X2s[i] + c)
-            err = p - y[i]
-            ga += err * X1s[i]
-            gb += err * X2s[i]
-            gc += err
-        a -= lr * ga / n
-        b -= lr * gb / n
-        c -= lr * gc / n
+def fit_logreg(X1, X2, y):
+    """Regression logistique 2 features + intercept (Newton, logreg.py)."""
+    Xs, moyennes, ecarts = standardiser(np.column_stack([X1, X2]))
+    a, b, c = fit_logistique(Xs, y).coef.tolist()
+    (m1, m2), (s1, s2) = moyennes.tolist(), ecarts.tolist()
     return a, b, c, (m1, s1, m2, s2)
 
 
@@ -182,13 +149,13 @@ def test_placebo(rows, n_perm=100):
     y_true = [r["gagnant"] for r in rows]
 
     # Vrai coeff
-    _, b_true, _, _ = fit_logreg(X1, X2, y_true, n_iter=1500)
+    _, b_true, _, _ = fit_logreg(X1, X2, y_true)
 
     placebo_coeffs = []
     y_shuf = y_true.copy()
     for _ in range(n_perm):
         random.shuffle(y_shuf)
-        _, b_p, _, _ = fit_logreg(X1, X2, y_shuf, n_iter=800)  # moins d'iter pour speed
+        _, b_p, _, _ = fit_logreg(X1, X2, y_shuf)
         placebo_coeffs.append(b_p)
 
     placebo_coeffs.sort()
@@ -275,7 +242,7 @@ def main():
         X1 = [log(1.0 / r["cote"]) for r in train_g]
         X2 = [r["derive"] for r in train_g]
         y = [r["gagnant"] for r in train_g]
-        _, b_g, _, _ = fit_logreg(X1, X2, y, n_iter=1500)
+        _, b_g, _, _ = fit_logreg(X1, X2, y)
         # Lift Q4 sur test
         sorted_t = sorted(test_g, key=lambda r: r["derive"])
         q4 = sorted_t[int(0.75 * len(sorted_t)):]
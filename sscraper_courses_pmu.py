@@ -18,8 +18,6 @@ Usage:
     python scraper_courses_pmu.py today        # Explicitement aujourd'hui
 """
 
-import requests
-import json
 import os
 import sys
 import time
@@ -27,6 +25,9 @@ import logging
 import re
 from datetime import datetime, timedelta
 
+from json_io import write_json
+from pmu_client import api_get, get_client, BASE_URL
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -34,12 +35,6 @@ logger = logging.getLogger(__name__)
 # ============================================================
 # Configuration
 # ============================================================
-BASE_URL = "https://online.turfinfo.api.pmu.fr/rest/client/61"
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    'Accept': 'application/json',
-    'Accept-Language': 'fr-FR,fr;q=0.9',
-}
 OUTPUT_DIR = "data/courses"
 REQUEST_DELAY = 0.3  # secondes entre les requêtes
 
@@ -48,27 +43,6 @@ REQUEST_DELAY = 0.3  # secondes entre les requêtes
 # Fonctions API
 # ============================================================
 
-def api_get(endpoint, max_retries=3):
-    """Appel GET à l'API PMU avec retry."""
-    url = f"{BASE_URL}/{endpoint}"
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, headers=HEADERS, timeout=30)
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 404:
-                logger.warning(f"  ⚠️  404 pour: {endpoint}")
-                return None
-            else:
-                logger.warning(f"  ⚠️  HTTP {response.status_code} pour {endpoint} (tentative {attempt+1}/{max_retries})")
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"  ⚠️  Erreur réseau: {e} (tentative {attempt+1}/{max_retries})")
-        if attempt < max_retries - 1:
-            time.sleep(REQUEST_DELAY * (attempt + 1))
-    logger.error(f"❌ Échec après {max_retries} tentatives pour {endpoint}")
-    return None
-
-
 def format_date_pmu(date_obj):
     """Convertit une date au format PMU (DDMMYYYY)."""
     return date_obj.strftime("%d%m%Y")
@@ -283,7 +257,7 @@ def scrape_courses(date_obj=None):
             "hippodrome": hippodrome_nom,
             "type_reunion": reunion_type,
             "date_extraction": datetime.now().isoformat(),
-            "url_source": f"https://online.turfinfo.api.pmu.fr/rest/client/61/programme/{date_pmu}/R{reunion_num}",
+            "url_source": f"{BASE_URL}/programme/{date_pmu}/R{reunion_num}",
             "courses": []
         }
 
@@ -347,8 +321,7 @@ def scrape_courses(date_obj=None):
             filename = f"{date_iso}_{safe_name}.json"
             filepath = os.path.join(OUTPUT_DIR, filename)
 
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(reunion_output, f, ensure_ascii=False, indent=2)
+            write_json(filepath, reunion_output)
 
             logger.info(f"  💾 {filepath} ({len(reunion_output['courses'])} courses)")
             files_saved += 1
@@ -359,6 +332,7 @@ def scrape_courses(date_obj=None):
     logger.info(f"\n{'='*60}")
     logger.info(f"📊 RÉSUMÉ - {date_iso}")
     logger.info(f"  Réunions: {len(reunions_data)} | Fichiers: {files_saved}")
+    get_client().log_stats(logger)
     logger.info(f"✅ Extraction terminée!")
 
     return files_saved > 0